@@ -0,0 +1,285 @@
+"""
+Admission Control - Limitation de débit et délestage de l'API de prédiction
+============================================================================
+
+Lors d'un pic de trafic, accepter toutes les requêtes fait s'effondrer la
+latence de tout le monde. Ce module décide, avant l'inférence, si une requête
+est admise :
+
+1. Limite de débit par client (token bucket) : au-delà de sa rafale, un client
+   reçoit 429 avec Retry-After = temps avant le prochain jeton.
+2. Pools de concurrence séparés pour /api/predict et /api/predict_batch : le
+   batch est pondéré par son nombre de véhicules, il ne peut donc pas occuper
+   les slots du formulaire interactif.
+3. Délestage piloté par la latence : une requête attend son slot (en FIFO) au
+   plus `target_delay_ms`. Au-delà, ou si le délai d'attente moyen récent
+   dépasse déjà la cible alors que des requêtes attendent, elle est refusée
+   immédiatement avec 503 + Retry-After plutôt que de rallonger la file.
+
+L'état est propre à chaque processus (un worker gunicorn = ses propres
+limites) ; les compteurs sont exposés par stats() pour la supervision.
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class AdmissionRejected(Exception):
+    """
+    Requête refusée par le contrôle d'admission.
+
+    Parameters:
+    -----------
+    status : int
+        429 (limite de débit) ou 503 (délestage)
+    retry_after : int
+        Délai conseillé avant de réessayer (s)
+    reason : str
+        Motif ('rate_limited', 'queue_full', 'overloaded', 'queue_timeout')
+    """
+
+    def __init__(self, status, retry_after, reason):
+        super().__init__(f"Requête refusée ({reason}), réessayer dans {retry_after} s")
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucketLimiter:
+    """
+    Limite de débit par client (un token bucket par identifiant).
+
+    Parameters:
+    -----------
+    rate : float
+        Jetons ajoutés par seconde (requêtes/s soutenues)
+    burst : float
+        Capacité du seau (rafale maximale)
+    max_clients : int
+        Nombre de clients suivis ; les moins récents sont oubliés au-delà
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client, cost=1.0):
+        """
+        Consomme `cost` jetons du client.
+
+        Returns:
+        --------
+        float
+            0 si la requête est admise, sinon délai (s) avant d'avoir assez de jetons
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        return {'rate': self.rate, 'burst': self.burst, 'clients': len(self._buckets)}
+
+
+class ConcurrencyPool:
+    """
+    Pool de capacité pondérée avec file FIFO bornée en temps.
+
+    Parameters:
+    -----------
+    name : str
+        Nom du pool (supervision)
+    capacity : int
+        Poids total exécuté simultanément (requêtes ou véhicules)
+    target_delay_ms : float
+        Attente maximale dans la file avant délestage
+    max_waiting : int
+        Nombre maximal de requêtes en attente
+    """
+
+    # Lissage de la moyenne exponentielle du délai d'attente
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, name, capacity, target_delay_ms, max_waiting):
+        self.name = name
+        self.capacity = int(capacity)
+        self.target_delay = float(target_delay_ms) / 1000
+        self.max_waiting = int(max_waiting)
+        self.in_use = 0
+        self.queue_delay = 0.0
+        self._waiters = deque()
+        self._cond = threading.Condition()
+        self.counters = {'admitted': 0, 'queued': 0, 'queue_full': 0, 'overloaded': 0, 'queue_timeout': 0}
+
+    def _record_delay(self, delay):
+        self.queue_delay += self.EWMA_ALPHA * (delay - self.queue_delay)
+
+    def _retry_after(self):
+        return max(1, math.ceil(max(self.queue_delay, self.target_delay)))
+
+    def acquire(self, weight=1):
+        """
+        Réserve `weight` unités de capacité (bornées à la capacité du pool).
+
+        Returns:
+        --------
+        int
+            Poids réservé, à rendre avec release()
+
+        Raises:
+        -------
+        AdmissionRejected
+            503 si la file est pleine, saturée ou si l'attente dépasse la cible
+        """
+        weight = max(1, min(int(weight), self.capacity))
+        with self._cond:
+            if not self._waiters and self.in_use + weight <= self.capacity:
+                self.in_use += weight
+                self.counters['admitted'] += 1
+                self._record_delay(0.0)
+                return weight
+
+            # Échec rapide: la file est déjà plus lente que la cible
+            if self._waiters and self.queue_delay > self.target_delay:
+                self.counters['overloaded'] += 1
+                raise AdmissionRejected(503, self._retry_after(), 'overloaded')
+            if len(self._waiters) >= self.max_waiting:
+                self.counters['queue_full'] += 1
+                raise AdmissionRejected(503, self._retry_after(), 'queue_full')
+
+            ticket = object()
+            self._waiters.append(ticket)
+            self.counters['queued'] += 1
+            start = time.monotonic()
+            deadline = start + self.target_delay
+            try:
+                while not (self._waiters[0] is ticket and self.in_use + weight <= self.capacity):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._record_delay(self.target_delay)
+                        self.counters['queue_timeout'] += 1
+                        raise AdmissionRejected(503, self._retry_after(), 'queue_timeout')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(ticket)
+                # La tête de file a changé: les suivants réévaluent leur tour
+                self._cond.notify_all()
+
+            self.in_use += weight
+            self.counters['admitted'] += 1
+            self._record_delay(time.monotonic() - start)
+            return weight
+
+    def release(self, weight):
+        with self._cond:
+            self.in_use -= weight
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'in_use': self.in_use,
+                'waiting': len(self._waiters),
+                'max_waiting': self.max_waiting,
+                'target_delay_ms': self.target_delay * 1000,
+                'queue_delay_ms': round(self.queue_delay * 1000, 3),
+                **self.counters
+            }
+
+
+class _Slot:
+    """Capacité réservée dans un pool, rendue en sortie de bloc with"""
+
+    def __init__(self, pool, weight):
+        self.pool = pool
+        self.weight = weight
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.release(self.weight)
+        return False
+
+
+class AdmissionController:
+    """
+    Contrôle d'admission de l'API: limite par client puis pool de concurrence.
+
+    Parameters:
+    -----------
+    rate : float
+        Requêtes/s par client (0 = pas de limite de débit)
+    burst : float
+        Rafale autorisée par client
+    pools : dict
+        {nom: ConcurrencyPool}
+
+    Example:
+    --------
+    >>> admission = AdmissionController(20, 40, {'predict': ConcurrencyPool('predict', 8, 50, 32)})
+    >>> with admission.admit('predict', client='10.0.0.1'):
+    ...     predictor.predict(...)
+    """
+
+    def __init__(self, rate, burst, pools):
+        self.limiter = TokenBucketLimiter(rate, burst) if rate > 0 else None
+        self.pools = pools
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def admit(self, pool, client, weight=1):
+        """
+        Admet une requête ou lève AdmissionRejected.
+
+        Parameters:
+        -----------
+        pool : str ou None
+            Nom du pool de concurrence (None: limite de débit seulement)
+        client : str
+            Identifiant du client (clé d'API ou adresse IP)
+        weight : int
+            Poids de la requête dans le pool (nombre de véhicules pour le batch)
+
+        Returns:
+        --------
+        _Slot
+            Context manager qui rend la capacité à la fin de la requête
+        """
+        if self.limiter is not None:
+            wait = self.limiter.acquire(client)
+            if wait > 0:
+                with self._lock:
+                    self.rate_limited += 1
+                raise AdmissionRejected(429, max(1, math.ceil(wait)), 'rate_limited')
+        if pool is None:
+            return _Slot(None, 0)
+        target = self.pools[pool]
+        return _Slot(target, target.acquire(weight))
+
+    def stats(self):
+        """Limites courantes et compteurs de refus, pour la supervision"""
+        return {
+            'rate_limit': dict(self.limiter.stats(), rejected=self.rate_limited) if self.limiter else None,
+            'pools': {name: pool.stats() for name, pool in self.pools.items()}
+        }
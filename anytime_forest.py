@@ -0,0 +1,121 @@
+"""
+Anytime Forest - Prédiction d'une forêt sous contrainte de latence
+===================================================================
+
+La prédiction d'une forêt est la moyenne de ses arbres. Pour une requête
+interactive, il n'est pas nécessaire d'évaluer tous les arbres : les arbres
+sont évalués par blocs, la moyenne et la variance des sorties sont suivies au
+fil de l'eau, et l'évaluation s'arrête dès que :
+
+- l'intervalle de confiance de la moyenne est assez étroit (demi-largeur
+  relative inférieure à rel_ci), ou
+- le budget de latence est épuisé.
+
+Le nombre d'arbres utilisés est renvoyé avec l'estimation. Les prédictions
+batch et hors ligne gardent le calcul exact sur toute la forêt.
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import time
+
+import numpy as np
+
+
+class AnytimeForestEvaluator:
+    """
+    Évaluation interruptible d'une forêt scikit-learn.
+
+    Parameters:
+    -----------
+    model : ExtraTreesRegressor ou RandomForestRegressor
+        Forêt entraînée
+    chunk_size : int
+        Nombre d'arbres évalués entre deux tests d'arrêt
+    min_trees : int
+        Nombre minimal d'arbres avant de pouvoir s'arrêter sur l'intervalle
+    z : float
+        Quantile de la loi normale de l'intervalle de confiance (1.96 = 95%)
+    rel_ci : float
+        Demi-largeur relative de l'intervalle à atteindre (5%, à comparer à la
+        fourchette de ±10% renvoyée par CarPricePredictor)
+
+    Example:
+    --------
+    >>> evaluator = AnytimeForestEvaluator(model)
+    >>> estimate = evaluator.predict_one(X.iloc[:1], budget_ms=2)
+    >>> estimate['trees_used'], estimate['prediction']
+    """
+
+    def __init__(self, model, chunk_size=10, min_trees=20, z=1.96, rel_ci=0.05):
+        if not hasattr(model, 'estimators_') or not hasattr(model.estimators_[0], 'tree_'):
+            raise TypeError(f"Évaluation anytime réservée aux forêts scikit-learn, pas {type(model).__name__}")
+        # Accès direct aux arbres bas niveau: évite la validation de DecisionTreeRegressor.predict
+        self.trees = [est.tree_ for est in model.estimators_]
+        self.chunk_size = chunk_size
+        self.min_trees = min_trees
+        self.z = z
+        self.rel_ci = rel_ci
+
+    @property
+    def n_trees(self):
+        return len(self.trees)
+
+    def predict_one(self, X, budget_ms=None):
+        """
+        Estime la prédiction d'une ligne dans le budget de latence.
+
+        Parameters:
+        -----------
+        X : array-like de forme (1, n_features)
+            Features d'un véhicule
+        budget_ms : float, optional
+            Budget de latence en millisecondes (illimité par défaut)
+
+        Returns:
+        --------
+        dict
+            prediction, trees_used, trees_total, ci_half_width, stopped
+            ('converged', 'budget' ou 'complete')
+        """
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000 if budget_ms is not None else None
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float32)[:1])
+
+        total = 0.0
+        total_sq = 0.0
+        n = 0
+        stopped = 'complete'
+        half_width = np.inf
+        for chunk_start in range(0, self.n_trees, self.chunk_size):
+            outputs = np.fromiter(
+                (tree.predict(X).flat[0] for tree in self.trees[chunk_start:chunk_start + self.chunk_size]),
+                dtype=np.float64
+            )
+            total += outputs.sum()
+            total_sq += np.dot(outputs, outputs)
+            n += len(outputs)
+            mean = total / n
+
+            if n < self.n_trees:
+                variance = max(total_sq / n - mean ** 2, 0.0) * n / max(n - 1, 1)
+                half_width = self.z * np.sqrt(variance / n)
+                if n >= self.min_trees and half_width <= self.rel_ci * abs(mean):
+                    stopped = 'converged'
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    stopped = 'budget'
+                    break
+            else:
+                half_width = 0.0
+
+        return {
+            'prediction': mean,
+            'trees_used': n,
+            'trees_total': self.n_trees,
+            'ci_half_width': float(half_width),
+            'stopped': stopped,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
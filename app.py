@@ -1,8 +1,15 @@
 from pathlib import Path
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, request, jsonify, render_template
 from flask_cors import CORS
+from functools import wraps
+from werkzeug.middleware.proxy_fix import ProxyFix
+import hashlib
+import hmac
 import traceback
+import atexit
 import os
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables from .env if present
@@ -10,6 +17,18 @@ load_dotenv()
 
 # Local import of your predictor
 from car_price_predictor import CarPricePredictor
+from comparables_index import charger_index
+from market_stats import DIMENSIONS as MARKET_DIMENSIONS, DEFAULT_QUANTILES, charger_cube
+from model_catalog import charger_catalogue
+from batch_jobs import JobStore, demarrer_workers
+from admission_control import AdmissionController, AdmissionRejected, ConcurrencyPool
+from request_log import RequestLog
+from drift_monitor import charger_moniteur
+from shadow_models import ShadowEvaluator, charger_candidats
+from wire_formats import (
+    JSON_MIMETYPE, MSGPACK_MIMETYPE, decoder_colonnes, dumps_json, msgpack_disponible, pack_msgpack,
+    unpack_msgpack
+)
 
 app = Flask(__name__, template_folder="templates", static_folder="static")
 CORS(app)
@@ -17,14 +36,91 @@ CORS(app)
 # Configurable model paths via environment variables
 MODEL_PATH = os.environ.get("MODEL_PATH", "models/extra_trees_tuned.pkl")
 ENCODERS_PATH = os.environ.get("ENCODERS_PATH", "models/encoders.pkl")
+# Default latency budget (ms) for /api/predict; unset = exact full-ensemble prediction
+PREDICT_LATENCY_BUDGET_MS = os.environ.get("PREDICT_LATENCY_BUDGET_MS")
+# Comparable listings: prebuilt index if present, otherwise built from the listings CSV
+COMPARABLES_INDEX_PATH = os.environ.get("COMPARABLES_INDEX_PATH", "models/comparables_index.pkl")
+LISTINGS_PATH = os.environ.get("LISTINGS_PATH", "Data/cleaned/dataset_final_complet_grand.csv")
+# Upper bound on the number of comparables a request may ask for (400 above it)
+COMPARABLES_MAX_K = int(os.environ.get("COMPARABLES_MAX_K", 50))
+# Market statistics cube (python market_stats.py builds/updates it)
+MARKET_STATS_PATH = os.environ.get("MARKET_STATS_PATH", "models/market_stats.pkl")
+# Model catalogue for autocomplete (python model_catalog.py builds it)
+MODEL_CATALOG_PATH = os.environ.get("MODEL_CATALOG_PATH", "models/model_catalog.json")
+# Asynchronous batch jobs: SQLite queue + capped worker processes, run separately with
+# `python batch_jobs.py worker`. JOB_WORKERS > 0 lets the web server start them instead
+# (a lock file in JOBS_DIR keeps gunicorn workers and the reloader from starting duplicates).
+JOBS_DIR = os.environ.get("JOBS_DIR", "Data/build/jobs")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 0))
+JOB_MAX_RUNNING = int(os.environ.get("JOB_MAX_RUNNING", max(JOB_WORKERS, 1)))
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", 5000))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+JOB_MAX_BYTES = int(os.environ.get("JOB_MAX_BYTES", 100 * 1024 * 1024))
+# Admission control (per process): per-client rate limit (RATE_LIMIT_RPS=0 disables it),
+# concurrency pools for /api/predict and /api/comparables (requests) and /api/predict_batch
+# and /api/curve (vehicles), and the queueing delay after which requests are shed with 503
+RATE_LIMIT_RPS = float(os.environ.get("RATE_LIMIT_RPS", 20))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", 2 * RATE_LIMIT_RPS))
+PREDICT_CONCURRENCY = int(os.environ.get("PREDICT_CONCURRENCY", 8))
+PREDICT_QUEUE_TARGET_MS = float(os.environ.get("PREDICT_QUEUE_TARGET_MS", 100))
+BATCH_CONCURRENCY_VEHICLES = int(os.environ.get("BATCH_CONCURRENCY_VEHICLES", 20000))
+BATCH_QUEUE_TARGET_MS = float(os.environ.get("BATCH_QUEUE_TARGET_MS", 1000))
+# Rate-limit identity: the client address (X-Forwarded-For is trusted only behind TRUSTED_PROXIES
+# reverse proxies), or an X-API-Key header that matches one of the comma-separated API_KEYS
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+API_KEYS = [k.strip() for k in os.environ.get("API_KEYS", "").split(",") if k.strip()]
+# Freshness (s) of cacheable responses (/api/brands, GET /api/predict); ETags revalidate them
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", 3600))
+# Prediction log for retraining/auditing (empty REQUEST_LOG_DIR disables it); records beyond
+# REQUEST_LOG_QUEUE_ROWS waiting rows are dropped and counted rather than delaying requests
+REQUEST_LOG_DIR = os.environ.get("REQUEST_LOG_DIR", "Data/build/request_log")
+REQUEST_LOG_QUEUE_ROWS = int(os.environ.get("REQUEST_LOG_QUEUE_ROWS", 100000))
+# Input drift monitor: training-set profile (python drift_monitor.py builds it) compared
+# with the inputs of the last one to two DRIFT_WINDOW_HOURS windows
+DRIFT_REFERENCE_PATH = os.environ.get("DRIFT_REFERENCE_PATH", "models/drift_reference.json")
+DRIFT_WINDOW_HOURS = float(os.environ.get("DRIFT_WINDOW_HOURS", 24))
+# Shadow evaluation: comma-separated candidate model pickles scored in the background
+# on the primary model's feature matrices (dropped when SHADOW_QUEUE_SIZE are waiting)
+SHADOW_MODELS = [p for p in os.environ.get("SHADOW_MODELS", "").split(",") if p.strip()]
+SHADOW_QUEUE_SIZE = int(os.environ.get("SHADOW_QUEUE_SIZE", 1000))
+# Inference threads: model.predict runs on a dedicated pool of INFERENCE_POOL_SIZE threads
+# (optionally pinned to INFERENCE_CPU_AFFINITY, e.g. "0-3"), single-threaded per call below
+# INFERENCE_PARALLEL_MIN_ROWS rows and on INFERENCE_THREADS threads above
+INFERENCE_POOL_SIZE = int(os.environ.get("INFERENCE_POOL_SIZE", os.cpu_count() or 1))
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", os.cpu_count() or 1))
+INFERENCE_PARALLEL_MIN_ROWS = int(os.environ.get("INFERENCE_PARALLEL_MIN_ROWS", 2000))
+INFERENCE_CPU_AFFINITY = os.environ.get("INFERENCE_CPU_AFFINITY", "")
+
+if TRUSTED_PROXIES > 0:
+    # remote_addr becomes the address the nearest trusted proxy saw
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
 
 predictor = None
 init_error = None
+# Pre-serialized responses, rebuilt with the predictor: {name: (body, mimetype, etag)}
+static_responses = {}
+comparables = None
+market_stats = None
+model_catalog = None
+job_store = None
+job_workers = []
+request_log = None
+drift_monitor = None
+shadow = None
+shadow_errors = {}
+admission = AdmissionController(RATE_LIMIT_RPS, RATE_LIMIT_BURST, {
+    "predict": ConcurrencyPool("predict", PREDICT_CONCURRENCY, PREDICT_QUEUE_TARGET_MS,
+                               max_waiting=4 * PREDICT_CONCURRENCY),
+    "batch": ConcurrencyPool("batch", BATCH_CONCURRENCY_VEHICLES, BATCH_QUEUE_TARGET_MS, max_waiting=16)
+})
 
 def try_init_predictor():
     global predictor, init_error
     try:
-        predictor = CarPricePredictor(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH)
+        predictor = CarPricePredictor(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH, inference={
+            "pool_size": INFERENCE_POOL_SIZE, "n_threads": INFERENCE_THREADS,
+            "parallel_min_rows": INFERENCE_PARALLEL_MIN_ROWS, "cpu_affinity": INFERENCE_CPU_AFFINITY
+        })
         init_error = None
     except Exception as e:
         predictor = None
@@ -32,25 +128,162 @@ def try_init_predictor():
         app.logger.error("Failed to initialize CarPricePredictor: %s", init_error)
         app.logger.debug(traceback.format_exc())
 
+def _etag(*parts):
+    """Strong ETag value derived from everything that determines a response"""
+    data = b"\x1f".join(p if isinstance(p, bytes) else str(p).encode("utf-8") for p in parts)
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def try_init_static_responses():
+    """Serialize /api/brands and the index page once per model version"""
+    global static_responses
+    static_responses = {}
+    if predictor is None:
+        return
+    try:
+        brands = dumps_json({
+            "success": True,
+            "marques": predictor.marques_acceptees,
+            "luxury_brands": predictor.luxury_brands,
+            "brand_categories": predictor.brand_categories,
+            "energies": ['Diesel', 'Essence', 'Hybride', 'Electrique', 'GPL'],
+            "boites": ['Manuelle', 'Automatique']
+        })
+        with app.app_context():
+            index_html = render_template(
+                "index.html",
+                marques=predictor.marques_acceptees,
+                energies=['Diesel', 'Essence', 'Hybride', 'Electrique', 'GPL'],
+                boites=['Manuelle', 'Automatique']
+            ).encode("utf-8")
+        static_responses = {
+            "brands": (brands, JSON_MIMETYPE, _etag(brands)),
+            "index": (index_html, "text/html; charset=utf-8", _etag(index_html))
+        }
+    except Exception as e:
+        app.logger.error("Failed to pre-serialize static responses: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_comparables():
+    global comparables
+    try:
+        comparables = charger_index(COMPARABLES_INDEX_PATH, LISTINGS_PATH)
+    except Exception as e:
+        comparables = None
+        app.logger.error("Failed to initialize comparables index: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_market_stats():
+    global market_stats
+    try:
+        market_stats = charger_cube(MARKET_STATS_PATH, LISTINGS_PATH)
+    except Exception as e:
+        market_stats = None
+        app.logger.error("Failed to initialize market stats cube: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_model_catalog():
+    global model_catalog
+    try:
+        model_catalog = charger_catalogue(MODEL_CATALOG_PATH)
+    except Exception as e:
+        model_catalog = None
+        app.logger.error("Failed to initialize model catalogue: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_jobs():
+    global job_store, job_workers
+    try:
+        store_kwargs = {"jobs_dir": JOBS_DIR, "max_running": JOB_MAX_RUNNING, "max_attempts": JOB_MAX_ATTEMPTS}
+        job_store = JobStore(**store_kwargs)
+        if JOB_WORKERS > 0:
+            job_workers = demarrer_workers(
+                JOB_WORKERS, store_kwargs, {"model_path": MODEL_PATH, "encoders_path": ENCODERS_PATH}
+            )
+    except Exception as e:
+        job_store = None
+        app.logger.error("Failed to initialize batch jobs: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_request_log():
+    global request_log
+    if not REQUEST_LOG_DIR:
+        return
+    try:
+        request_log = RequestLog(REQUEST_LOG_DIR, max_queue_rows=REQUEST_LOG_QUEUE_ROWS)
+        atexit.register(request_log.close)
+    except Exception as e:
+        request_log = None
+        app.logger.error("Failed to initialize request log: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_drift_monitor():
+    global drift_monitor
+    try:
+        drift_monitor = charger_moniteur(DRIFT_REFERENCE_PATH, window_seconds=DRIFT_WINDOW_HOURS * 3600)
+    except Exception as e:
+        drift_monitor = None
+        app.logger.error("Failed to initialize drift monitor: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
+def try_init_shadow():
+    global shadow, shadow_errors
+    if not SHADOW_MODELS or predictor is None:
+        return
+    try:
+        candidates, shadow_errors = charger_candidats(
+            [p.strip() for p in SHADOW_MODELS], predictor.transformer.feature_names_
+        )
+        for name, error in shadow_errors.items():
+            app.logger.error("Shadow candidate %s not loaded: %s", name, error)
+        if candidates:
+            shadow = ShadowEvaluator(candidates, max_queue=SHADOW_QUEUE_SIZE)
+            predictor.feature_listeners.append(shadow.submit)
+    except Exception as e:
+        shadow = None
+        app.logger.error("Failed to initialize shadow evaluation: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+
 # Initialize on startup
 try_init_predictor()
+try_init_static_responses()
+try_init_comparables()
+try_init_market_stats()
+try_init_model_catalog()
+try_init_jobs()
+try_init_request_log()
+try_init_drift_monitor()
+try_init_shadow()
+
+
+def _is_fresh(etag):
+    """True when a GET/HEAD request's If-None-Match already names this representation"""
+    return request.method in ("GET", "HEAD") and request.if_none_match.contains_weak(etag)
+
+
+def _set_cache_headers(response, etag, cache_control):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def _static_response(name, cache_control):
+    """Serve a pre-serialized response, or 304 if the client's copy is current"""
+    body, mimetype, etag = static_responses[name]
+    response = Response(status=304) if _is_fresh(etag) else Response(body, mimetype=mimetype)
+    return _set_cache_headers(response, etag, cache_control)
 
 
 @app.route("/")
 def index():
-    if predictor is None:
+    if predictor is None or "index" not in static_responses:
         return (
             "<h2>CarPricePredictor not initialized</h2>"
             f"<pre>{init_error}</pre>"
             "<p>Ensure model files exist under <code>models/</code> or set MODEL_PATH/ENCODERS_PATH.</p>"
         ), 500
 
-    return render_template(
-        "index.html",
-        marques=predictor.marques_acceptees,
-        energies=['Diesel', 'Essence', 'Hybride', 'Electrique', 'GPL'],
-        boites=['Manuelle', 'Automatique']
-    )
+    # Revalidated on every load: unchanged pages cost a 304
+    return _static_response("index", "no-cache")
 
 
 @app.route("/health", methods=["GET"])
@@ -62,26 +295,111 @@ def health():
 
 @app.route("/api/brands", methods=["GET"])
 def api_brands():
-    if predictor is None:
+    if predictor is None or "brands" not in static_responses:
         return jsonify({"success": False, "error": "Predictor not initialized"}), 500
 
-    return jsonify({
-        "success": True,
-        "marques": predictor.marques_acceptees,
-        "luxury_brands": predictor.luxury_brands,
-        "brand_categories": predictor.brand_categories,
-        "energies": ['Diesel', 'Essence', 'Hybride', 'Electrique', 'GPL'],
-        "boites": ['Manuelle', 'Automatique']
-    })
+    return _static_response("brands", f"public, max-age={API_CACHE_MAX_AGE}")
+
+
+@app.route("/api/models", methods=["GET"])
+def api_models():
+    if model_catalog is None:
+        return jsonify({"success": False, "error": "Model catalogue not available"}), 500
+
+    marque = request.args.get("marque")
+    if not marque:
+        return jsonify({"success": False, "error": 'Missing parameter "marque"'}), 400
+    try:
+        limit = int(request.args.get("limit", 10))
+        models = model_catalog.suggest(marque, request.args.get("prefix", ""), limit=limit)
+    except (KeyError, ValueError) as e:
+        return jsonify({"success": False, "error": e.args[0] if e.args else str(e)}), 400
+
+    return jsonify({"success": True, "marque": marque, "models": models})
+
+
+def _client_id():
+    """Rate-limit key: a configured API key when one is presented, otherwise the client address"""
+    key = request.headers.get("X-API-Key")
+    # Unknown keys are ignored: a fresh value per request must not buy a fresh token bucket
+    if key and any(hmac.compare_digest(key.encode(), k.encode()) for k in API_KEYS):
+        return "key:" + key
+    return request.remote_addr or "unknown"
+
+
+def admitted(pool, weight=None):
+    """Run a route under admission control (429/503 + Retry-After when rejected; pool=None: rate limit only)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            try:
+                slot = admission.admit(pool, _client_id(), weight() if weight else 1)
+            except AdmissionRejected as e:
+                response = jsonify({"success": False, "error": str(e), "reason": e.reason,
+                                    "retry_after": e.retry_after})
+                response.status_code = e.status
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response
+            with slot:
+                return view(*args, **kwargs)
+        return wrapped
+    return decorator
 
 
-@app.route("/api/predict", methods=["POST"])
+def _record_predictions(endpoint, start, inputs, outputs):
+    """Queue the request's predictions for the request log and update the drift sketches"""
+    if request_log is not None:
+        request_log.log(endpoint, predictor.model_version, (time.perf_counter() - start) * 1000, inputs, outputs)
+    if drift_monitor is not None:
+        drift_monitor.update(inputs)
+
+
+@app.route("/api/drift", methods=["GET"])
+def api_drift():
+    if drift_monitor is None:
+        return jsonify({"success": False, "error": "Drift monitor not available"}), 500
+    return _encoded_response({"success": True, **drift_monitor.scores(refresh=_flag(request.args.get("refresh")))})
+
+
+@app.route("/api/request-log", methods=["GET"])
+def api_request_log():
+    if request_log is None:
+        return jsonify({"success": False, "error": "Request log disabled"}), 500
+    return jsonify({"success": True, **request_log.stats()})
+
+
+@app.route("/api/shadow", methods=["GET"])
+def api_shadow():
+    if shadow is None:
+        return jsonify({"success": False, "error": "Shadow evaluation not enabled (set SHADOW_MODELS)",
+                        "load_errors": shadow_errors}), 500
+    return jsonify({"success": True, "primary_model_version": predictor.model_version,
+                    "load_errors": shadow_errors, **shadow.stats()})
+
+
+@app.route("/api/admission", methods=["GET"])
+def api_admission():
+    inference = predictor.executor.stats() if predictor is not None else None
+    return jsonify({"success": True, **admission.stats(), "inference": inference})
+
+
+def _flag(value):
+    """Boolean option from JSON (any truthy value) or a query string ("1", "true", "yes")"""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+@app.route("/api/predict", methods=["GET", "POST"])
+@admitted("predict")
 def api_predict():
     if predictor is None:
         return jsonify({"success": False, "error": "Predictor not initialized"}), 500
 
+    start = time.perf_counter()
     try:
-        payload = request.get_json(force=True)
+        # GET with query parameters is cacheable by browsers and CDNs (ETag + Cache-Control)
+        payload = request.args.to_dict() if request.method == "GET" else request.get_json(force=True)
         required = ['marque', 'modele', 'annee', 'kilometrage', 'energie', 'boite_vitesses', 'puissance_fiscale']
         missing = [k for k in required if k not in payload]
         if missing:
@@ -96,6 +414,27 @@ def api_predict():
         boite_vitesses = payload['boite_vitesses']
         puissance_fiscale = int(payload['puissance_fiscale'])
 
+        # Optional per-request latency budget (forest models stop early when precise enough)
+        latency_budget_ms = payload.get('latency_budget_ms', PREDICT_LATENCY_BUDGET_MS)
+        if latency_budget_ms is not None:
+            latency_budget_ms = float(latency_budget_ms)
+        explain = _flag(payload.get('explain', False))
+        k = payload.get('comparables')
+        if isinstance(k, str):
+            k = int(k) if k.isdigit() else _flag(k)
+        if k and k is not True and not 1 <= int(k) <= COMPARABLES_MAX_K:
+            return jsonify({"success": False,
+                            "error": f"comparables must be between 1 and {COMPARABLES_MAX_K}"}), 400
+
+        # Deterministic responses (full ensemble, no comparables) get an ETag from the model
+        # version, the reference year of the age computation and the inputs
+        etag = None
+        if latency_budget_ms is None and not k:
+            etag = _etag(predictor.model_version, datetime.now().year, marque, modele, annee,
+                         kilometrage, energie, boite_vitesses, puissance_fiscale, explain)
+            if _is_fresh(etag):
+                return _set_cache_headers(Response(status=304), etag, f"public, max-age={API_CACHE_MAX_AGE}")
+
         result = predictor.predict(
             marque=marque,
             modele=modele,
@@ -103,11 +442,30 @@ def api_predict():
             kilometrage=kilometrage,
             energie=energie,
             boite_vitesses=boite_vitesses,
-            puissance_fiscale=puissance_fiscale
+            puissance_fiscale=puissance_fiscale,
+            latency_budget_ms=latency_budget_ms,
+            explain=explain
         )
 
-        status = 200 if result.get("success", False) else 400
-        return jsonify(result), status
+        # Optional K nearest real listings ("comparables": true or K)
+        if k and result.get("success", False) and comparables is not None:
+            result['comparables'] = comparables.query(
+                marque, energie, result['age'], kilometrage, puissance_fiscale, boite_vitesses,
+                k=5 if k is True else int(k)
+            )['comparables']
+
+        _record_predictions("predict", start, [{
+            "marque": marque, "modele": modele, "annee": annee, "kilometrage": kilometrage,
+            "energie": energie, "boite_vitesses": boite_vitesses, "puissance_fiscale": puissance_fiscale
+        }], [result])
+        if not result.get("success", False):
+            return jsonify(result), 400
+        response = jsonify(result)
+        if etag is not None:
+            response.set_etag(etag)
+            if request.method == "GET":
+                response.headers["Cache-Control"] = f"public, max-age={API_CACHE_MAX_AGE}"
+        return response
 
     except Exception as e:
         app.logger.error("Error in /api/predict: %s", str(e))
@@ -115,19 +473,74 @@ def api_predict():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _wants_msgpack():
+    """Content negotiation on the Accept header (JSON unless MessagePack is preferred)"""
+    return request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+def _encoded_response(body, status=200):
+    """Serialize a response body containing numpy arrays as MessagePack or fast JSON"""
+    if _wants_msgpack() and msgpack_disponible():
+        return Response(pack_msgpack(body), status=status, mimetype=MSGPACK_MIMETYPE)
+    return Response(dumps_json(body), status=status, mimetype=JSON_MIMETYPE)
+
+
+def _batch_payload():
+    """Decoded /api/predict_batch body, cached for the request (also used to weight admission)"""
+    if "batch_payload" not in g:
+        if request.mimetype == MSGPACK_MIMETYPE:
+            g.batch_payload = unpack_msgpack(request.get_data())
+        else:
+            g.batch_payload = request.get_json(force=True)
+    return g.batch_payload
+
+
+def _batch_weight():
+    """Number of vehicles in the batch (1 if the body is malformed; the route reports the error)"""
+    try:
+        payload = _batch_payload()
+        if "columns" in payload:
+            return len(next(iter(payload["columns"].values())))
+        return len(payload["vehicles"])
+    except Exception:
+        return 1
+
+
 @app.route("/api/predict_batch", methods=["POST"])
+@admitted("batch", weight=_batch_weight)
 def api_predict_batch():
     if predictor is None:
         return jsonify({"success": False, "error": "Predictor not initialized"}), 500
 
+    start = time.perf_counter()
     try:
-        payload = request.get_json(force=True)
+        if request.mimetype == MSGPACK_MIMETYPE and not msgpack_disponible():
+            return jsonify({"success": False, "error": "MessagePack not supported (msgpack not installed)"}), 415
+        payload = _batch_payload()
+        if not isinstance(payload, dict):
+            return jsonify({"success": False, "error": "Request body must be an object"}), 400
+
+        # Columnar form: {"columns": {"marque": [...], ...}} -> columnar response, inputs not echoed
+        if "columns" in payload:
+            try:
+                columns = decoder_colonnes(payload["columns"])
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            results = predictor.predict_columns(columns)
+            dedup = results.pop("dedup")
+            _record_predictions("predict_batch", start, columns, results)
+            return _encoded_response({"success": True, "n": len(results["success"]), "dedup": dedup, "columns": results})
+
         vehicles = payload.get("vehicles")
         if not isinstance(vehicles, list):
             return jsonify({"success": False, "error": 'Field "vehicles" must be a list'}), 400
 
-        results = predictor.predict_batch(vehicles)
-        return jsonify({"success": True, "results": results}), 200
+        # Identical vehicles are predicted once; "dedup" reports how many were shared
+        results, dedup = predictor.predict_batch(
+            vehicles, explain=_flag(payload.get("explain", False)), return_stats=True
+        )
+        _record_predictions("predict_batch", start, vehicles, results)
+        return _encoded_response({"success": True, "dedup": dedup, "results": results})
 
     except Exception as e:
         app.logger.error("Error in /api/predict_batch: %s", str(e))
@@ -135,6 +548,168 @@ def api_predict_batch():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/api/jobs", methods=["POST"])
+@admitted(None)
+def api_create_job():
+    if job_store is None:
+        return jsonify({"success": False, "error": "Batch jobs not available"}), 500
+
+    try:
+        # CSV body (text/csv) or JSON body ({"vehicles": [...]} or {"columns": {...}})
+        fmt = "csv" if request.mimetype in ("text/csv", "application/csv") else "json"
+        # Read at most JOB_MAX_BYTES + 1 bytes: an oversized body is never buffered or written to disk
+        if request.content_length is not None and request.content_length > JOB_MAX_BYTES:
+            data = None
+        else:
+            data = request.stream.read(JOB_MAX_BYTES + 1)
+        if data is None or len(data) > JOB_MAX_BYTES:
+            return jsonify({"success": False, "error": f"Request body larger than {JOB_MAX_BYTES} bytes"}), 413
+        if not data:
+            return jsonify({"success": False, "error": "Empty request body"}), 400
+        job_id = job_store.create(data, fmt, chunk_size=JOB_CHUNK_SIZE)
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "results_url": f"/api/jobs/{job_id}/results"
+        }), 202
+
+    except Exception as e:
+        app.logger.error("Error in /api/jobs: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    if job_store is None:
+        return jsonify({"success": False, "error": "Batch jobs not available"}), 500
+
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job: {job_id}"}), 404
+    return jsonify({"success": True, **job})
+
+
+@app.route("/api/jobs/<job_id>/results", methods=["GET"])
+def api_job_results(job_id):
+    if job_store is None:
+        return jsonify({"success": False, "error": "Batch jobs not available"}), 500
+
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job: {job_id}"}), 404
+    if job["status"] != "done":
+        return jsonify({"success": False, "error": f"Job is {job['status']}", "progress": job["progress"]}), 409
+
+    # Streamed chunk by chunk from the result files
+    return Response(
+        job_store.iter_results(job_id), mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=predictions_{job_id}.csv"}
+    )
+
+
+@app.route("/api/comparables", methods=["POST"])
+@admitted("predict")
+def api_comparables():
+    if comparables is None:
+        return jsonify({"success": False, "error": "Comparables index not available"}), 500
+
+    try:
+        payload = request.get_json(force=True)
+        required = ['marque', 'kilometrage', 'energie', 'puissance_fiscale']
+        missing = [k for k in required if k not in payload]
+        if 'annee' not in payload and 'age' not in payload:
+            missing.append('annee')
+        if missing:
+            return jsonify({"success": False, "error": f"Missing fields: {missing}"}), 400
+
+        k = int(payload.get('k', 5))
+        if not 1 <= k <= COMPARABLES_MAX_K:
+            return jsonify({"success": False, "error": f"k must be between 1 and {COMPARABLES_MAX_K}"}), 400
+
+        age = float(payload['age']) if 'age' in payload else datetime.now().year - int(payload['annee'])
+        result = comparables.query(
+            marque=payload['marque'],
+            energie=payload['energie'],
+            age=age,
+            kilometrage=float(payload['kilometrage']),
+            puissance_fiscale=float(payload['puissance_fiscale']),
+            boite_vitesses=payload.get('boite_vitesses'),
+            k=k
+        )
+        return jsonify({"success": True, **result}), 200
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        app.logger.error("Error in /api/comparables: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/market-stats", methods=["GET"])
+def api_market_stats():
+    if market_stats is None:
+        return jsonify({"success": False, "error": "Market stats not available"}), 500
+
+    try:
+        # Filters: ?marque=PEUGEOT,VW&age=5&energie=Diesel ; grouping: ?group_by=energie,age
+        dims = {dim.lower(): dim for dim in MARKET_DIMENSIONS}
+        filters = {}
+        for name, dim in dims.items():
+            values = [v for arg in request.args.getlist(name) for v in arg.split(",") if v]
+            if values:
+                filters[dim] = [market_stats.parse_value(dim, v) for v in values]
+        group_by = [dims.get(g.lower(), g) for g in request.args.get("group_by", "").split(",") if g]
+        quantiles = request.args.get("quantiles")
+        quantiles = [float(q) for q in quantiles.split(",")] if quantiles else DEFAULT_QUANTILES
+        if any(not 0 <= q <= 1 for q in quantiles):
+            return jsonify({"success": False, "error": "Quantiles must be between 0 and 1"}), 400
+
+        groups = market_stats.query(filters, group_by, quantiles)
+        return jsonify({"success": True, "n_listings": market_stats.n_listings, "groups": groups}), 200
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        app.logger.error("Error in /api/market-stats: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _curve_weight():
+    """Number of grid points (1 if the body is malformed; the route reports the error)"""
+    try:
+        return predictor.curve_points(request.get_json(force=True).get("axes"))
+    except Exception:
+        return 1
+
+
+@app.route("/api/curve", methods=["POST"])
+@admitted("batch", weight=_curve_weight)
+def api_curve():
+    if predictor is None:
+        return jsonify({"success": False, "error": "Predictor not initialized"}), 500
+
+    try:
+        payload = request.get_json(force=True)
+        vehicle = payload.get("vehicle")
+        axes = payload.get("axes")
+        if not isinstance(vehicle, dict):
+            return jsonify({"success": False, "error": 'Field "vehicle" must be an object'}), 400
+
+        # Whole grid predicted in one batched call
+        result = predictor.predict_curve(vehicle, axes)
+        status = 200 if result.get("success", False) else 400
+        return jsonify(result), status
+
+    except Exception as e:
+        app.logger.error("Error in /api/curve: %s", str(e))
+        app.logger.debug(traceback.format_exc())
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 if __name__ == "__main__":
     # When running locally, this starts a debug server. Use gunicorn/waitress in production.
     port = int(os.environ.get("PORT", 5000))
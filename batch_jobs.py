@@ -0,0 +1,509 @@
+"""
+Batch Jobs - File de travaux de prédiction asynchrones
+=======================================================
+
+Les très gros lots de revalorisation ne tiennent pas dans un cycle
+requête/réponse de /api/predict_batch. Ils passent par une file de travaux :
+
+- POST /api/jobs enregistre l'entrée (JSON ou CSV) sur disque et crée le
+  travail dans une base SQLite (la file survit au redémarrage du serveur)
+- des processus workers réclament les travaux en attente et les évaluent par
+  blocs via CarPricePredictor.predict_columns ; chaque bloc est écrit dans
+  son propre fichier de résultats puis la progression est enregistrée
+- un travail interrompu (worker arrêté, serveur redémarré) est remis en file
+  quand son heartbeat est trop ancien et reprend au premier bloc non terminé ;
+  après `max_attempts` réclamations, il est marqué en échec (un travail qui
+  tue son worker n'occupe pas la file indéfiniment)
+- chaque réclamation est un bail (worker + numéro de tentative) : un worker
+  dont le travail a été remis en file ne peut plus écrire sa progression
+
+Le nombre de travaux exécutés en même temps est plafonné dans la base (pour
+tous les processus web), et les workers tournent avec une priorité réduite et
+un seul thread de prédiction : le batch n'affame pas les prédictions
+interactives.
+
+Les workers tournent normalement hors du serveur web (commande `worker`
+ci-dessous). Lancés par le serveur (JOB_WORKERS > 0), un verrou dans le
+répertoire des travaux garantit qu'un seul processus web les démarre, même
+avec plusieurs workers gunicorn ou le reloader de Flask.
+
+Usage:
+------
+    python batch_jobs.py worker --workers 2          # workers dédiés
+    python batch_jobs.py submit vehicules.csv        # soumission hors API
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou du lanceur
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+
+JOBS_DIR = os.path.join('Data', 'build', 'jobs')
+CHUNK_SIZE = 5000
+STALE_AFTER_S = 120
+MAX_ATTEMPTS = 3
+POLL_INTERVAL_S = 1.0
+LAUNCHER_LOCK = 'workers.lock'
+
+INPUT_FORMATS = ('json', 'csv')
+RESULT_COLUMNS = ['row', 'success', 'prix_predit', 'prix_min', 'prix_max', 'error']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    format      TEXT NOT NULL,
+    chunk_size  INTEGER NOT NULL,
+    n_total     INTEGER,
+    n_done      INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    heartbeat   REAL,
+    worker      TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+class LeaseLost(Exception):
+    """Le travail a été remis en file (ou terminé) pendant que ce worker l'exécutait"""
+
+
+class JobStore:
+    """
+    File de travaux persistante (SQLite + fichiers d'entrée et de résultats).
+
+    Parameters:
+    -----------
+    jobs_dir : str
+        Répertoire de la base et des fichiers des travaux
+    max_running : int
+        Nombre maximal de travaux exécutés simultanément (tous workers confondus)
+    stale_after : float
+        Délai (s) sans heartbeat après lequel un travail en cours est remis en file
+    max_attempts : int
+        Nombre de réclamations après lequel un travail interrompu est marqué en échec
+    """
+
+    def __init__(self, jobs_dir=JOBS_DIR, max_running=1, stale_after=STALE_AFTER_S, max_attempts=MAX_ATTEMPTS):
+        self.jobs_dir = jobs_dir
+        self.max_running = max_running
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.db_path = os.path.join(jobs_dir, 'jobs.sqlite')
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # isolation_level=None: transactions explicites (BEGIN IMMEDIATE) pour la réclamation
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _execute(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).rowcount
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def input_path(self, job_id, fmt):
+        return os.path.join(self.job_dir(job_id), f'input.{fmt}')
+
+    def part_path(self, job_id, chunk_index):
+        return os.path.join(self.job_dir(job_id), f'part-{chunk_index:06d}.csv')
+
+    # ------------------------------------------------------------------
+    # API côté serveur web
+    # ------------------------------------------------------------------
+
+    def create(self, data, fmt, chunk_size=CHUNK_SIZE):
+        """
+        Enregistre l'entrée d'un travail et le met en file.
+
+        Parameters:
+        -----------
+        data : bytes
+            Contenu de la requête (JSON ou CSV)
+        fmt : str
+            'json' ou 'csv'
+        chunk_size : int
+            Nombre de véhicules évalués par bloc
+
+        Returns:
+        --------
+        str
+            Identifiant du travail
+        """
+        if fmt not in INPUT_FORMATS:
+            raise ValueError(f"Format non supporté: {fmt}. Formats acceptés: {INPUT_FORMATS}")
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        with open(self.input_path(job_id, fmt), 'wb') as f:
+            f.write(data)
+        self._execute(
+            "INSERT INTO jobs (id, status, format, chunk_size, created_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, fmt, int(chunk_size), time.time())
+        )
+        return job_id
+
+    def get(self, job_id):
+        """État d'un travail (dict) ou None s'il n'existe pas"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['progress'] = job['n_done'] / job['n_total'] if job['n_total'] else 0.0
+        return job
+
+    def iter_results(self, job_id):
+        """Résultats d'un travail terminé, en CSV, bloc par bloc"""
+        job = self.get(job_id)
+        yield (','.join(RESULT_COLUMNS) + '\n').encode('utf-8')
+        n_chunks = -(-job['n_total'] // job['chunk_size']) if job['n_total'] else 0
+        for chunk_index in range(n_chunks):
+            with open(self.part_path(job_id, chunk_index), 'rb') as f:
+                yield f.read()
+
+    # ------------------------------------------------------------------
+    # API côté workers
+    # ------------------------------------------------------------------
+
+    def claim(self, worker):
+        """
+        Réclame le plus ancien travail en file, si le plafond le permet.
+
+        Les travaux en cours dont le heartbeat est trop ancien sont d'abord
+        remis en file (worker arrêté ou serveur redémarré), ou marqués en
+        échec s'ils ont déjà été réclamés max_attempts fois.
+
+        Returns:
+        --------
+        dict ou None
+            Le travail, avec worker et attempts de ce bail (à transmettre à
+            progress, heartbeat, finish et fail)
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                stale = now - self.stale_after
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', worker = NULL, finished_at = ?, error = ? "
+                    "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                    (now, f"Abandonné après {self.max_attempts} tentatives interrompues "
+                          f"(worker arrêté sans heartbeat)", stale, self.max_attempts)
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL "
+                    "WHERE status = 'running' AND heartbeat < ?",
+                    (stale,)
+                )
+                running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+                row = None
+                if running < self.max_running:
+                    row = conn.execute(
+                        "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                    ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, "
+                        "started_at = COALESCE(started_at, ?), attempts = attempts + 1 WHERE id = ?",
+                        (worker, now, now, row['id'])
+                    )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        return dict(row, status='running', worker=worker, heartbeat=now, attempts=row['attempts'] + 1)
+
+    # Écritures d'un worker: seulement tant que son bail (worker + tentative) est valide
+    _LEASE = "WHERE id = ? AND status = 'running' AND worker = ? AND attempts = ?"
+
+    def _update_lease(self, job, assignments, params):
+        """Met à jour un travail sous bail ; lève LeaseLost si le bail a expiré"""
+        updated = self._execute(
+            f"UPDATE jobs SET {assignments} {self._LEASE}",
+            tuple(params) + (job['id'], job['worker'], job['attempts'])
+        )
+        if not updated:
+            raise LeaseLost(f"Travail {job['id']} remis en file ou terminé par un autre worker")
+
+    def heartbeat(self, job):
+        """Prolonge le bail d'un travail en cours"""
+        self._update_lease(job, "heartbeat = ?", (time.time(),))
+
+    def progress(self, job, n_done, n_total):
+        """Enregistre la progression (et le heartbeat) d'un travail"""
+        self._update_lease(job, "n_done = ?, n_total = ?, heartbeat = ?", (int(n_done), int(n_total), time.time()))
+
+    def finish(self, job):
+        self._update_lease(job, "status = 'done', finished_at = ?, error = NULL", (time.time(),))
+
+    def fail(self, job, error):
+        self._update_lease(job, "status = 'failed', finished_at = ?, error = ?", (time.time(), str(error)))
+
+
+def lire_entree(path, fmt):
+    """
+    Lit l'entrée d'un travail.
+
+    JSON accepté: {"vehicles": [...]}, {"columns": {...}} ou une liste de
+    véhicules ; CSV: une colonne par champ (marque, annee, kilometrage...).
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    if fmt == 'csv':
+        return pd.read_csv(path, encoding='utf-8-sig')
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    if isinstance(payload, list):
+        return pd.DataFrame(payload)
+    if isinstance(payload, dict) and isinstance(payload.get('vehicles'), list):
+        return pd.DataFrame(payload['vehicles'])
+    if isinstance(payload, dict) and isinstance(payload.get('columns'), dict):
+        return pd.DataFrame(payload['columns'])
+    raise ValueError('Entrée JSON attendue: {"vehicles": [...]}, {"columns": {...}} ou une liste')
+
+
+def traiter_job(store, predictor, job):
+    """
+    Évalue un travail bloc par bloc, en reprenant après le dernier bloc terminé.
+
+    Chaque bloc est écrit dans un fichier temporaire renommé une fois complet,
+    puis la progression est enregistrée : un arrêt en cours de bloc ne laisse
+    pas de résultat partiel. Un thread prolonge le bail pendant les blocs
+    longs ; si le bail est perdu, LeaseLost est levée au bloc suivant.
+    """
+    job_id, chunk_size = job['id'], job['chunk_size']
+    stop = threading.Event()
+    lost = []
+
+    def prolonger_bail():
+        while not stop.wait(store.stale_after / 4):
+            try:
+                store.heartbeat(job)
+            except LeaseLost as e:
+                lost.append(e)
+                return
+            except Exception:
+                # Base momentanément verrouillée: nouvel essai au prochain intervalle
+                continue
+
+    thread = threading.Thread(target=prolonger_bail, name=f'job-heartbeat-{job_id}', daemon=True)
+    thread.start()
+    try:
+        df = lire_entree(store.input_path(job_id, job['format']), job['format'])
+        n_total = len(df)
+        start = job['n_done'] - job['n_done'] % chunk_size
+        store.progress(job, start, n_total)
+
+        for start in range(start, n_total, chunk_size):
+            if lost:
+                raise lost[0]
+            chunk = df.iloc[start:start + chunk_size]
+            results = predictor.predict_columns({col: chunk[col].to_numpy() for col in chunk.columns})
+            results.pop('dedup', None)
+            out = pd.DataFrame({'row': np.arange(start, start + len(chunk)), **results}, columns=RESULT_COLUMNS)
+
+            # Fichier propre à la tentative: un worker qui a perdu son bail ne remplace pas
+            # un bloc écrit par le nouveau titulaire
+            part = store.part_path(job_id, start // chunk_size)
+            tmp = f"{part}.{job['attempts']}.tmp"
+            out.to_csv(tmp, index=False, header=False)
+            try:
+                store.heartbeat(job)
+            except LeaseLost:
+                os.remove(tmp)
+                raise
+            os.replace(tmp, part)
+            store.progress(job, start + len(chunk), n_total)
+        store.finish(job)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def boucle_worker(store_kwargs, predictor_kwargs, poll_interval=POLL_INTERVAL_S, max_jobs=None, parent_pid=None):
+    """
+    Boucle d'un processus worker: réclame et exécute les travaux en file.
+
+    Parameters:
+    -----------
+    store_kwargs : dict
+        Arguments de JobStore
+    predictor_kwargs : dict
+        Arguments de CarPricePredictor (model_path, encoders_path...)
+    poll_interval : float
+        Attente (s) quand la file est vide
+    max_jobs : int, optional
+        Nombre de travaux à traiter avant de s'arrêter (illimité par défaut)
+    parent_pid : int, optional
+        Le worker s'arrête quand ce processus parent disparaît
+    """
+    # Priorité réduite: les prédictions interactives passent avant le batch
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+    from car_price_predictor import CarPricePredictor
+    # Un seul thread de calcul par worker (parallélisme par défaut de CarPricePredictor)
+    predictor = CarPricePredictor(**predictor_kwargs)
+    store = JobStore(**store_kwargs)
+    worker = f"{os.uname().nodename if hasattr(os, 'uname') else 'local'}:{os.getpid()}"
+
+    n_jobs = 0
+    while max_jobs is None or n_jobs < max_jobs:
+        if parent_pid is not None and os.getppid() != parent_pid:
+            break
+        job = store.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            traiter_job(store, predictor, job)
+        except LeaseLost:
+            pass
+        except Exception as e:
+            try:
+                store.fail(job, e)
+            except LeaseLost:
+                pass
+        n_jobs += 1
+
+
+_launcher_lock = None
+
+
+def verrouiller_lanceur(jobs_dir):
+    """
+    Prend le verrou exclusif du lanceur de workers pour ce processus.
+
+    Le verrou est gardé jusqu'à la fin du processus (il est libéré par le
+    système s'il meurt) : un autre processus web ne lance pas de workers en
+    double.
+
+    Returns:
+    --------
+    bool
+        False si un autre processus détient déjà le verrou
+    """
+    global _launcher_lock
+    if _launcher_lock is not None or fcntl is None:
+        return True
+    os.makedirs(jobs_dir, exist_ok=True)
+    f = open(os.path.join(jobs_dir, LAUNCHER_LOCK), 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _launcher_lock = f
+    return True
+
+
+def demarrer_workers(n_workers, store_kwargs, predictor_kwargs):
+    """
+    Lance les workers dans des processus indépendants du serveur web.
+
+    Chaque worker exécute `python batch_jobs.py worker` et s'arrête avec le
+    processus qui l'a lancé ; un travail interrompu est repris par le
+    prochain worker grâce à la file SQLite. Seul le processus qui obtient le
+    verrou du lanceur (voir verrouiller_lanceur) démarre des workers.
+
+    Returns:
+    --------
+    list of subprocess.Popen
+        Vide si un autre processus a déjà lancé les workers
+    """
+    if not verrouiller_lanceur(store_kwargs['jobs_dir']):
+        return []
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        '--jobs-dir', store_kwargs['jobs_dir'], '--max-running', str(store_kwargs['max_running']),
+        '--max-attempts', str(store_kwargs.get('max_attempts', MAX_ATTEMPTS)),
+        'worker', '--workers', '1', '--parent-pid', str(os.getpid()),
+        '--model', predictor_kwargs['model_path'], '--encoders', predictor_kwargs['encoders_path']
+    ]
+    return [subprocess.Popen(command) for _ in range(n_workers)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="File de travaux de prédiction")
+    parser.add_argument('--jobs-dir', default=JOBS_DIR)
+    parser.add_argument('--max-running', type=int, default=1)
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    worker_parser = subparsers.add_parser('worker', help="Exécuter des workers")
+    worker_parser.add_argument('--workers', type=int, default=1)
+    worker_parser.add_argument('--model', default=os.path.join('models', 'extra_trees_tuned.pkl'))
+    worker_parser.add_argument('--encoders', default=os.path.join('models', 'encoders.pkl'))
+    worker_parser.add_argument('--parent-pid', type=int, default=None, help=argparse.SUPPRESS)
+
+    submit_parser = subparsers.add_parser('submit', help="Soumettre un fichier JSON ou CSV")
+    submit_parser.add_argument('path')
+    submit_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    store_kwargs = {'jobs_dir': args.jobs_dir, 'max_running': args.max_running, 'max_attempts': args.max_attempts}
+    if args.command == 'submit':
+        fmt = 'csv' if args.path.lower().endswith('.csv') else 'json'
+        with open(args.path, 'rb') as f:
+            job_id = JobStore(**store_kwargs).create(f.read(), fmt, args.chunk_size)
+        print(f"✅ Travail créé: {job_id}")
+        return
+
+    predictor_kwargs = {'model_path': args.model, 'encoders_path': args.encoders}
+    if args.workers == 1:
+        boucle_worker(store_kwargs, predictor_kwargs, parent_pid=args.parent_pid)
+        return
+
+    print("=" * 70)
+    print(f"⚙️  WORKERS DE PRÉDICTION: {args.workers} (max {args.max_running} travaux simultanés)")
+    print("=" * 70)
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=boucle_worker, args=(store_kwargs, predictor_kwargs),
+                        kwargs={'parent_pid': os.getpid()}, daemon=True)
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
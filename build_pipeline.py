@@ -0,0 +1,560 @@
+"""
+Build Pipeline - Chaîne de construction incrémentale des données et du modèle
+==============================================================================
+
+Ce module remplace l'exécution manuelle des notebooks (nettoyage par source,
+concaténation, entraînement) par un pipeline déclaratif à la manière de make :
+
+    fichiers scrapés → nettoyage par source → concaténation → dédoublonnage
+        → matrice de features → entraînement (+ holdout) → export du modèle
+                                              → profil de référence de la dérive
+
+Chaque étape est identifiée par une empreinte (hash SHA-256) calculée sur le
+contenu de ses entrées, de son code et de ses paramètres. Une étape dont
+l'empreinte n'a pas changé et dont les sorties sont intactes est sautée.
+Les étapes indépendantes (nettoyage des différentes sources) sont exécutées
+en parallèle dans des processus séparés.
+
+Usage:
+------
+    python build_pipeline.py                 # construit tout ce qui est périmé
+    python build_pipeline.py --dry-run       # affiche ce qui serait reconstruit
+    python build_pipeline.py --force concat  # force une étape (et ses dépendantes)
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join('Data', 'build')
+STATE_PATH = os.path.join(BUILD_DIR, '.pipeline_state.json')
+DEDUP_PATH = os.path.join(BUILD_DIR, 'dataset_final_dedup.csv')
+HOLDOUT_PATH = os.path.join(BUILD_DIR, 'holdout.csv')
+HOLDOUT_SPLIT_PATH = os.path.join(BUILD_DIR, 'holdout_split.json')
+HOLDOUT_FRACTION = 0.2
+RANDOM_STATE = 42
+
+
+# ============================================================================
+# EMPREINTES
+# ============================================================================
+
+def hash_file(path, chunk_size=1 << 20):
+    """Calcule le hash SHA-256 du contenu d'un fichier"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FileHashCache:
+    """
+    Cache des hashes de fichiers indexé par (taille, mtime).
+
+    Un fichier n'est relu que si sa taille ou sa date de modification a
+    changé depuis le dernier calcul, ce qui évite de re-hasher tout l'historique
+    des fichiers scrapés à chaque exécution.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = os.path.relpath(path, ROOT_DIR)
+        cached = self.entries.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hash_file(path)
+        self.entries[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+
+def expand_paths(patterns):
+    """Résout une liste de chemins ou de motifs glob en chemins triés"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.join(ROOT_DIR, pattern)))
+        paths.extend(matches)
+    return paths
+
+
+# ============================================================================
+# DÉCLARATION DES ÉTAPES
+# ============================================================================
+
+class Stage:
+    """
+    Étape du pipeline.
+
+    Attributes:
+    -----------
+    name : str
+        Nom unique de l'étape
+    func : callable
+        Fonction de niveau module appelée avec ``func(inputs, outputs, **params)``
+    inputs : list of str
+        Fichiers ou motifs glob lus par l'étape (relatifs à la racine du projet)
+    outputs : list of str
+        Fichiers produits par l'étape
+    deps : list of str
+        Étapes amont ; leurs sorties sont ajoutées aux entrées
+    params : dict
+        Paramètres sérialisables en JSON transmis à ``func``
+    code : list of str
+        Fichiers de code (notebooks, scripts, modules) dont dépend l'étape
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), deps=(), params=None, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.code = list(code)
+
+    def fingerprint(self, input_paths, hash_cache):
+        """Empreinte de l'étape: code, paramètres et contenu des entrées"""
+        h = hashlib.sha256()
+        h.update(self.name.encode())
+        h.update(f"{self.func.__module__}.{self.func.__qualname__}".encode())
+        h.update(hashlib.sha256(inspect.getsource(self.func).encode()).hexdigest().encode())
+        h.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        for path in expand_paths(self.code) + input_paths:
+            h.update(os.path.relpath(path, ROOT_DIR).encode())
+            h.update(hash_cache.get(path).encode())
+        return h.hexdigest()
+
+
+def _run_stage(func, inputs, outputs, params):
+    """Point d'entrée exécuté dans un processus de travail"""
+    os.chdir(ROOT_DIR)
+    for output in outputs:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    func(inputs, outputs, **params)
+    return outputs
+
+
+# ============================================================================
+# FONCTIONS DES ÉTAPES
+# ============================================================================
+
+def executer_nettoyage(inputs, outputs, script):
+    """
+    Exécute un notebook ou un script de nettoyage sur une liste de fichiers bruts.
+
+    La liste des fichiers et le chemin de sortie sont transmis via les
+    variables d'environnement PIPELINE_RAW_FILES et PIPELINE_OUTPUT_CSV.
+    """
+    env = dict(os.environ)
+    env['PIPELINE_RAW_FILES'] = os.pathsep.join(os.path.abspath(p) for p in inputs)
+    env['PIPELINE_OUTPUT_CSV'] = os.path.abspath(outputs[0])
+    script_path = os.path.join(ROOT_DIR, script)
+    cwd = os.path.dirname(script_path)
+
+    if script.endswith('.ipynb'):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cmd = [
+                sys.executable, '-m', 'jupyter', 'nbconvert', '--to', 'notebook',
+                '--execute', '--output-dir', tmp_dir, script_path
+            ]
+            subprocess.run(cmd, cwd=cwd, env=env, check=True)
+    else:
+        subprocess.run([sys.executable, script_path], cwd=cwd, env=env, check=True)
+
+
+def etape_concatenation(inputs, outputs, sources):
+    """Concatène les sources nettoyées (voir dataset_concat.py)"""
+    from dataset_concat import concatener_sources
+
+    df = concatener_sources(sources)
+    df.to_csv(outputs[0], index=False, encoding='utf-8-sig')
+
+
+def etape_dedup(inputs, outputs):
+    """Détecte les doublons entre sources et écrit la table des groupes (voir dedup_listings.py)"""
+    from dedup_listings import appliquer_dedup, detecter_doublons
+
+    df = pd.read_csv(inputs[0], encoding='utf-8-sig')
+    groups = detecter_doublons(df)
+    appliquer_dedup(df, groups).to_csv(outputs[0], index=False, encoding='utf-8-sig')
+    groups.to_csv(outputs[1], index=False, encoding='utf-8-sig')
+
+
+def preparer_dataset(df):
+    """Annonces avec prix, valeurs numériques manquantes remplacées par la médiane"""
+    df = df.dropna(subset=['Prix']).copy()
+    for col in df.select_dtypes(include=[np.number]).columns:
+        df[col] = df[col].fillna(df[col].median())
+    return df.reset_index(drop=True)
+
+
+def separer_holdout(n, test_size=HOLDOUT_FRACTION):
+    """
+    Split reproductible entraînement / holdout des lignes de la matrice de features.
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        (indices d'entraînement, indices du holdout)
+    """
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(n), test_size=test_size, random_state=RANDOM_STATE, shuffle=True)
+
+
+def identifiant_split(dataset_path):
+    """
+    Identifiant du split entraînement / holdout : contenu du dataset, fraction et graine.
+
+    Enregistré sur le modèle entraîné (attribut holdout_split_) et dans
+    Data/build/holdout_split.json : la porte holdout n'évalue que les modèles
+    entraînés sur ce split.
+    """
+    cle = f"{hash_file(dataset_path)}:{HOLDOUT_FRACTION}:{RANDOM_STATE}"
+    return hashlib.sha256(cle.encode()).hexdigest()[:16]
+
+
+def etape_features(inputs, outputs):
+    """Apprend le CarFeatureTransformer et construit la matrice de features"""
+    from feature_transformer import CarFeatureTransformer
+
+    df = preparer_dataset(pd.read_csv(inputs[0], encoding='utf-8-sig'))
+
+    transformer = CarFeatureTransformer().fit(df)
+    features = transformer.transform(df)
+    features_path, encoders_path, transformer_path = outputs
+    np.savez(
+        features_path,
+        X=features.to_numpy(dtype=float),
+        y=df['Prix'].to_numpy(dtype=float),
+        feature_names=np.array(transformer.feature_names_)
+    )
+    transformer.save(transformer_path)
+    # encoders.pkl reste produit pour les notebooks existants
+    with open(encoders_path, 'wb') as f:
+        pickle.dump(transformer.to_encoders(), f)
+
+
+def etape_entrainement(inputs, outputs, model_params):
+    """
+    Entraîne l'Extra Trees sur la matrice de features, hors holdout.
+
+    Les annonces du holdout sont écrites telles quelles (avant transformation)
+    dans Data/build/holdout.csv : la porte holdout du réentraînement
+    incrémental, le pruning, la distillation et le stockage compact évaluent
+    le modèle servi sur ces annonces qu'il n'a pas vues. L'identifiant du
+    split est gardé sur le modèle et dans Data/build/holdout_split.json.
+    """
+    from sklearn.ensemble import ExtraTreesRegressor
+
+    data = np.load(inputs[0], allow_pickle=True)
+    df = preparer_dataset(pd.read_csv(inputs[1], encoding='utf-8-sig'))
+    if len(df) != len(data['y']):
+        raise ValueError(f"Matrice de features ({len(data['y'])} lignes) et dataset ({len(df)} lignes) désalignés")
+
+    train_idx, holdout_idx = separer_holdout(len(df))
+    split = identifiant_split(inputs[1])
+    # Noms en str (et non np.str_) pour que le modèle enregistre feature_names_in_
+    X = pd.DataFrame(data['X'], columns=[str(name) for name in data['feature_names']])
+    model = ExtraTreesRegressor(**model_params)
+    model.fit(X.iloc[train_idx], data['y'][train_idx])
+    model.holdout_split_ = split
+    model_path, holdout_path, split_path = outputs
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    df.iloc[holdout_idx].to_csv(holdout_path, index=False, encoding='utf-8-sig')
+    with open(split_path, 'w', encoding='utf-8') as f:
+        json.dump({'split': split, 'holdout_fraction': HOLDOUT_FRACTION, 'random_state': RANDOM_STATE,
+                   'n_train': len(train_idx), 'n_holdout': len(holdout_idx)}, f, indent=2)
+
+
+def lignes_entrainement(dataset_path=DEDUP_PATH):
+    """Annonces (avant transformation) sur lesquelles l'étape train entraîne le modèle"""
+    df = preparer_dataset(pd.read_csv(dataset_path, encoding='utf-8-sig'))
+    train_idx, _ = separer_holdout(len(df))
+    return df.iloc[train_idx]
+
+
+def etape_reference_derive(inputs, outputs, dataset_path):
+    """Profil des features d'entrée des lignes d'entraînement du modèle (voir drift_monitor.py)"""
+    from drift_monitor import construire_reference, sauvegarder_reference
+
+    sauvegarder_reference(construire_reference(lignes_entrainement(dataset_path)), outputs[0])
+
+
+def etape_export(inputs, outputs, encoders_path, transformer_path, model_path):
+    """
+    Copie le modèle, le transformer, les encodeurs et les noms de features dans models/.
+
+    Les chemins des artefacts sont passés par nom : les entrées de l'étape
+    reçoivent aussi les autres sorties de train (holdout).
+    """
+    from feature_transformer import CarFeatureTransformer
+
+    model_out, transformer_out, encoders_out, names_out = outputs
+
+    shutil.copyfile(model_path, model_out)
+    shutil.copyfile(transformer_path, transformer_out)
+    shutil.copyfile(encoders_path, encoders_out)
+    # L'ordre des features vient du transformer, pas de l'ordre d'insertion d'un dict
+    with open(names_out, 'wb') as f:
+        pickle.dump(CarFeatureTransformer.load(transformer_path).feature_names_, f)
+
+
+def definir_stages():
+    """Déclare les étapes du pipeline de construction"""
+    cleaned_dir = os.path.join(BUILD_DIR, 'cleaned')
+    nettoyages = {
+        # source: (nom de l'étape, motif des fichiers bruts, notebook/script)
+        'Baniola': ('clean_baniola', 'website2/baniola_multi_modeles_*.csv', 'website2/clean.py'),
+        'Automobile.tn Neuf': ('clean_automobile_tn_neuf', 'Data/row/automobile_tn_20*.csv',
+                               'cleaning/automobile_tn_neuf_cleaning.ipynb'),
+        'Automobile.tn Occasion': ('clean_automobile_tn_occasion', 'Data/row/automobile_tn_occasion_*.csv',
+                                   'cleaning/automobile_tn_occasion_cleaning.ipynb'),
+        'Spark Auto': ('clean_spark_auto', 'Data/row/spark_auto_voitures_*.csv',
+                       'cleaning/spark_auto_cleaning.ipynb'),
+    }
+
+    stages = []
+    sources = {'Autre Sites': 'Data/cleaned/autre_sites_cleaned.csv'}
+    for source, (name, raw_pattern, script) in nettoyages.items():
+        output = os.path.join(cleaned_dir, name.replace('clean_', '') + '.csv')
+        stages.append(Stage(
+            name, executer_nettoyage,
+            inputs=[raw_pattern], outputs=[output],
+            params={'script': script}, code=[script]
+        ))
+        sources[source] = output
+
+    dataset_path = 'Data/cleaned/dataset_final_complet_grand.csv'
+    dedup_path = DEDUP_PATH
+    features_path = os.path.join(BUILD_DIR, 'features.npz')
+    encoders_path = os.path.join(BUILD_DIR, 'encoders.pkl')
+    transformer_path = os.path.join(BUILD_DIR, 'feature_transformer.pkl')
+    model_path = os.path.join(BUILD_DIR, 'extra_trees.pkl')
+
+    stages.append(Stage(
+        'concat', etape_concatenation,
+        inputs=[sources['Autre Sites']], outputs=[dataset_path],
+        deps=[s.name for s in stages], params={'sources': sources},
+        code=['dataset_concat.py']
+    ))
+    stages.append(Stage(
+        'dedup', etape_dedup,
+        outputs=[dedup_path, 'Data/cleaned/duplicate_groups.csv'], deps=['concat'],
+        code=['dedup_listings.py']
+    ))
+    stages.append(Stage(
+        'features', etape_features,
+        inputs=[dedup_path], outputs=[features_path, encoders_path, transformer_path], deps=['dedup'],
+        code=['feature_transformer.py']
+    ))
+    stages.append(Stage(
+        'train', etape_entrainement,
+        inputs=[features_path, dedup_path], outputs=[model_path, HOLDOUT_PATH, HOLDOUT_SPLIT_PATH], deps=['features', 'dedup'],
+        params={'model_params': {
+            'n_estimators': 100, 'max_depth': 15, 'min_samples_split': 5,
+            'min_samples_leaf': 2, 'random_state': 42, 'n_jobs': -1
+        }}
+    ))
+    stages.append(Stage(
+        'export', etape_export,
+        inputs=[encoders_path, transformer_path, model_path],
+        outputs=['models/extra_trees_tuned.pkl', 'models/feature_transformer.pkl',
+                 'models/encoders.pkl', 'models/feature_names.pkl'],
+        deps=['train'],
+        params={'encoders_path': encoders_path, 'transformer_path': transformer_path, 'model_path': model_path}
+    ))
+    stages.append(Stage(
+        'drift_reference', etape_reference_derive,
+        inputs=[dedup_path], outputs=['models/drift_reference.json'], deps=['train'],
+        params={'dataset_path': dedup_path}, code=['drift_monitor.py']
+    ))
+    return stages
+
+
+# ============================================================================
+# EXÉCUTION
+# ============================================================================
+
+class PipelineRunner:
+    """
+    Exécute les étapes périmées du pipeline dans l'ordre des dépendances.
+
+    Parameters:
+    -----------
+    stages : list of Stage
+        Étapes déclarées
+    state_path : str
+        Fichier JSON contenant les empreintes de la dernière exécution
+    max_workers : int, optional
+        Nombre maximal de processus pour les étapes indépendantes
+    """
+
+    def __init__(self, stages, state_path=STATE_PATH, max_workers=None):
+        self.stages = {s.name: s for s in stages}
+        self.state_path = os.path.join(ROOT_DIR, state_path)
+        self.max_workers = max_workers
+        self.state = self._load_state()
+        self.hash_cache = FileHashCache(self.state.get('files'))
+
+        for stage in stages:
+            unknown = [d for d in stage.deps if d not in self.stages]
+            if unknown:
+                raise ValueError(f"Étape '{stage.name}': dépendances inconnues {unknown}")
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        self.state['files'] = self.hash_cache.entries
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _input_paths(self, stage):
+        patterns = list(stage.inputs)
+        for dep in stage.deps:
+            patterns.extend(self.stages[dep].outputs)
+        # Dédoublonner en conservant l'ordre (les étapes reçoivent leurs entrées dans cet ordre)
+        return list(dict.fromkeys(expand_paths(patterns)))
+
+    def _is_up_to_date(self, stage, fingerprint):
+        previous = self.state['stages'].get(stage.name)
+        if not previous or previous.get('fingerprint') != fingerprint:
+            return False
+        for output in stage.outputs:
+            path = os.path.join(ROOT_DIR, output)
+            if not os.path.exists(path):
+                return False
+            if self.hash_cache.get(path) != previous['outputs'].get(output):
+                return False
+        return True
+
+    def _descendants(self, names):
+        """Retourne les étapes données et toutes celles qui en dépendent"""
+        result = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for stage in self.stages.values():
+                if stage.name not in result and any(d in result for d in stage.deps):
+                    result.add(stage.name)
+                    changed = True
+        return result
+
+    def run(self, force=(), dry_run=False):
+        """
+        Construit les étapes périmées.
+
+        Parameters:
+        -----------
+        force : iterable of str
+            Étapes à reconstruire même si leur empreinte est inchangée
+        dry_run : bool
+            Afficher le plan sans rien exécuter
+
+        Returns:
+        --------
+        dict
+            Statut de chaque étape ('built', 'skipped' ou 'stale')
+        """
+        forced = self._descendants(force)
+        status = {}
+        pending = dict(self.stages)
+
+        while pending:
+            ready = [s for s in pending.values() if all(d in status for d in s.deps)]
+            if not ready:
+                raise ValueError(f"Cycle de dépendances entre: {sorted(pending)}")
+
+            to_build = []
+            for stage in ready:
+                del pending[stage.name]
+                upstream_stale = any(status[d] == 'stale' for d in stage.deps)
+                inputs = self._input_paths(stage)
+                fingerprint = None if upstream_stale else stage.fingerprint(inputs, self.hash_cache)
+
+                if fingerprint and stage.name not in forced and self._is_up_to_date(stage, fingerprint):
+                    status[stage.name] = 'skipped'
+                    print(f"⏭️  {stage.name}: à jour")
+                elif dry_run:
+                    status[stage.name] = 'stale'
+                    print(f"🔄 {stage.name}: à reconstruire")
+                else:
+                    to_build.append((stage, inputs, fingerprint))
+
+            if to_build:
+                self._build(to_build, status)
+
+        self._save_state()
+        return status
+
+    def _build(self, to_build, status):
+        """Exécute un groupe d'étapes indépendantes en parallèle"""
+        workers = self.max_workers or min(len(to_build), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for stage, inputs, fingerprint in to_build:
+                print(f"🔨 {stage.name}: construction...")
+                future = executor.submit(_run_stage, stage.func, inputs, stage.outputs, stage.params)
+                futures[future] = (stage, fingerprint)
+
+            for future, (stage, fingerprint) in futures.items():
+                future.result()
+                self.state['stages'][stage.name] = {
+                    'fingerprint': fingerprint,
+                    'outputs': {
+                        output: self.hash_cache.get(os.path.join(ROOT_DIR, output))
+                        for output in stage.outputs
+                    }
+                }
+                status[stage.name] = 'built'
+                print(f"✅ {stage.name}: terminé")
+            # Sauvegarder après chaque groupe pour qu'une interruption ne perde pas le travail fait
+            self._save_state()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline de construction des données et du modèle")
+    parser.add_argument('--force', nargs='*', default=[], help="Étapes à reconstruire de force")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher le plan sans l'exécuter")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre maximal de processus")
+    args = parser.parse_args(argv)
+
+    runner = PipelineRunner(definir_stages(), max_workers=args.workers)
+    status = runner.run(force=args.force, dry_run=args.dry_run)
+
+    built = [name for name, s in status.items() if s == 'built']
+    print(f"\n✅ Pipeline terminé: {len(built)} étape(s) reconstruite(s), "
+          f"{sum(s == 'skipped' for s in status.values())} à jour")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,51 @@ Version: 1.0
 
 import pandas as pd
 import numpy as np
+import hashlib
 import pickle
+import math
+import os
+import time
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from feature_transformer import (
+    CarFeatureTransformer, MARQUES_ACCEPTEES, LUXURY_BRANDS, BRAND_CATEGORIES,
+    age_category, categorize_brand
+)
+from anytime_forest import AnytimeForestEvaluator
+from inference_executor import InferenceExecutor
+from tree_explainer import TreeExplainer
+
+
+# Correspondance entre les clés d'entrée de l'API et les colonnes du transformer
+INPUT_COLUMNS = {
+    'marque': 'Marque',
+    'annee': 'Annee',
+    'kilometrage': 'Kilometrage',
+    'energie': 'Energie',
+    'boite_vitesses': 'Boite_Vitesses',
+    'puissance_fiscale': 'Puissance_Fiscale'
+}
+
+NUMERIC_COLUMNS = ['Annee', 'Kilometrage', 'Puissance_Fiscale']
+
+# Champs qui peuvent varier dans une courbe (predict_curve)
+CURVE_FIELDS = ['kilometrage', 'annee', 'puissance_fiscale', 'energie', 'boite_vitesses']
+
+MAX_CURVE_POINTS = 5000
+
+
+def empreinte_fichiers(paths):
+    """Empreinte SHA-256 (16 caractères hexadécimaux) du contenu d'une liste de fichiers"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
 
 class CarPricePredictor:
     """
@@ -31,12 +71,19 @@ class CarPricePredictor:
         Le modèle de prédiction chargé depuis le fichier pickle
     encoders : dict
         Dictionnaire contenant tous les encodeurs nécessaires
+    transformer : CarFeatureTransformer
+        Feature engineering vectorisé partagé avec l'entraînement
     marques_acceptees : list
         Liste des marques de véhicules acceptées
     luxury_brands : list
         Liste des marques de luxe
     brand_categories : dict
         Dictionnaire de catégorisation des marques
+    model_version : str
+        Empreinte du modèle et du transformer chargés (clé des caches HTTP)
+    feature_listeners : list
+        Fonctions appelées avec (X, prédictions, latence du modèle en ms) après
+        chaque prédiction exacte ; elles ne doivent ni bloquer ni lever
     
     Methods:
     --------
@@ -44,6 +91,8 @@ class CarPricePredictor:
         Prédit le prix d'un véhicule
     predict_batch(vehicles_list)
         Prédit les prix pour une liste de véhicules
+    predict_curve(vehicle, axes)
+        Prédit les prix d'un véhicule en faisant varier un ou deux champs
     get_vehicle_info(marque)
         Retourne les informations sur une marque
     
@@ -54,7 +103,8 @@ class CarPricePredictor:
     >>> print(f"Prix estimé: {result['prix_predit']:,.0f} DT")
     """
     
-    def __init__(self, model_path='models/extra_trees_tuned.pkl', encoders_path='models/encoders.pkl'):
+    def __init__(self, model_path='models/extra_trees_tuned.pkl', encoders_path='models/encoders.pkl',
+                 transformer_path='models/feature_transformer.pkl', inference=None):
         """
         Initialise le prédicteur en chargeant le modèle et les encodeurs.
         
@@ -63,55 +113,99 @@ class CarPricePredictor:
         model_path : str
             Chemin vers le fichier pickle du modèle
         encoders_path : str
-            Chemin vers le fichier pickle des encodeurs
+            Chemin vers le fichier pickle des encodeurs (utilisé si le
+            transformer sérialisé n'existe pas)
+        transformer_path : str
+            Chemin vers le CarFeatureTransformer sérialisé à l'entraînement
+        inference : dict, optional
+            Paramètres de l'InferenceExecutor (pool_size, n_threads,
+            parallel_min_rows, cpu_affinity) ; par défaut prédiction sur un
+            seul thread dans le thread appelant
         """
         # Charger le modèle
         with open(model_path, 'rb') as f:
             self.model = pickle.load(f)
         
-        # Charger les encodeurs
-        with open(encoders_path, 'rb') as f:
-            self.encoders = pickle.load(f)
+        # Charger le transformer (ou le reconstruire depuis les anciens encodeurs)
+        if transformer_path and os.path.exists(transformer_path):
+            self.transformer = CarFeatureTransformer.load(transformer_path)
+            self.encoders = self.transformer.to_encoders()
+            self.model_version = empreinte_fichiers([model_path, transformer_path])
+        else:
+            with open(encoders_path, 'rb') as f:
+                self.encoders = pickle.load(f)
+            self.transformer = CarFeatureTransformer.from_encoders(self.encoders)
+            self.model_version = empreinte_fichiers([model_path, encoders_path])
+        
+        # Le transformer fixe l'ordre des features: il doit correspondre au modèle
+        model_features = getattr(self.model, 'feature_names_in_', None)
+        if model_features is not None and list(model_features) != self.transformer.feature_names_:
+            raise ValueError(
+                f"Features du modèle {list(model_features)} différentes de celles du transformer "
+                f"{self.transformer.feature_names_}"
+            )
+        
+        # Parallélisme du modèle forcé au chargement (n_jobs=-1 à l'entraînement)
+        self.executor = InferenceExecutor(self.model, **(inference or {}))
+        
+        # Évaluation sous budget de latence (forêts uniquement)
+        try:
+            self.anytime = AnytimeForestEvaluator(self.model)
+        except TypeError:
+            self.anytime = None
+        
+        # Explications par feature, construites à la première demande
+        self._explainer = None
+        
+        # Observateurs des matrices de features (modèles candidats en shadow)
+        self.feature_listeners = []
         
         # Configuration des marques
-        self.marques_acceptees = [
-            'MERCEDES', 'VW', 'PEUGEOT', 'KIA', 'CITROEN', 'BMW', 'Fiat', 'OTHER_BRAND',
-            'Audi', 'CHINESE', 'HYUNDAI', 'Toyota', 'SUZUKI', 'RENAULT', 'Dacia',
-            'JAPANESE', 'Ford', 'MG', 'GWM', 'SEAT', 'AMERICAN', 'NISSAN', 'CHERY',
-            'SKODA', 'Porsche', 'LUXURY_BRAND', 'Opel', 'Mini', 'Land Rover', 'UTILITY'
-        ]
-        
-        self.luxury_brands = ['BMW', 'MERCEDES', 'Audi', 'Porsche', 'Land Rover', 'LUXURY_BRAND', 'Mini']
-        
-        self.brand_categories = {
-            'Economic_European': ['PEUGEOT', 'CITROEN', 'RENAULT', 'Fiat', 'SEAT', 'Dacia', 'Opel', 'SKODA', 'Ford'],
-            'Premium_European': ['BMW', 'MERCEDES', 'Audi', 'VW', 'Porsche', 'Land Rover', 'Mini', 'LUXURY_BRAND'],
-            'Asian': ['Toyota', 'HYUNDAI', 'KIA', 'SUZUKI', 'NISSAN', 'JAPANESE'],
-            'Chinese': ['CHINESE', 'MG', 'GWM', 'CHERY'],
-            'Other': ['OTHER_BRAND', 'AMERICAN', 'UTILITY']
-        }
+        self.marques_acceptees = list(MARQUES_ACCEPTEES)
+        self.luxury_brands = list(LUXURY_BRANDS)
+        self.brand_categories = {k: list(v) for k, v in BRAND_CATEGORIES.items()}
         
         print(f"✅ CarPricePredictor initialisé")
-        print(f"   • Modèle: {type(self.model).__name__}")
+        print(f"   • Modèle: {type(self.model).__name__} (version {self.model_version})")
         print(f"   • {len(self.marques_acceptees)} marques disponibles")
     
     def _age_category(self, age):
         """Catégorise un véhicule selon son âge"""
-        if age == 0:
-            return 'Neuf'
-        elif age <= 3:
-            return 'Récent'
-        elif age <= 7:
-            return 'Occasion_Standard'
-        else:
-            return 'Ancien'
+        return str(age_category([age])[0])
     
     def _categorize_brand(self, marque):
         """Catégorise une marque selon son origine"""
-        for category, brands in self.brand_categories.items():
-            if marque in brands:
-                return category
-        return 'Other'
+        return str(categorize_brand([marque])[0])
+    
+    def _build_frame(self, vehicles_list):
+        """
+        Convertit une liste de véhicules en DataFrame de colonnes brutes.
+        
+        Parameters:
+        -----------
+        vehicles_list : list of dict ou dict of list
+            Véhicules ligne par ligne, ou colonnes {champ: valeurs}
+        
+        Returns:
+        --------
+        tuple
+            (DataFrame avec les colonnes du transformer, np.ndarray des erreurs par ligne)
+        """
+        if not isinstance(vehicles_list, dict):
+            vehicles_list = list(vehicles_list)
+        df = pd.DataFrame(vehicles_list, columns=list(INPUT_COLUMNS) + ['modele'])
+        errors = np.full(len(df), None, dtype=object)
+        
+        frame = df[list(INPUT_COLUMNS)].rename(columns=INPUT_COLUMNS)
+        missing = frame.isna().to_numpy()
+        for i in np.flatnonzero(missing.any(axis=1)):
+            errors[i] = f"Champs manquants: {[k for k, m in zip(INPUT_COLUMNS, missing[i]) if m]}"
+        for col in NUMERIC_COLUMNS:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce')
+        
+        validation = self.transformer.validate(frame)
+        errors = np.where(errors == None, validation, errors)  # noqa: E711
+        return frame, errors
     
     def _prepare_features(self, marque, annee, kilometrage, energie, boite_vitesses, puissance_fiscale):
         """
@@ -122,69 +216,16 @@ class CarPricePredictor:
         pd.DataFrame
             DataFrame avec les 23 features nécessaires
         """
-        # Validation
-        if marque not in self.marques_acceptees:
-            raise ValueError(f"Marque '{marque}' non reconnue. Marques acceptées: {self.marques_acceptees}")
-        
-        energies_acceptees = ['Diesel', 'Essence', 'Hybride', 'Electrique', 'GPL']
-        if energie not in energies_acceptees:
-            raise ValueError(f"Énergie '{energie}' non reconnue. Valeurs acceptées: {energies_acceptees}")
-        
-        boites_acceptees = ['Manuelle', 'Automatique']
-        if boite_vitesses not in boites_acceptees:
-            raise ValueError(f"Boîte '{boite_vitesses}' non reconnue. Valeurs acceptées: {boites_acceptees}")
-        
-        # Calcul de l'âge
-        annee_actuelle = datetime.now().year
-        age = annee_actuelle - annee
-        
-        if age < 0:
-            raise ValueError(f"L'année {annee} est dans le futur!")
-        
-        # Feature engineering
-        km_par_age = kilometrage / (age + 1)
-        log_km = np.log1p(kilometrage)
-        is_luxury = 1 if marque in self.luxury_brands else 0
-        age_cat = self._age_category(age)
-        puissance_age_ratio = puissance_fiscale / (age + 1)
-        brand_cat = self._categorize_brand(marque)
-        
-        # Encodage de la marque
-        le_marque = self.encoders['marque_encoder']
-        try:
-            marque_encoded = le_marque.transform([marque])[0]
-        except ValueError:
-            marque_encoded = le_marque.transform(['OTHER_BRAND'])[0]
-        
-        # Créer le dictionnaire de données dans l'ordre exact
-        data = {
-            'Age': age,
-            'Kilometrage': kilometrage,
-            'Puissance_Fiscale': puissance_fiscale,
-            'Km_par_Age': km_par_age,
-            'Log_Km': log_km,
-            'Is_Luxury': is_luxury,
-            'Puissance_Age_Ratio': puissance_age_ratio,
-            'Boite_Auto': 1 if boite_vitesses == 'Automatique' else 0,
-            'Marque_encoded': marque_encoded
-        }
-        
-        # One-Hot Encoding
-        for col in self.encoders['energie_columns']:
-            energie_type = col.replace('Energie_', '')
-            data[col] = 1 if energie_type == energie else 0
-        
-        for col in self.encoders['brand_category_columns']:
-            brand_cat_type = col.replace('Brand_Cat_', '')
-            data[col] = 1 if brand_cat_type == brand_cat else 0
-        
-        for col in self.encoders['age_category_columns']:
-            age_cat_type = col.replace('Age_Cat_', '')
-            data[col] = 1 if age_cat_type == age_cat else 0
-        
-        return pd.DataFrame([data])
+        frame, errors = self._build_frame([{
+            'marque': marque, 'annee': annee, 'kilometrage': kilometrage, 'energie': energie,
+            'boite_vitesses': boite_vitesses, 'puissance_fiscale': puissance_fiscale
+        }])
+        if errors[0] is not None:
+            raise ValueError(errors[0])
+        return self.transformer.transform(frame)
     
-    def predict(self, marque, modele, annee, kilometrage, energie, boite_vitesses, puissance_fiscale, verbose=False):
+    def predict(self, marque, modele, annee, kilometrage, energie, boite_vitesses, puissance_fiscale, verbose=False,
+                latency_budget_ms=None, explain=False):
         """
         Prédit le prix d'un véhicule.
         
@@ -206,18 +247,180 @@ class CarPricePredictor:
             Puissance fiscale en CV
         verbose : bool, optional
             Afficher les détails de la prédiction
+        latency_budget_ms : float, optional
+            Budget de latence: pour une forêt, les arbres sont évalués jusqu'à
+            ce que l'estimation soit assez précise ou que le budget soit
+            épuisé (le résultat contient alors trees_used et trees_total)
+        explain : bool, optional
+            Ajouter au résultat la contribution de chaque feature au prix
+            (base_value + somme des contributions = prix_predit) ; le budget
+            de latence est alors ignoré, les contributions portant sur toute
+            la forêt
         
         Returns:
         --------
         dict
             Résultat de la prédiction avec le prix et les informations
         """
+        return self._predict_vehicles([{
+            'marque': marque,
+            'modele': modele,
+            'annee': annee,
+            'kilometrage': kilometrage,
+            'energie': energie,
+            'boite_vitesses': boite_vitesses,
+            'puissance_fiscale': puissance_fiscale
+        }], verbose=verbose, latency_budget_ms=latency_budget_ms, explain=explain)[0][0]
+    
+    def predict_batch(self, vehicles_list, verbose=False, explain=False, return_stats=False):
+        """
+        Prédit les prix pour une liste de véhicules.
+        
+        Les features de tous les véhicules valides sont construites en une
+        seule passe vectorisée, suivie d'un unique appel au modèle. Les
+        véhicules identiques du batch ne sont calculés qu'une fois.
+        
+        Parameters:
+        -----------
+        vehicles_list : list of dict
+            Liste de dictionnaires contenant les informations des véhicules
+            Chaque dict doit avoir: marque, modele, annee, kilometrage, energie, boite_vitesses, puissance_fiscale
+        verbose : bool, optional
+            Afficher les détails
+        explain : bool, optional
+            Ajouter les contributions des features à chaque résultat
+        return_stats : bool, optional
+            Renvoyer aussi les statistiques de déduplication du batch
+        
+        Returns:
+        --------
+        list of dict
+            Liste des résultats de prédiction (et dict des statistiques si
+            return_stats: n_vehicles, n_unique, dedup_ratio)
+        """
+        results, stats = self._predict_vehicles(vehicles_list, verbose=verbose, explain=explain)
+        return (results, stats) if return_stats else results
+    
+    def predict_columns(self, columns):
+        """
+        Prédit les prix d'un batch au format colonnaire.
+        
+        Les colonnes alimentent directement le feature engineering vectorisé
+        et le résultat reste en tableaux numpy: aucun dictionnaire par
+        véhicule n'est construit, et les entrées ne sont pas renvoyées.
+        
+        Parameters:
+        -----------
+        columns : dict
+            {champ: liste ou np.ndarray} avec les champs de predict_batch
+        
+        Returns:
+        --------
+        dict
+            success, prix_predit, prix_min, prix_max (NaN si invalide) et
+            error en tableaux, et dedup (statistiques de déduplication)
+        """
+        frame, errors = self._build_frame(columns)
+        valid = np.flatnonzero(errors == None)  # noqa: E711
+        
+        prix = np.full(len(frame), np.nan)
+        first, inverse = self._unique_vehicles(frame.iloc[valid])
+        if len(valid):
+            X = self.transformer.transform(frame.iloc[valid[first]])
+            prix[valid] = self._predict_model(X)[inverse]
+        return {
+            'success': errors == None,  # noqa: E711
+            'prix_predit': prix,
+            'prix_min': prix * 0.90,
+            'prix_max': prix * 1.10,
+            'error': errors,
+            'dedup': self._dedup_stats(len(valid), len(first))
+        }
+    
+    def _predict_model(self, X):
+        """Prédiction du modèle, transmise avec sa latence aux feature_listeners"""
+        start = time.perf_counter()
+        prix = self.executor.predict(X)
+        latency_ms = (time.perf_counter() - start) * 1000
+        for listener in self.feature_listeners:
+            listener(X, prix, latency_ms)
+        return prix
+    
+    def _unique_vehicles(self, frame):
+        """
+        Regroupe les véhicules identiques d'un batch.
+        
+        Les features ne dépendent que des colonnes d'entrée: deux lignes aux
+        entrées identiques ont le même vecteur de features et le même prix.
+        
+        Returns:
+        --------
+        tuple of np.ndarray
+            (position de la première occurrence de chaque véhicule unique,
+             numéro du véhicule unique de chaque ligne)
+        """
+        if frame.empty:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        inverse = frame.groupby(list(INPUT_COLUMNS.values()), sort=False).ngroup().to_numpy()
+        first = np.unique(inverse, return_index=True)[1]
+        return first, inverse
+    
+    @staticmethod
+    def _dedup_stats(n_vehicles, n_unique):
+        """Compteurs de déduplication (dedup_ratio: part des prédictions évitées)"""
+        return {
+            'n_vehicles': int(n_vehicles),
+            'n_unique': int(n_unique),
+            'dedup_ratio': 1 - n_unique / n_vehicles if n_vehicles else 0.0
+        }
+    
+    def _get_explainer(self):
+        """Construit (une seule fois) le cache des contributions par feuille"""
+        if self._explainer is None:
+            self._explainer = TreeExplainer(self.model)
+        return self._explainer
+    
+    def _predict_vehicles(self, vehicles_list, verbose=False, latency_budget_ms=None, explain=False):
+        """
+        Prédiction commune à predict (avec budget optionnel) et predict_batch (exacte).
+        
+        Returns:
+        --------
+        tuple
+            (liste des résultats, statistiques de déduplication)
+        """
+        anytime = None
+        contributions = {}
         try:
-            # Préparer les features
-            df_input = self._prepare_features(marque, annee, kilometrage, energie, boite_vitesses, puissance_fiscale)
+            frame, errors = self._build_frame(vehicles_list)
+            valid = np.flatnonzero(errors == None)  # noqa: E711
             
-            # Prédiction
-            prix_predit = self.model.predict(df_input)[0]
+            # Seuls les véhicules uniques sont transformés et prédits, puis redistribués
+            prix = np.full(len(frame), np.nan)
+            first, inverse = self._unique_vehicles(frame.iloc[valid])
+            if len(valid):
+                X = self.transformer.transform(frame.iloc[valid[first]])
+                # Les contributions portent sur toute la forêt: pas d'estimation partielle avec explain
+                if latency_budget_ms is not None and not explain and self.anytime is not None and len(valid) == 1:
+                    anytime = self.executor.submit(self.anytime.predict_one, X, budget_ms=latency_budget_ms)
+                    prix[valid] = anytime['prediction']
+                else:
+                    prix[valid] = self._predict_model(X)[inverse]
+                if explain:
+                    base_value, rows = self.executor.submit(self._get_explainer().explain_dicts, X)
+                    contributions = {i: rows[u] for i, u in zip(valid, inverse)}
+            stats = self._dedup_stats(len(valid), len(first))
+        except Exception as e:
+            return [{'success': False, 'error': str(e)} for _ in vehicles_list], self._dedup_stats(0, 0)
+        
+        annee_actuelle = datetime.now().year
+        results = []
+        for i, vehicle in enumerate(vehicles_list):
+            if errors[i] is not None:
+                results.append({'success': False, 'error': errors[i]})
+                continue
+            
+            prix_predit = prix[i]
             prix_min = prix_predit * 0.90
             prix_max = prix_predit * 1.10
             
@@ -225,67 +428,168 @@ class CarPricePredictor:
                 print("="*70)
                 print("🚗 PRÉDICTION DU PRIX")
                 print("="*70)
-                print(f"   • Véhicule: {marque} {modele} ({annee})")
-                print(f"   • Kilométrage: {kilometrage:,.0f} km")
-                print(f"   • Énergie: {energie} | Boîte: {boite_vitesses}")
-                print(f"   • Puissance: {puissance_fiscale} CV")
+                print(f"   • Véhicule: {vehicle['marque']} {vehicle.get('modele', '')} ({vehicle['annee']})")
+                print(f"   • Kilométrage: {frame['Kilometrage'].iat[i]:,.0f} km")
+                print(f"   • Énergie: {vehicle['energie']} | Boîte: {vehicle['boite_vitesses']}")
+                print(f"   • Puissance: {vehicle['puissance_fiscale']} CV")
                 print(f"\n🎯 Prix estimé: {prix_predit:,.0f} DT")
                 print(f"📊 Fourchette: {prix_min:,.0f} - {prix_max:,.0f} DT")
                 print("="*70)
             
-            return {
+            results.append({
                 'success': True,
                 'prix_predit': prix_predit,
                 'prix_min': prix_min,
                 'prix_max': prix_max,
-                'marque': marque,
-                'modele': modele,
-                'annee': annee,
-                'age': datetime.now().year - annee,
-                'kilometrage': kilometrage,
-                'energie': energie,
-                'boite_vitesses': boite_vitesses,
-                'puissance_fiscale': puissance_fiscale
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+                'marque': vehicle['marque'],
+                'modele': vehicle.get('modele'),
+                'annee': vehicle['annee'],
+                'age': annee_actuelle - int(frame['Annee'].iat[i]),
+                'kilometrage': vehicle['kilometrage'],
+                'energie': vehicle['energie'],
+                'boite_vitesses': vehicle['boite_vitesses'],
+                'puissance_fiscale': vehicle['puissance_fiscale']
+            })
+            if anytime is not None:
+                results[-1]['trees_used'] = anytime['trees_used']
+                results[-1]['trees_total'] = anytime['trees_total']
+            if explain:
+                results[-1]['base_value'] = base_value
+                results[-1]['contributions'] = contributions[i]
+        
+        return results, stats
     
-    def predict_batch(self, vehicles_list, verbose=False):
+    def _axis_size(self, axis):
         """
-        Prédit les prix pour une liste de véhicules.
+        Nombre de points d'un axe de courbe, calculé sans construire l'axe:
+        une plage démesurée est refusée sans être allouée.
+        """
+        field = axis.get('field')
+        if field not in CURVE_FIELDS:
+            raise ValueError(f"Champ '{field}' non supporté. Champs acceptés: {CURVE_FIELDS}")
+        if 'values' in axis:
+            if not isinstance(axis['values'], list):
+                raise ValueError(f"'values' de l'axe '{field}' doit être une liste")
+            n_points = len(axis['values'])
+        elif field in ('energie', 'boite_vitesses'):
+            raise ValueError(f"L'axe '{field}' doit fournir une liste 'values'")
+        else:
+            start, stop = float(axis['start']), float(axis['stop'])
+            if 'num' in axis:
+                n_points = int(axis['num'])
+            else:
+                step = float(axis.get('step', 1))
+                if not step > 0:
+                    raise ValueError("Le pas 'step' doit être positif")
+                if not (math.isfinite(start) and math.isfinite(stop)):
+                    raise ValueError(f"Bornes de l'axe '{field}' invalides")
+                # Même nombre de points que np.arange(start, stop + step / 2, step)
+                span = (stop - start) / step + 0.5
+                n_points = max(0, math.ceil(span)) if math.isfinite(span) else span
+        if n_points > MAX_CURVE_POINTS:
+            raise ValueError(f"Axe '{field}' trop grand ({n_points} points, maximum {MAX_CURVE_POINTS})")
+        return n_points
+    
+    def _axis_values(self, axis):
+        """Valeurs d'un axe de courbe: liste explicite ou plage start/stop/step (ou num)"""
+        field = axis.get('field')
+        n_points = self._axis_size(axis)
+        if 'values' in axis:
+            values = list(axis['values'])
+        elif 'num' in axis:
+            values = np.linspace(float(axis['start']), float(axis['stop']), n_points).tolist()
+        else:
+            step = float(axis.get('step', 1))
+            values = np.arange(float(axis['start']), float(axis['stop']) + step / 2, step).tolist()
+        if field == 'annee':
+            values = [int(round(v)) for v in values]
+        if not values:
+            raise ValueError(f"Axe '{field}' vide")
+        return field, values
+    
+    def curve_points(self, axes):
+        """
+        Nombre de points de la grille d'une courbe, sans la construire.
+        
+        Raises:
+        -------
+        ValueError
+            Axes invalides ou axe trop grand (voir predict_curve)
+        """
+        if not isinstance(axes, list) or not 1 <= len(axes) <= 2:
+            raise ValueError("'axes' doit contenir un ou deux axes")
+        return int(np.prod([self._axis_size(axis) for axis in axes]))
+    
+    def predict_curve(self, vehicle, axes):
+        """
+        Prédit les prix d'un véhicule sur une grille de variantes.
+        
+        Toute la grille est prédite en un seul appel au modèle ; les features
+        qui ne dépendent pas des champs balayés sont calculées une seule fois.
         
         Parameters:
         -----------
-        vehicles_list : list of dict
-            Liste de dictionnaires contenant les informations des véhicules
-            Chaque dict doit avoir: marque, modele, annee, kilometrage, energie, boite_vitesses, puissance_fiscale
-        verbose : bool, optional
-            Afficher les détails
+        vehicle : dict
+            Véhicule de base (mêmes clés que predict_batch ; les champs balayés
+            peuvent être omis)
+        axes : list of dict
+            Un ou deux axes: {'field': 'kilometrage', 'start': 0, 'stop': 200000,
+            'step': 10000}, {'field': 'annee', 'start': 2010, 'stop': 2024} ou
+            {'field': 'energie', 'values': ['Diesel', 'Essence']}
         
         Returns:
         --------
-        list of dict
-            Liste des résultats de prédiction
+        dict
+            axes (champ et valeurs), prix (liste, ou liste de listes pour deux
+            axes, None pour un point invalide) et erreurs rencontrées
         """
-        results = []
-        for vehicle in vehicles_list:
-            result = self.predict(
-                marque=vehicle['marque'],
-                modele=vehicle['modele'],
-                annee=vehicle['annee'],
-                kilometrage=vehicle['kilometrage'],
-                energie=vehicle['energie'],
-                boite_vitesses=vehicle['boite_vitesses'],
-                puissance_fiscale=vehicle['puissance_fiscale'],
-                verbose=verbose
-            )
-            results.append(result)
+        try:
+            if not isinstance(axes, list) or not 1 <= len(axes) <= 2:
+                raise ValueError("'axes' doit contenir un ou deux axes")
+            axis_values = [self._axis_values(axis) for axis in axes]
+            fields = [field for field, _ in axis_values]
+            if len(set(fields)) != len(fields):
+                raise ValueError("Un même champ ne peut pas être balayé deux fois")
+            shape = tuple(len(values) for _, values in axis_values)
+            if int(np.prod(shape)) > MAX_CURVE_POINTS:
+                raise ValueError(f"Grille trop grande ({int(np.prod(shape))} points, maximum {MAX_CURVE_POINTS})")
+            
+            # Véhicule de base: les champs balayés prennent leur première valeur
+            base_vehicle = dict(vehicle)
+            for field, values in axis_values:
+                base_vehicle[field] = values[0]
+            base, errors = self._build_frame([base_vehicle])
+            
+            mesh = np.meshgrid(*[np.array(values, dtype=object) for _, values in axis_values], indexing='ij')
+            grid = pd.DataFrame({INPUT_COLUMNS[field]: m.ravel() for field, m in zip(fields, mesh)})
+            for col in grid.columns:
+                if col in NUMERIC_COLUMNS:
+                    grid[col] = pd.to_numeric(grid[col], errors='coerce')
+            
+            full = base.loc[base.index.repeat(len(grid))].reset_index(drop=True)
+            full[grid.columns] = grid.to_numpy()
+            if base.isna().any(axis=None):
+                raise ValueError(errors[0])
+            point_errors = self.transformer.validate(full)
+            valid = np.flatnonzero(point_errors == None)  # noqa: E711
+            if not len(valid):
+                # Erreur sur un champ fixe (ou grille entièrement invalide)
+                raise ValueError(point_errors[0])
+            
+            prix = np.full(len(grid), np.nan)
+            X = self.transformer.transform_sweep(base, grid)
+            prix[valid] = self._predict_model(X.iloc[valid])
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
         
-        return results
+        prix = np.where(np.isnan(prix), None, prix).reshape(shape).tolist()
+        return {
+            'success': True,
+            'axes': [{'field': field, 'values': values} for field, values in axis_values],
+            'prix': prix,
+            'n_points': int(np.prod(shape)),
+            'errors': sorted({e for e in point_errors if e is not None})
+        }
     
     def get_vehicle_info(self, marque):
         """
@@ -0,0 +1,299 @@
+"""
+Compact Trees - Stockage compact en précision réduite des forêts
+=================================================================
+
+Un arbre scikit-learn stocke pour chaque nœud 64 octets (enfants et feature en
+int64, seuil et impureté en float64, effectifs...) plus la valeur en float64.
+CompactForest ne garde que ce qui sert à la prédiction :
+
+- feature  : int8, -1 pour une feuille ; le bit 0x40 marque un split sur une
+             feature binaire (Is_Luxury, Boite_Auto, colonnes One-Hot)
+- left     : int16 (ou int32 si un arbre dépasse 32 767 nœuds), index local de
+             l'enfant gauche ; les nœuds sont renumérotés en largeur pour que
+             l'enfant droit soit toujours left + 1
+- payload  : float32 ou float16, seuil d'un split numérique ou valeur d'une
+             feuille (avec facteurs d'échelle en puissance de 2 pour float16)
+
+Les splits binaires n'utilisent pas de seuil : les features binaires d'une
+ligne sont empaquetées dans un entier et le split lit un bit.
+
+L'évaluateur parcourt tous les arbres en même temps, un niveau de profondeur
+par itération. L'erreur par rapport au modèle d'origine est vérifiée contre
+une tolérance au moment de l'export.
+
+float32 (par défaut) reproduit le modèle d'origine à l'arrondi près. En
+float16, les entrées sont arrondies comme les seuils (11 bits de mantisse :
+un kilométrage de 150 000 l'est au multiple de 128 près) et une ligne proche
+d'un seuil peut changer de branche ; l'écart atteint quelques pourcents sur
+certaines prédictions, d'où une tolérance par défaut de 0.05 pour float16.
+Garder les feuilles en float32 n'y change rien : l'écart vient des splits.
+
+Usage:
+------
+    python compact_trees.py --model models/extra_trees_tuned.pkl
+    python compact_trees.py --model models/extra_trees_tuned.pkl --dtype float16   # tolérance 0.05
+    python compact_trees.py --model models/extra_trees_tuned.pkl --tolerance 0.005 \\
+        --output models/extra_trees_compact.pkl
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import os
+import pickle
+
+import numpy as np
+
+
+BINARY_PREFIXES = ('Energie_', 'Brand_Cat_', 'Age_Cat_')
+BINARY_FEATURES = ('Is_Luxury', 'Boite_Auto')
+
+LEAF = -1
+BINARY_FLAG = 0x40
+FLOAT16_MAX = 60000.0
+# Écart relatif maximal toléré par défaut à l'export (voir la docstring du module)
+TOLERANCE_PAR_DTYPE = {'float32': 0.01, 'float16': 0.05}
+
+
+def est_binaire(feature_name):
+    """Vrai si la feature ne prend que les valeurs 0 et 1"""
+    return feature_name in BINARY_FEATURES or feature_name.startswith(BINARY_PREFIXES)
+
+
+def _echelle(max_abs, dtype):
+    """Facteur d'échelle (puissance de 2) pour que les valeurs tiennent dans le dtype"""
+    if np.dtype(dtype) != np.float16 or max_abs <= FLOAT16_MAX:
+        return 1.0
+    return float(2.0 ** np.ceil(np.log2(max_abs / FLOAT16_MAX)))
+
+
+def _arrondi_inferieur(values, dtype):
+    """
+    Convertit vers dtype en arrondissant vers le bas.
+
+    Avec x déjà dans dtype, x <= seuil_float64 équivaut alors à
+    x <= seuil_converti : le split reste exact en float32.
+    """
+    converted = values.astype(dtype)
+    too_high = converted.astype(np.float64) > values
+    converted[too_high] = np.nextafter(converted[too_high], np.array(-np.inf, dtype=dtype))
+    return converted
+
+
+class CompactForest:
+    """
+    Forêt de régression en précision réduite, chargeable par CarPricePredictor.
+
+    Parameters:
+    -----------
+    model : ExtraTreesRegressor, RandomForestRegressor ou DecisionTreeRegressor
+        Modèle scikit-learn entraîné
+    dtype : str
+        'float32' ou 'float16' pour les seuils et les valeurs des feuilles
+    chunk_size : int
+        Nombre de lignes évaluées à la fois
+
+    Example:
+    --------
+    >>> compact = CompactForest(model, dtype='float16')
+    >>> compact.verifier(model, X_holdout, tolerance=TOLERANCE_PAR_DTYPE['float16'])
+    >>> compact.predict(X_holdout)
+    """
+
+    def __init__(self, model, dtype='float32', chunk_size=2048):
+        estimators = getattr(model, 'estimators_', [model])
+        if not hasattr(estimators[0], 'tree_'):
+            raise TypeError(f"Modèle non supporté: {type(model).__name__}")
+
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.n_features_in_ = model.n_features_in_
+        if hasattr(model, 'feature_names_in_'):
+            self.feature_names_in_ = model.feature_names_in_
+            names = list(model.feature_names_in_)
+        else:
+            names = [str(i) for i in range(self.n_features_in_)]
+        if self.n_features_in_ >= BINARY_FLAG:
+            raise ValueError(f"Trop de features ({self.n_features_in_}) pour l'encodage int8")
+
+        self.binary_features = np.array([est_binaire(name) for name in names])
+        trees = [est.tree_ for est in estimators]
+
+        # Échelles par feature (seuils) et globale (valeurs) pour float16
+        max_threshold = np.zeros(self.n_features_in_)
+        for tree in trees:
+            internal = tree.children_left != -1
+            np.maximum.at(max_threshold, tree.feature[internal], np.abs(tree.threshold[internal]))
+        self.feature_scale = np.array([_echelle(m, self.dtype) for m in max_threshold])
+        self.value_scale = _echelle(max(np.abs(t.value).max() for t in trees), self.dtype)
+
+        max_nodes = max(t.node_count for t in trees)
+        self.index_dtype = np.dtype(np.int16 if max_nodes < np.iinfo(np.int16).max else np.int32)
+
+        features, lefts, payloads, offsets = [], [], [], [0]
+        for tree in trees:
+            feature, left, payload = self._compacter(tree)
+            features.append(feature)
+            lefts.append(left)
+            payloads.append(payload)
+            offsets.append(offsets[-1] + len(feature))
+        self.feature = np.concatenate(features)
+        self.left = np.concatenate(lefts)
+        self.payload = np.concatenate(payloads)
+        self.offsets = np.array(offsets[:-1], dtype=np.int64)
+        self.max_depth = max(t.max_depth for t in trees)
+
+    def _compacter(self, tree):
+        """Renumérote un arbre en largeur (frères adjacents) et réduit ses types"""
+        children_left, children_right = tree.children_left, tree.children_right
+        order = [0]
+        i = 0
+        while i < len(order):
+            node = order[i]
+            if children_left[node] != -1:
+                order += [children_left[node], children_right[node]]
+            i += 1
+        order = np.array(order)
+        new_index = np.empty(tree.node_count, dtype=np.int64)
+        new_index[order] = np.arange(len(order))
+
+        is_leaf = children_left[order] == -1
+        feat = tree.feature[order]
+        is_binary = ~is_leaf & self.binary_features[np.where(is_leaf, 0, feat)]
+
+        feature = np.where(is_leaf, LEAF, feat | np.where(is_binary, BINARY_FLAG, 0)).astype(np.int8)
+        left = np.where(is_leaf, 0, new_index[np.where(is_leaf, 0, children_left[order])]).astype(self.index_dtype)
+
+        thresholds = tree.threshold[order] / self.feature_scale[np.where(is_leaf, 0, feat)]
+        values = tree.value[order, 0, 0] / self.value_scale
+        payload = np.where(is_leaf, values, np.where(is_binary, 0.0, thresholds))
+        payload = np.where(is_leaf, payload.astype(self.dtype), _arrondi_inferieur(payload, self.dtype))
+        return feature, left, payload.astype(self.dtype)
+
+    # ------------------------------------------------------------------
+    # Prédiction
+    # ------------------------------------------------------------------
+
+    def _predict_chunk(self, X):
+        n = len(X)
+        # Mêmes conversions que les seuils: float32 (comme scikit-learn) puis échelle et dtype
+        Xs = (X.astype(np.float32) / self.feature_scale).astype(self.dtype)
+        bits = ((X[:, self.binary_features] > 0.5).astype(np.uint64)
+                << np.flatnonzero(self.binary_features).astype(np.uint64)).sum(axis=1, dtype=np.uint64)
+
+        rows = np.arange(n)[:, None]
+        nodes = np.broadcast_to(self.offsets, (n, len(self.offsets))).copy()
+        for _ in range(self.max_depth):
+            feat = self.feature[nodes]
+            internal = feat != LEAF
+            if not internal.any():
+                break
+            fidx = np.where(internal, feat & (BINARY_FLAG - 1), 0).astype(np.int64)
+            numeric_right = Xs[rows, fidx] > self.payload[nodes]
+            binary_right = ((bits[:, None] >> fidx.astype(np.uint64)) & np.uint64(1)).astype(bool)
+            go_right = np.where((feat & BINARY_FLAG) != 0, binary_right, numeric_right)
+            child = self.offsets + self.left[nodes].astype(np.int64) + go_right
+            nodes = np.where(internal, child, nodes)
+
+        return self.payload[nodes].astype(np.float64).mean(axis=1) * self.value_scale
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + self.chunk_size])
+            for start in range(0, len(X), self.chunk_size)
+        ]) if len(X) else np.empty(0)
+
+    # ------------------------------------------------------------------
+    # Contrôle
+    # ------------------------------------------------------------------
+
+    def nbytes(self):
+        """Mémoire occupée par les tableaux de la forêt compacte"""
+        return self.feature.nbytes + self.left.nbytes + self.payload.nbytes + self.offsets.nbytes
+
+    def verifier(self, model, X, tolerance=0.01):
+        """
+        Compare les prédictions à celles du modèle d'origine.
+
+        Parameters:
+        -----------
+        model : estimateur scikit-learn
+            Modèle d'origine
+        X : array-like
+            Lignes de contrôle (holdout)
+        tolerance : float
+            Écart relatif maximal toléré sur une prédiction
+
+        Returns:
+        --------
+        dict
+            Écarts relatifs max et moyen
+
+        Raises:
+        -------
+        ValueError
+            Si l'écart maximal dépasse la tolérance
+        """
+        reference = model.predict(X)
+        relative = np.abs(self.predict(X) - reference) / np.maximum(np.abs(reference), 1.0)
+        ecarts = {'max_relative_error': float(relative.max()), 'mean_relative_error': float(relative.mean())}
+        if ecarts['max_relative_error'] > tolerance:
+            raise ValueError(f"Écart relatif {ecarts['max_relative_error']:.2e} supérieur à la tolérance {tolerance}")
+        return ecarts
+
+
+def memoire_originale(model):
+    """Mémoire des tableaux de nœuds et de valeurs des arbres scikit-learn"""
+    estimators = getattr(model, 'estimators_', [model])
+    total = 0
+    for est in estimators:
+        state = est.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total
+
+
+def main(argv=None):
+    from incremental_training import HOLDOUT_PATH, charger_holdout, charger_transformer
+
+    parser = argparse.ArgumentParser(description="Export d'une forêt en stockage compact")
+    parser.add_argument('--model', default=os.path.join('models', 'extra_trees_tuned.pkl'))
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float16'])
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="Écart relatif maximal (0.01 en float32, 0.05 en float16)")
+    parser.add_argument('--holdout', default=HOLDOUT_PATH)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    if args.tolerance is None:
+        args.tolerance = TOLERANCE_PAR_DTYPE[args.dtype]
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+
+    X_holdout = charger_transformer().transform(charger_holdout(args.holdout))
+
+    print("=" * 70)
+    print(f"🗜️  STOCKAGE COMPACT: {args.model} ({args.dtype})")
+    print("=" * 70)
+    compact = CompactForest(model, dtype=args.dtype)
+    ecarts = compact.verifier(model, X_holdout, args.tolerance)
+
+    avant, apres = memoire_originale(model), compact.nbytes()
+    print(f"   • Index des nœuds: {compact.index_dtype}, seuils/valeurs: {compact.dtype}")
+    print(f"   • Mémoire des arbres: {avant / 1e6:.2f} MB → {apres / 1e6:.2f} MB (×{avant / apres:.1f})")
+    print(f"   • Écart relatif: max {ecarts['max_relative_error']:.2e}, "
+          f"moyen {ecarts['mean_relative_error']:.2e} (tolérance {args.tolerance})")
+
+    output = args.output or args.model.replace('.pkl', f'_compact_{args.dtype}.pkl')
+    with open(output, 'wb') as f:
+        pickle.dump(compact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"\n💾 Modèle compact sauvegardé: {output}")
+
+
+if __name__ == "__main__":
+    # Importer le module par son nom pour que CompactForest soit picklé
+    # sous 'compact_trees' (et non '__main__') et reste chargeable
+    import compact_trees
+    compact_trees.main()
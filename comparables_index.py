@@ -0,0 +1,259 @@
+"""
+Comparables Index - Recherche des annonces les plus proches d'un véhicule
+==========================================================================
+
+Renvoie, avec le prix prédit, les K annonces réelles les plus semblables du
+corpus nettoyé (dataset_final_complet_grand.csv).
+
+Les annonces sont partitionnées par (Marque, Energie) ; chaque partition a
+son propre KD-tree sur les features numériques mises à l'échelle :
+
+- Age                     / écart-type
+- log(1 + Kilometrage)    / écart-type
+- Puissance_Fiscale       / écart-type
+- Boite_Auto (0/1)        × poids de boîte
+
+Une requête ne parcourt donc qu'une partition, en O(log n) : le temps de
+réponse reste inférieur à la milliseconde quand le corpus grossit. Si la
+partition exacte compte moins de K annonces, la recherche se fait sur toutes
+les énergies de la marque, puis sur tout le corpus.
+
+L'index se construit au démarrage de l'API (quelques dizaines de ms pour le
+corpus actuel) ou se charge depuis un fichier préconstruit par ce script.
+
+Usage:
+------
+    python comparables_index.py
+    python comparables_index.py --listings Data/cleaned/dataset_final_complet_grand.csv \\
+        --output models/comparables_index.pkl
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+
+LISTINGS_PATH = os.path.join('Data', 'cleaned', 'dataset_final_complet_grand.csv')
+INDEX_PATH = os.path.join('models', 'comparables_index.pkl')
+
+LISTING_COLUMNS = ['Prix', 'Marque', 'Modele', 'Age', 'Kilometrage', 'Energie',
+                   'Boite_Vitesses', 'Puissance_Fiscale', 'Source']
+REQUIRED_COLUMNS = ['Prix', 'Marque', 'Age', 'Kilometrage', 'Energie', 'Puissance_Fiscale']
+
+
+class ComparablesIndex:
+    """
+    Index des annonces partitionné par marque et énergie.
+
+    Parameters:
+    -----------
+    boite_weight : float
+        Distance ajoutée quand la boîte de vitesses diffère (en écarts-types)
+    leaf_size : int
+        Taille des feuilles des KD-trees
+
+    Example:
+    --------
+    >>> index = ComparablesIndex().fit(pd.read_csv(LISTINGS_PATH, encoding='utf-8-sig'))
+    >>> index.query('PEUGEOT', 'Diesel', age=6, kilometrage=90000, puissance_fiscale=5,
+    ...             boite_vitesses='Manuelle', k=5)
+    """
+
+    def __init__(self, boite_weight=1.0, leaf_size=40):
+        self.boite_weight = boite_weight
+        self.leaf_size = leaf_size
+        self.partitions_ = None
+
+    def _points(self, age, kilometrage, puissance, boite_auto):
+        """Coordonnées mises à l'échelle (une ligne par annonce)"""
+        return np.column_stack([
+            np.asarray(age, dtype=float) / self.scales_[0],
+            np.log1p(np.maximum(np.asarray(kilometrage, dtype=float), 0)) / self.scales_[1],
+            np.asarray(puissance, dtype=float) / self.scales_[2],
+            np.asarray(boite_auto, dtype=float) * self.boite_weight
+        ])
+
+    def fit(self, df):
+        """
+        Construit les partitions et leurs KD-trees.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Annonces avec les colonnes de LISTING_COLUMNS
+
+        Returns:
+        --------
+        self
+        """
+        df = df.dropna(subset=REQUIRED_COLUMNS).reset_index(drop=True)
+        if df.empty:
+            raise ValueError("Aucune annonce exploitable pour construire l'index")
+
+        # Colonnes restituées avec les résultats
+        self.listings_ = {
+            'prix': df['Prix'].to_numpy(dtype=float),
+            'marque': df['Marque'].to_numpy(dtype=object),
+            'modele': df['Modele'].where(df['Modele'].notna(), None).to_numpy(dtype=object),
+            'age': df['Age'].to_numpy(dtype=float),
+            'kilometrage': df['Kilometrage'].to_numpy(dtype=float),
+            'energie': df['Energie'].to_numpy(dtype=object),
+            'boite_vitesses': df['Boite_Vitesses'].where(df['Boite_Vitesses'].notna(), None).to_numpy(dtype=object),
+            'puissance_fiscale': df['Puissance_Fiscale'].to_numpy(dtype=float),
+            'source': df['Source'].to_numpy(dtype=object)
+        }
+
+        km_log = np.log1p(np.maximum(self.listings_['kilometrage'], 0))
+        self.scales_ = np.array([
+            self.listings_['age'].std(), km_log.std(), self.listings_['puissance_fiscale'].std()
+        ])
+        self.scales_[self.scales_ == 0] = 1.0
+        points = self._points(self.listings_['age'], self.listings_['kilometrage'],
+                              self.listings_['puissance_fiscale'],
+                              self.listings_['boite_vitesses'] == 'Automatique')
+
+        # Partitions (marque, énergie), (marque, None) et (None, None) pour le repli
+        groups = {(None, None): np.arange(len(df))}
+        for key, rows in df.groupby('Marque').indices.items():
+            groups[(key, None)] = rows
+        for key, rows in df.groupby(['Marque', 'Energie']).indices.items():
+            groups[key] = rows
+
+        self.partitions_ = {
+            key: (KDTree(points[rows], leaf_size=self.leaf_size), rows)
+            for key, rows in groups.items()
+        }
+        return self
+
+    @property
+    def n_listings(self):
+        return len(self.listings_['prix'])
+
+    def _partition(self, marque, energie, k):
+        """Partition la plus précise contenant au moins k annonces"""
+        for key in ((marque, energie), (marque, None), (None, None)):
+            partition = self.partitions_.get(key)
+            if partition is not None and len(partition[1]) >= k:
+                return key, partition
+        return (None, None), self.partitions_[(None, None)]
+
+    def query(self, marque, energie, age, kilometrage, puissance_fiscale, boite_vitesses=None, k=5):
+        """
+        Les k annonces les plus proches d'un véhicule.
+
+        Parameters:
+        -----------
+        marque, energie : str
+            Marque et énergie du véhicule (choix de la partition)
+        age : float
+            Âge du véhicule en années
+        kilometrage : float
+            Kilométrage
+        puissance_fiscale : float
+            Puissance fiscale en CV
+        boite_vitesses : str, optional
+            'Manuelle' ou 'Automatique'
+        k : int
+            Nombre d'annonces à renvoyer
+
+        Returns:
+        --------
+        dict
+            partition utilisée et liste des annonces (avec leur distance)
+        """
+        if self.partitions_ is None:
+            raise ValueError("ComparablesIndex non construit: appeler fit() d'abord")
+        k = int(k)
+        if k < 1:
+            raise ValueError("k doit être au moins 1")
+
+        key, (tree, rows) = self._partition(marque, energie, k)
+        point = self._points([age], [kilometrage], [puissance_fiscale], [boite_vitesses == 'Automatique'])
+        distances, positions = tree.query(point, k=min(k, len(rows)))
+        indices = rows[positions[0]]
+
+        comparables = []
+        for i, distance in zip(indices, distances[0]):
+            comparable = {name: values[i] for name, values in self.listings_.items()}
+            comparable['distance'] = float(distance)
+            comparables.append(comparable)
+        return {
+            'partition': {'marque': key[0], 'energie': key[1]},
+            'comparables': comparables
+        }
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self, path=INDEX_PATH):
+        """Sauvegarde l'index préconstruit"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Charge un index sauvegardé avec save()"""
+        with open(path, 'rb') as f:
+            index = pickle.load(f)
+        if not isinstance(index, cls):
+            raise TypeError(f"{path} ne contient pas un ComparablesIndex")
+        return index
+
+
+def charger_index(index_path=INDEX_PATH, listings_path=LISTINGS_PATH):
+    """
+    Charge l'index préconstruit, ou le construit depuis le corpus d'annonces.
+
+    Returns:
+    --------
+    ComparablesIndex
+    """
+    if index_path and os.path.exists(index_path):
+        return ComparablesIndex.load(index_path)
+    return ComparablesIndex().fit(pd.read_csv(listings_path, encoding='utf-8-sig'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construction de l'index des annonces comparables")
+    parser.add_argument('--listings', default=LISTINGS_PATH)
+    parser.add_argument('--output', default=INDEX_PATH)
+    parser.add_argument('--boite-weight', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("🔎 INDEX DES ANNONCES COMPARABLES")
+    print("=" * 70)
+    df = pd.read_csv(args.listings, encoding='utf-8-sig')
+    start = time.perf_counter()
+    index = ComparablesIndex(boite_weight=args.boite_weight).fit(df)
+    print(f"   • {index.n_listings} annonces, {len(index.partitions_)} partitions "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    # Latence de requête sur des annonces du corpus
+    sample = df.dropna(subset=REQUIRED_COLUMNS).sample(min(1000, index.n_listings), random_state=42)
+    start = time.perf_counter()
+    for row in sample.itertuples(index=False):
+        index.query(row.Marque, row.Energie, row.Age, row.Kilometrage, row.Puissance_Fiscale,
+                    row.Boite_Vitesses, k=5)
+    print(f"   • Requête (k=5): {(time.perf_counter() - start) * 1000 / len(sample):.3f} ms en moyenne")
+
+    index.save(args.output)
+    print(f"\n💾 Index sauvegardé: {args.output}")
+
+
+if __name__ == "__main__":
+    # Importer le module par son nom pour que ComparablesIndex soit picklé
+    # sous 'comparables_index' (et non '__main__') et reste chargeable
+    import comparables_index
+    comparables_index.main()
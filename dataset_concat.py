@@ -0,0 +1,427 @@
+"""
+Dataset Concat - Concaténation des sources nettoyées
+=====================================================
+
+Ce module reprend la logique du notebook
+``cleaning/final_dataset_concatenation_analysis.ipynb`` sous forme de fonctions
+réutilisables : chargement des fichiers nettoyés par source, suppression des
+doublons exacts, standardisation et regroupement des marques, nettoyage du
+modèle, imputation des valeurs inconnues et clipping des valeurs aberrantes.
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Fichiers nettoyés utilisés pour le dataset "grand" (source -> fichier)
+SOURCES_NETTOYEES = {
+    'Baniola': 'Data/cleaned/baniola_clean_20251129_230044.csv',
+    'Automobile.tn Neuf': 'Data/cleaned/automobile_tn_neuf_cleaned_20251130_160239.csv',
+    'Automobile.tn Occasion': 'Data/cleaned/automobile_tn_occasion_cleaned_20251130_150807.csv',
+    'Spark Auto': 'Data/cleaned/spark_auto_cleaned_20251130_153943.csv',
+    'Autre Sites': 'Data/cleaned/autre_sites_cleaned.csv'
+}
+
+# Colonnes clés pour la détection des doublons exacts
+DUPLICATE_KEY_COLS = ['Marque', 'Modele', 'Prix', 'Age']
+
+VALEURS_INCONNUES = ['Inconnu', 'Unknown', 'inconnu', 'unknown']
+
+# Dictionnaire de mapping pour standardiser les marques
+BRAND_MAPPING = {
+    # KIA
+    'Kia': 'KIA',
+    'kia': 'KIA',
+
+    # VOLKSWAGEN
+    'VOLKSWAGEN': 'VW',
+    'Volkswagen': 'VW',
+
+    # CITROEN
+    'Citroen': 'CITROEN',
+    'Citroën': 'CITROEN',
+    'CITROËN': 'CITROEN',
+    'citroen': 'CITROEN',
+    'citroën': 'CITROEN',
+
+    # PEUGEOT
+    'Peugeot': 'PEUGEOT',
+    'peugeot': 'PEUGEOT',
+
+    # MERCEDES
+    'Mercedes': 'MERCEDES',
+    'Mercedes-Benz': 'MERCEDES',
+    'MERCEDES-BENZ': 'MERCEDES',
+    'mercedes': 'MERCEDES',
+    'mercedes-benz': 'MERCEDES',
+
+    # HYUNDAI
+    'Hyundai': 'HYUNDAI',
+    'hyundai': 'HYUNDAI',
+
+    # SKODA
+    'Skoda': 'SKODA',
+    'Škoda': 'SKODA',
+    'skoda': 'SKODA',
+
+    # CHERY
+    'Chery': 'CHERY',
+    'chery': 'CHERY',
+
+    # GEELY
+    'Geely': 'GEELY',
+    'geely': 'GEELY',
+
+    # SUZUKI
+    'Suzuki': 'SUZUKI',
+    'suzuki': 'SUZUKI',
+
+    # NISSAN
+    'Nissan': 'NISSAN',
+    'nissan': 'NISSAN',
+
+    # RENAULT
+    'Renault': 'RENAULT',
+    'renault': 'RENAULT',
+
+    # VOLVO
+    'Volvo': 'VOLVO',
+    'volvo': 'VOLVO',
+
+    # SEAT
+    'Seat': 'SEAT',
+    'seat': 'SEAT',
+
+    # FIAT - Problème 1
+    'FIAT': 'Fiat',
+    'fiat': 'Fiat',
+
+    # AUDI - Problème 1
+    'AUDI': 'Audi',
+    'audi': 'Audi',
+
+    # MINI - Problème 1
+    'MINI': 'Mini',
+    'mini': 'Mini',
+
+    # OPEL - Problème 1
+    'OPEL': 'Opel',
+    'opel': 'Opel',
+
+    # TOYOTA - Problème 2
+    'TOYOTA': 'Toyota',
+    'toyota': 'Toyota',
+
+    # DACIA - Problème 2
+    'DACIA': 'Dacia',
+    'dacia': 'Dacia',
+
+    # BMW
+    'bmw': 'BMW',
+    'Bmw': 'BMW',
+
+    # MG
+    'MG': 'MG',
+    'mg': 'MG',
+    'Mg': 'MG',
+    'MG ': 'MG',
+    'mg ': 'MG',
+    'Mg ': 'MG',
+
+    # FORD
+    'FORD': 'Ford',
+    'ford': 'Ford',
+
+    # MAZDA
+    'MAZDA': 'Mazda',
+    'mazda': 'Mazda',
+
+    # ALFA ROMEO
+    'Alfa Romeo': 'Alfa Romeo',
+    'ALFA ROMEO': 'Alfa Romeo',
+    'alfa romeo': 'Alfa Romeo',
+
+    # DS
+    'Ds': 'DS',
+    'ds': 'DS',
+
+    # BUICK
+    'Buick': 'Buick',
+    'BUICK': 'Buick',
+    'buick': 'Buick',
+
+    # MASERATI
+    'Maserati': 'Maserati',
+    'MASERATI': 'Maserati',
+    'maserati': 'Maserati',
+
+    # TESLA
+    'Tesla': 'Tesla',
+    'TESLA': 'Tesla',
+    'tesla': 'Tesla',
+
+    # BAIC
+    'Baic': 'BAIC',
+    'BAIC': 'BAIC',
+    'baic': 'BAIC',
+    'Baic ': 'BAIC',
+    'BAIC ': 'BAIC',
+    'baic ': 'BAIC',
+
+    # ZXAUTO
+    'ZXAUTO': 'ZXAUTO',
+    'Zxauto': 'ZXAUTO',
+    'zxauto': 'ZXAUTO',
+    'ZXAUTO ': 'ZXAUTO',
+    'Zxauto ': 'ZXAUTO',
+    'zxauto ': 'ZXAUTO',
+
+    # Great Wall
+    'Great Wall': 'Great Wall',
+    'GREAT WALL': 'Great Wall',
+    'great wall': 'Great Wall',
+    'Great': 'Great Wall',
+    'GREAT': 'Great Wall'
+}
+
+# Dictionnaire de regroupement des marques
+BRAND_GROUPING = {
+    # A. Marques japonaises
+    'HONDA': 'JAPANESE',
+    'Honda': 'JAPANESE',
+    'Mitsubishi': 'JAPANESE',
+    'MITSUBISHI': 'JAPANESE',
+    'Mazda': 'JAPANESE',
+    'MAZDA': 'JAPANESE',
+    'Infiniti': 'JAPANESE',
+    'INFINITI': 'JAPANESE',
+    'Subaru': 'JAPANESE',
+    'SUBARU': 'JAPANESE',
+    'Lexus': 'JAPANESE',
+    'LEXUS': 'JAPANESE',
+    'Acura': 'JAPANESE',
+    'ACURA': 'JAPANESE',
+
+    # B. Marques américaines
+    'Jeep': 'AMERICAN',
+    'JEEP': 'AMERICAN',
+    'Chevrolet': 'AMERICAN',
+    'CHEVROLET': 'AMERICAN',
+    'Cadillac': 'AMERICAN',
+    'CADILLAC': 'AMERICAN',
+    'Hummer': 'AMERICAN',
+    'HUMMER': 'AMERICAN',
+    'Buick': 'AMERICAN',  # Marque américaine (General Motors)
+    'BUICK': 'AMERICAN',
+    'Corvette': 'AMERICAN',  # Modèle Chevrolet devenu marque
+    'CORVETTE': 'AMERICAN',
+    'Tesla': 'AMERICAN',  # Constructeur américain électrique
+    'TESLA': 'AMERICAN',
+
+    # C. Marques chinoises modernes
+    'GEELY': 'CHINESE',
+    'Geely': 'CHINESE',
+    'GAC': 'CHINESE',
+    'DFSK': 'CHINESE',
+    'DONGFENG': 'CHINESE',
+    'Dongfeng': 'CHINESE',
+    'CHANGAN': 'CHINESE',
+    'Changan': 'CHINESE',
+    'JETOUR': 'CHINESE',
+    'Jetour': 'CHINESE',
+    'BYD': 'CHINESE',
+    'OMODA': 'CHINESE',
+    'Omoda': 'CHINESE',
+    'WALLYSCAR': 'CHINESE',
+    'WALLYSAR': 'CHINESE',
+    'Great': 'CHINESE',
+    'GREAT': 'CHINESE',
+    'Great Wall': 'CHINESE',
+    'GREAT WALL': 'CHINESE',
+    'Ssangyong': 'CHINESE',  # Problème 3 - Groupe chinois SAIC
+    'SSANGYONG': 'CHINESE',
+    'Haval': 'CHINESE',  # Problème 3
+    'HAVAL': 'CHINESE',
+    'Shuanghuan': 'CHINESE',  # Marque chinoise rare
+    'SHUANGHUAN': 'CHINESE',
+    'BAIC': 'CHINESE',
+    'Baic': 'CHINESE',
+    'baic': 'CHINESE',
+    'ZXAUTO': 'CHINESE',
+    'Zxauto': 'CHINESE',
+    'zxauto': 'CHINESE',
+    'FAW': 'CHINESE',
+    'Faw': 'CHINESE',
+    'faw': 'CHINESE',
+    'JMC': 'CHINESE',
+    'Jmc': 'CHINESE',
+    'jmc': 'CHINESE',
+
+    # D. Marques premium luxe
+    'Jaguar': 'LUXURY_BRAND',
+    'JAGUAR': 'LUXURY_BRAND',
+    'VOLVO': 'LUXURY_BRAND',
+    'Volvo': 'LUXURY_BRAND',
+    'Maserati': 'LUXURY_BRAND',  # Marque italienne de luxe
+    'MASERATI': 'LUXURY_BRAND',
+    'Alfa Romeo': 'LUXURY_BRAND',  # Marque italienne premium
+    'ALFA ROMEO': 'LUXURY_BRAND',
+
+    # E. Marques utilitaires
+    'Isuzu': 'UTILITY',
+    'ISUZU': 'UTILITY',
+    'Iveco': 'UTILITY',
+    'IVECO': 'UTILITY',
+    'DS': 'OTHER_BRAND',
+    'Ds': 'OTHER_BRAND',
+    'CENNTRO': 'OTHER_BRAND',
+    'Wallyscar': 'OTHER_BRAND',
+    'Donkervoort': 'OTHER_BRAND',  # Marque néerlandaise rare
+    'DONKERVOORT': 'OTHER_BRAND',
+    'Talbot': 'OTHER_BRAND',  # Marque européenne rare
+    'TALBOT': 'OTHER_BRAND',
+    'Piaggio': 'OTHER_BRAND',  # Constructeur italien (scooters principalement)
+    'PIAGGIO': 'OTHER_BRAND',
+    'PGO': 'OTHER_BRAND',  # Marque française rare
+    'pgo': 'OTHER_BRAND',
+    'Lancia': 'OTHER_BRAND',
+    'LANCIA': 'OTHER_BRAND',
+    'Smart': 'OTHER_BRAND',
+    'SMART': 'OTHER_BRAND',
+    'ALFA': 'OTHER_BRAND',
+    'Alfa': 'OTHER_BRAND',
+    'Abarth': 'OTHER_BRAND',
+    'ABARTH': 'OTHER_BRAND',
+    'AVANTIER': 'OTHER_BRAND',
+    'Ssangyoung': 'OTHER_BRAND',  # Au cas où pas encore mappé à CHINESE
+    'SSANGYOUNG': 'OTHER_BRAND',
+    'TATA': 'OTHER_BRAND',
+    'Tata': 'OTHER_BRAND',
+    'LAND': 'OTHER_BRAND',
+    'Land': 'OTHER_BRAND',
+    'Lada': 'OTHER_BRAND',
+    'LADA': 'OTHER_BRAND',
+    'Mahindra': 'OTHER_BRAND',  # Problème 3 - Inde, très rare
+    'MAHINDRA': 'OTHER_BRAND',
+    'Cupra': 'OTHER_BRAND',  # Problème 3 - Gamme sportive SEAT, volume faible
+    'CUPRA': 'OTHER_BRAND'
+}
+
+
+def clean_modele(modele):
+    """
+    Si le modèle contient un seul mot: le garder tel quel
+    Sinon: prendre le second mot seulement
+    """
+    if pd.isna(modele):
+        return modele
+
+    # Convertir en string et nettoyer les espaces
+    mots = str(modele).strip().split()
+    if not mots:
+        return modele
+
+    # Si un seul mot: garder tel quel, sinon: prendre le second mot
+    return mots[0] if len(mots) == 1 else mots[1]
+
+
+def charger_sources(fichiers_par_source):
+    """
+    Charge les fichiers nettoyés et ajoute la colonne Source.
+
+    Parameters:
+    -----------
+    fichiers_par_source : dict
+        Dictionnaire {nom de la source: chemin du CSV nettoyé}
+
+    Returns:
+    --------
+    list of pd.DataFrame
+        Un DataFrame par source trouvée
+    """
+    dataframes = []
+    for source, filepath in fichiers_par_source.items():
+        if not os.path.exists(filepath):
+            print(f"⚠️ Fichier non trouvé: {source} ({filepath})")
+            continue
+        df = pd.read_csv(filepath, encoding='utf-8-sig')
+        df['Source'] = source
+        dataframes.append(df)
+        print(f"✓ {source}: {len(df)} voitures chargées")
+    return dataframes
+
+
+def imputer_inconnues(df, colonne):
+    """Remplace les valeurs inconnues d'une colonne par son mode (hors inconnus)"""
+    if colonne not in df.columns:
+        return df
+    mask = df[colonne].isin(VALEURS_INCONNUES)
+    if mask.any() and (~mask).any():
+        mode = df.loc[~mask, colonne].mode()[0]
+        df.loc[mask, colonne] = mode
+    return df
+
+
+def clipper_outliers(df, lower_q=0.01, upper_q=0.99):
+    """Clippe les colonnes numériques entre les percentiles donnés"""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    for col in numeric_cols:
+        lower = df[col].quantile(lower_q)
+        upper = df[col].quantile(upper_q)
+        df[col] = df[col].clip(lower=lower, upper=upper)
+    return df
+
+
+def concatener_sources(fichiers_par_source=None, clip=True):
+    """
+    Construit le dataset final à partir des fichiers nettoyés par source.
+
+    Parameters:
+    -----------
+    fichiers_par_source : dict, optional
+        Dictionnaire {nom de la source: chemin du CSV nettoyé}.
+        Par défaut: SOURCES_NETTOYEES
+    clip : bool, optional
+        Appliquer le clipping 1%-99% des variables numériques
+
+    Returns:
+    --------
+    pd.DataFrame
+        Dataset combiné et nettoyé avec la colonne Source
+    """
+    if fichiers_par_source is None:
+        fichiers_par_source = SOURCES_NETTOYEES
+
+    dataframes = charger_sources(fichiers_par_source)
+    if not dataframes:
+        raise ValueError("Aucun fichier nettoyé trouvé pour la concaténation")
+
+    df = pd.concat(dataframes, ignore_index=True)
+
+    # Suppression des doublons exacts
+    df = df.drop_duplicates(subset=DUPLICATE_KEY_COLS, keep='first').reset_index(drop=True)
+
+    # Standardisation des marques
+    df['Marque'] = df['Marque'].replace(BRAND_MAPPING).str.strip()
+
+    # Nettoyage du modèle
+    df['Modele'] = df['Modele'].apply(clean_modele)
+
+    # Imputation des valeurs inconnues
+    df = imputer_inconnues(df, 'Energie')
+    df = imputer_inconnues(df, 'Boite_Vitesses')
+
+    # Regroupement des marques par catégorie
+    df['Marque'] = df['Marque'].replace(BRAND_GROUPING)
+
+    if clip:
+        df = clipper_outliers(df)
+
+    print(f"✓ Dataset final: {len(df)} voitures, {df['Marque'].nunique()} marques")
+    return df
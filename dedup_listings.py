@@ -0,0 +1,253 @@
+"""
+Dedup Listings - Détection des annonces en double entre sources
+================================================================
+
+La même voiture est souvent publiée sur Baniola, Spark Auto et automobile.tn.
+Ce module détecte ces quasi-doublons sans comparer toutes les paires :
+
+1. Blocage: les annonces sont regroupées par Marque + Age + Energie +
+   Boite_Vitesses + Puissance_Fiscale + tranche de kilométrage (chaque annonce
+   est aussi rangée dans la tranche voisine pour ne pas rater les doublons à
+   la frontière entre deux tranches).
+2. MinHash + LSH: dans chaque bloc, une signature MinHash est calculée sur les
+   trigrammes du texte normalisé (Modele et Description si disponible). Les
+   signatures sont découpées en bandes ; seules les annonces partageant une
+   bande deviennent candidates.
+3. Vérification: similarité de Jaccard estimée, écart de kilométrage et de
+   prix entre deux annonces de sources différentes.
+4. Regroupement autour d'un représentant: une annonce ne rejoint un groupe que
+   si elle est vérifiée contre son représentant (pas de chaînage A~B~C qui
+   ferait grossir les groupes au-delà des tolérances), et un groupe contient
+   au plus une annonce par source.
+
+Le coût est linéaire en nombre d'annonces (plus le nombre de candidats).
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+TEXT_COLUMNS = ['Modele', 'Description']
+
+# Nombre premier de Mersenne utilisé pour les permutations MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normaliser_texte(texte):
+    """Minuscules, sans accents, uniquement lettres/chiffres séparés par un espace"""
+    if pd.isna(texte):
+        return ''
+    texte = unicodedata.normalize('NFKD', str(texte))
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', texte.lower()))
+
+
+def shingles(texte, k=3):
+    """Ensemble des k-grammes de caractères d'un texte normalisé"""
+    texte = f" {texte} "
+    if len(texte) <= k:
+        return {texte}
+    return {texte[i:i + k] for i in range(len(texte) - k + 1)}
+
+
+class MinHasher:
+    """
+    Calcule des signatures MinHash de taille fixe.
+
+    Parameters:
+    -----------
+    num_perm : int
+        Nombre de permutations (taille de la signature)
+    seed : int
+        Graine des coefficients des permutations
+    """
+
+    def __init__(self, num_perm=32, seed=42):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, tokens):
+        hashes = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens),
+                             dtype=np.uint64, count=len(tokens))
+        # (a * h + b) mod p, vectorisé sur toutes les permutations
+        values = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % np.uint64(_MERSENNE_PRIME)
+        return values.min(axis=1)
+
+
+BLOCK_COLUMNS = ['Marque', 'Age', 'Energie', 'Boite_Vitesses', 'Puissance_Fiscale']
+
+
+def _grouper_par_representant(n, voisins, sources, cross_source_only):
+    """
+    Regroupe les paires vérifiées autour de représentants.
+
+    Les annonces sont parcourues par indice croissant: une annonce rejoint le
+    groupe du premier représentant avec lequel elle forme une paire vérifiée,
+    si elle est aussi vérifiée avec les autres membres (et que le groupe n'a
+    pas encore d'annonce de sa source), sinon elle devient représentante.
+    Toutes les annonces d'un groupe respectent donc les tolérances deux à
+    deux, sans chaînage.
+
+    Returns:
+    --------
+    np.ndarray
+        Indice du représentant de chaque annonce
+    """
+    representant = np.arange(n)
+    membres = {}
+    for j in range(n):
+        for i in sorted(voisins.get(j, ())):
+            if i >= j:
+                break
+            if representant[i] != i:
+                continue
+            if cross_source_only and any(sources[m] == sources[j] for m in membres[i]):
+                continue
+            if not all(m in voisins[j] for m in membres[i] if m != i):
+                continue
+            representant[j] = i
+            membres[i].append(j)
+            break
+        if representant[j] == j:
+            membres[j] = [j]
+    return representant
+
+
+def detecter_doublons(df, km_bucket=10000, num_perm=32, bands=8, jaccard_min=0.5,
+                      prix_tolerance=0.10, cross_source_only=True):
+    """
+    Détecte les groupes d'annonces quasi-identiques.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset combiné (colonnes Marque, Age, Energie, Kilometrage, Prix,
+        Modele et éventuellement Boite_Vitesses, Puissance_Fiscale,
+        Description, Source)
+    km_bucket : float
+        Largeur des tranches de kilométrage et écart maximal toléré (km)
+    num_perm : int
+        Taille des signatures MinHash
+    bands : int
+        Nombre de bandes LSH (doit diviser num_perm)
+    jaccard_min : float
+        Similarité de Jaccard estimée minimale entre les textes
+    prix_tolerance : float
+        Écart relatif de prix maximal entre deux annonces d'un groupe
+    cross_source_only : bool
+        Ne rapprocher que des annonces de sources différentes (au plus une
+        annonce par source dans un groupe)
+
+    Returns:
+    --------
+    pd.DataFrame
+        Table des groupes (une ligne par annonce dupliquée) avec les colonnes
+        group_id, row_id, is_representative et les colonnes descriptives
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"num_perm ({num_perm}) doit être divisible par bands ({bands})")
+
+    df = df.reset_index(drop=True)
+    n = len(df)
+    rows_per_band = num_perm // bands
+    hasher = MinHasher(num_perm=num_perm)
+
+    text_cols = [c for c in TEXT_COLUMNS if c in df.columns]
+    textes = df[text_cols].fillna('').astype(str).agg(' '.join, axis=1) if text_cols else pd.Series([''] * n)
+    textes = textes.map(normaliser_texte)
+
+    km = df['Kilometrage'].fillna(0).to_numpy(dtype=float)
+    prix = df['Prix'].to_numpy(dtype=float)
+    sources = df['Source'].to_numpy() if 'Source' in df.columns else np.zeros(n)
+    tranche = np.floor(km / km_bucket).astype(np.int64)
+    bloc = list(zip(*(df[c] for c in BLOCK_COLUMNS if c in df.columns)))
+
+    # Index inversé: (bloc, tranche, bande, valeurs de la bande) -> annonces
+    signatures = np.empty((n, num_perm), dtype=np.uint64)
+    cache_signatures = {}
+    index = defaultdict(list)
+    for i in range(n):
+        texte = textes.iat[i]
+        if texte not in cache_signatures:
+            cache_signatures[texte] = hasher.signature(shingles(texte))
+        signatures[i] = cache_signatures[texte]
+        for t in (tranche[i], tranche[i] + 1):
+            for b in range(bands):
+                band = signatures[i, b * rows_per_band:(b + 1) * rows_per_band].tobytes()
+                index[(bloc[i], t, b, band)].append(i)
+
+    voisins = defaultdict(set)
+    seen = set()
+    for members in index.values():
+        if len(members) < 2:
+            continue
+        for x in range(len(members)):
+            i = members[x]
+            for j in members[x + 1:]:
+                pair = (i, j) if i < j else (j, i)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                if cross_source_only and sources[i] == sources[j]:
+                    continue
+                if abs(km[i] - km[j]) > km_bucket:
+                    continue
+                if abs(prix[i] - prix[j]) > prix_tolerance * max(prix[i], prix[j]):
+                    continue
+                if np.mean(signatures[i] == signatures[j]) < jaccard_min:
+                    continue
+                voisins[i].add(j)
+                voisins[j].add(i)
+
+    roots = _grouper_par_representant(n, voisins, sources, cross_source_only)
+    sizes = np.bincount(roots, minlength=n)
+    dup_rows = np.flatnonzero(sizes[roots] > 1)
+
+    cols = [c for c in ['Source', 'Marque', 'Modele', 'Age', 'Kilometrage', 'Energie', 'Prix'] if c in df.columns]
+    groups = df.loc[dup_rows, cols].copy()
+    groups.insert(0, 'row_id', dup_rows)
+    groups.insert(0, 'group_id', pd.factorize(roots[dup_rows])[0])
+    groups.insert(2, 'is_representative', roots[dup_rows] == dup_rows)
+
+    print(f"✓ {len(seen)} paires candidates comparées pour {n} annonces")
+    print(f"✓ {groups['group_id'].nunique()} groupes de doublons ({len(groups)} annonces)")
+    return groups.reset_index(drop=True)
+
+
+def appliquer_dedup(df, groups):
+    """
+    Supprime les doublons en ne gardant que le représentant de chaque groupe.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset combiné, dans le même ordre que lors de la détection
+    groups : pd.DataFrame
+        Table retournée par detecter_doublons
+
+    Returns:
+    --------
+    pd.DataFrame
+        Dataset sans doublons
+    """
+    df = df.reset_index(drop=True)
+    a_supprimer = groups.loc[~groups['is_representative'], 'row_id'].to_numpy()
+    return df.drop(index=a_supprimer).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    dataset = pd.read_csv('Data/cleaned/dataset_final_complet_grand.csv', encoding='utf-8-sig')
+    table = detecter_doublons(dataset)
+    table.to_csv('Data/cleaned/duplicate_groups.csv', index=False, encoding='utf-8-sig')
+    print(f"\n✅ {len(dataset) - len(appliquer_dedup(dataset, table))} doublons supprimables")
@@ -0,0 +1,425 @@
+"""
+Drift Monitor - Surveillance en continu de la dérive des features d'entrée
+===========================================================================
+
+Le marché scrapé évolue vite (nouvelles marques chinoises, part des
+électriques, kilométrages) et la dérive ne se voyait jusqu'ici qu'à des
+prédictions aberrantes. Ce module suit, dans le chemin de service, la
+distribution des entrées de chaque prédiction :
+
+- Age, Kilometrage, Puissance_Fiscale : histogrammes logarithmiques denses
+  (LogBuckets de market_stats), sketches de quantiles de taille fixe
+- Marque, Energie, Boite_Vitesses : compteurs (nombre de modalités borné)
+
+La mise à jour d'un véhicule coûte quelques microsecondes et la mémoire ne
+dépend pas du trafic. Les entrées récentes (fenêtre courante + fenêtre
+précédente) sont comparées périodiquement à un profil de référence calculé
+sur le jeu d'entraînement :
+
+- PSI par feature (déciles de la référence pour les numériques)
+- statistique KS (écart maximal entre fonctions de répartition) pour les
+  numériques, à la résolution des sketches
+- modalités absentes de la référence (nouvelles marques...)
+
+Usage:
+------
+    python drift_monitor.py                                   # profil de référence
+                                                              # (aussi produit par build_pipeline.py)
+    python drift_monitor.py --compare-log Data/build/request_log --since 2025-06-01
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from market_stats import LogBuckets
+
+
+DATASET_PATH = os.path.join('Data', 'build', 'dataset_final_dedup.csv')
+REFERENCE_PATH = os.path.join('models', 'drift_reference.json')
+REFERENCE_VERSION = 1
+
+RELATIVE_ACCURACY = 0.02
+NUMERIC_FEATURES = {'Age': (1, 100), 'Kilometrage': (1, 2e6), 'Puissance_Fiscale': (1, 100)}
+CATEGORICAL_FEATURES = ['Marque', 'Energie', 'Boite_Vitesses']
+BUCKETS = {name: LogBuckets(lo, hi, RELATIVE_ACCURACY) for name, (lo, hi) in NUMERIC_FEATURES.items()}
+
+# Clés d'entrée de l'API -> features surveillées (Age est calculé depuis annee)
+INPUT_KEYS = {'marque': 'Marque', 'kilometrage': 'Kilometrage', 'energie': 'Energie',
+              'boite_vitesses': 'Boite_Vitesses', 'puissance_fiscale': 'Puissance_Fiscale'}
+
+MAX_CATEGORIES = 200
+OTHER = '__AUTRE__'
+
+PSI_BINS = 10
+PSI_EPSILON = 1e-4
+# PSI < 0.1: stable ; 0.1 - 0.25: dérive modérée ; > 0.25: dérive
+PSI_THRESHOLDS = (0.1, 0.25)
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _index_scalaire(buckets, value):
+    """LogBuckets.index pour une seule valeur, sans passer par numpy"""
+    if not value >= buckets.min_value:
+        return 0
+    return math.ceil(math.log(min(value, buckets.max_value)) / buckets.log_gamma) - buckets.offset
+
+
+class FeatureSketch:
+    """
+    Distribution des features d'entrée en mémoire constante.
+
+    Deux sketches s'additionnent (fusion de fenêtres).
+    """
+
+    def __init__(self):
+        self.numeric = {name: np.zeros(BUCKETS[name].n_buckets, dtype=np.int64) for name in NUMERIC_FEATURES}
+        self.categorical = {name: {} for name in CATEGORICAL_FEATURES}
+        self.n = 0
+
+    def _compter(self, name, value, count=1):
+        counts = self.categorical[name]
+        if value not in counts and len(counts) >= MAX_CATEGORIES:
+            value = OTHER
+        counts[value] = counts.get(value, 0) + count
+
+    def ajouter_un(self, row):
+        """Ajoute un véhicule {feature: valeur} (chemin rapide d'une prédiction unitaire)"""
+        for name in NUMERIC_FEATURES:
+            value = row.get(name)
+            if isinstance(value, (int, float)) and value == value:
+                self.numeric[name][_index_scalaire(BUCKETS[name], value)] += 1
+        for name in CATEGORICAL_FEATURES:
+            value = row.get(name)
+            if isinstance(value, str) and value:
+                self._compter(name, value)
+        self.n += 1
+
+    def ajouter(self, df):
+        """Ajoute les véhicules d'un DataFrame aux colonnes Age, Kilometrage, Marque..."""
+        for name in NUMERIC_FEATURES:
+            values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            self.numeric[name] += np.bincount(BUCKETS[name].index(values), minlength=len(self.numeric[name]))
+        for name in CATEGORICAL_FEATURES:
+            values = df[name]
+            for value, count in values[values.notna() & (values != '')].astype(str).value_counts().items():
+                self._compter(name, value, int(count))
+        self.n += len(df)
+
+    def fusion(self, other):
+        """Nouveau sketch = self + other"""
+        merged = FeatureSketch()
+        merged.n = self.n + other.n
+        for name in NUMERIC_FEATURES:
+            merged.numeric[name] = self.numeric[name] + other.numeric[name]
+        for name in CATEGORICAL_FEATURES:
+            for sketch in (self, other):
+                for value, count in sketch.categorical[name].items():
+                    merged._compter(name, value, count)
+        return merged
+
+    def quantiles(self, name, quantiles=QUANTILES):
+        """Quantiles d'une feature numérique (erreur relative <= RELATIVE_ACCURACY)"""
+        counts = self.numeric[name]
+        total = counts.sum()
+        if total == 0:
+            return {f'p{int(q * 100)}': None for q in quantiles}
+        index = np.searchsorted(np.cumsum(counts), np.asarray(quantiles) * (total - 1) + 1)
+        return {f'p{int(q * 100)}': float(v) for q, v in zip(quantiles, BUCKETS[name].value(index))}
+
+    # ------------------------------------------------------------------
+    # Sérialisation (JSON, histogrammes creux)
+    # ------------------------------------------------------------------
+
+    def to_dict(self):
+        return {
+            'n': self.n,
+            'numeric': {
+                name: {
+                    'min': BUCKETS[name].min_value, 'max': BUCKETS[name].max_value,
+                    'relative_accuracy': BUCKETS[name].relative_accuracy,
+                    'counts': {str(i): int(counts[i]) for i in np.flatnonzero(counts)}
+                } for name, counts in self.numeric.items()
+            },
+            'categorical': self.categorical
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.n = data['n']
+        for name, entry in data['numeric'].items():
+            buckets = BUCKETS[name]
+            if (entry['min'], entry['max'], entry['relative_accuracy']) != \
+                    (buckets.min_value, buckets.max_value, buckets.relative_accuracy):
+                raise ValueError(f"Découpage de {name} incompatible avec le profil de référence")
+            for i, count in entry['counts'].items():
+                sketch.numeric[name][int(i)] = count
+        sketch.categorical = {name: dict(data['categorical'].get(name, {})) for name in CATEGORICAL_FEATURES}
+        return sketch
+
+
+def _psi(p_ref, p_live):
+    p_ref = np.maximum(p_ref, PSI_EPSILON)
+    p_live = np.maximum(p_live, PSI_EPSILON)
+    return float(np.sum((p_live - p_ref) * np.log(p_live / p_ref)))
+
+
+def _statut(psi, n, min_samples):
+    if n < min_samples:
+        return 'insuffisant'
+    if psi < PSI_THRESHOLDS[0]:
+        return 'stable'
+    return 'modere' if psi < PSI_THRESHOLDS[1] else 'derive'
+
+
+def comparer(reference, live, min_samples=100):
+    """
+    Scores de dérive de `live` par rapport à `reference`.
+
+    Parameters:
+    -----------
+    reference, live : FeatureSketch
+        Profil de référence et entrées récentes
+    min_samples : int
+        Effectif en dessous duquel le statut est 'insuffisant'
+
+    Returns:
+    --------
+    dict
+        {feature: {'psi', 'ks', 'status', ...}} et la liste des features en dérive
+    """
+    features = {}
+    for name in NUMERIC_FEATURES:
+        ref, cur = reference.numeric[name], live.numeric[name]
+        n = int(cur.sum())
+        entry = {'type': 'numerique', 'n': n, 'psi': None, 'ks': None,
+                 'quantiles': {'reference': reference.quantiles(name), 'live': live.quantiles(name)}}
+        if n and ref.sum():
+            ref_cdf, cur_cdf = np.cumsum(ref) / ref.sum(), np.cumsum(cur) / n
+            entry['ks'] = float(np.max(np.abs(ref_cdf - cur_cdf)))
+            # Classes du PSI: déciles de la référence (une classe couvre des buckets contigus)
+            edges = np.unique(np.searchsorted(ref_cdf, np.arange(1, PSI_BINS) / PSI_BINS))
+            bins = np.searchsorted(edges, np.arange(len(ref)), side='left')
+            entry['psi'] = _psi(np.bincount(bins, weights=ref) / ref.sum(), np.bincount(bins, weights=cur) / n)
+        entry['status'] = _statut(entry['psi'] or 0.0, n, min_samples)
+        features[name] = entry
+
+    for name in CATEGORICAL_FEATURES:
+        ref, cur = reference.categorical[name], live.categorical[name]
+        n, n_ref = sum(cur.values()), sum(ref.values())
+        entry = {'type': 'categorielle', 'n': n, 'psi': None, 'ks': None, 'new_values': {}}
+        if n and n_ref:
+            keys = sorted(set(ref) | set(cur))
+            entry['psi'] = _psi(np.array([ref.get(k, 0) for k in keys]) / n_ref,
+                                np.array([cur.get(k, 0) for k in keys]) / n)
+            new = sorted((k for k in cur if k not in ref), key=lambda k: -cur[k])[:10]
+            entry['new_values'] = {k: round(cur[k] / n, 4) for k in new}
+        entry['status'] = _statut(entry['psi'] or 0.0, n, min_samples)
+        features[name] = entry
+
+    return {
+        'n_reference': reference.n,
+        'n_live': live.n,
+        'features': features,
+        'drifting': [name for name, entry in features.items() if entry['status'] == 'derive']
+    }
+
+
+class DriftMonitor:
+    """
+    Moniteur de dérive branché sur le service de prédiction.
+
+    Parameters:
+    -----------
+    reference : FeatureSketch
+        Profil du jeu d'entraînement
+    window_seconds : float
+        Durée d'une fenêtre ; les scores portent sur la fenêtre courante et la précédente
+    compare_every : float
+        Période (s) de recalcul des scores
+    min_samples : int
+        Effectif minimal pour statuer sur une feature
+
+    Example:
+    --------
+    >>> monitor = charger_moniteur('models/drift_reference.json')
+    >>> monitor.update([{'marque': 'PEUGEOT', 'annee': 2018, 'kilometrage': 80000, ...}])
+    >>> monitor.scores()['drifting']
+    """
+
+    def __init__(self, reference, window_seconds=86400, compare_every=60, min_samples=100):
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.compare_every = compare_every
+        self.min_samples = min_samples
+        self.current = FeatureSketch()
+        self.previous = None
+        self.window_start = time.time()
+        self._last_compare = 0.0
+        self._scores = None
+        self._lock = threading.Lock()
+
+    def update(self, inputs):
+        """
+        Ajoute les véhicules d'une requête (clés de l'API: marque, annee, kilometrage...).
+
+        Parameters:
+        -----------
+        inputs : list of dict ou dict of list
+            Véhicules ligne par ligne ou en colonnes
+        """
+        year = datetime.now().year
+        if isinstance(inputs, list) and len(inputs) == 1 and isinstance(inputs[0], dict):
+            vehicle = inputs[0]
+            row = {feature: vehicle.get(key) for key, feature in INPUT_KEYS.items()}
+            annee = vehicle.get('annee')
+            row['Age'] = year - annee if isinstance(annee, (int, float)) else None
+            batch = None
+        else:
+            df = pd.DataFrame(inputs, columns=['annee'] + list(INPUT_KEYS))
+            batch = df.rename(columns=INPUT_KEYS)
+            batch['Age'] = year - pd.to_numeric(df['annee'], errors='coerce')
+
+        now = time.time()
+        with self._lock:
+            if now - self.window_start >= self.window_seconds:
+                self.previous, self.current = self.current, FeatureSketch()
+                self.window_start = now
+            if batch is None:
+                self.current.ajouter_un(row)
+            else:
+                self.current.ajouter(batch)
+            if now - self._last_compare >= self.compare_every:
+                self._compare(now)
+
+    def _compare(self, now):
+        live = self.current if self.previous is None else self.previous.fusion(self.current)
+        self._scores = dict(comparer(self.reference, live, self.min_samples),
+                            computed_at=now, window_start=self.window_start, window_seconds=self.window_seconds)
+        self._last_compare = now
+
+    def scores(self, refresh=False):
+        """Derniers scores de dérive (recalculés si refresh ou jamais calculés)"""
+        with self._lock:
+            if refresh or self._scores is None:
+                self._compare(time.time())
+            return self._scores
+
+
+# ----------------------------------------------------------------------
+# Profil de référence
+# ----------------------------------------------------------------------
+
+def construire_reference(train=None):
+    """
+    Profil des features du jeu d'entraînement du modèle servi.
+
+    Parameters:
+    -----------
+    train : pd.DataFrame, optional
+        Annonces d'entraînement ; par défaut les lignes sur lesquelles l'étape
+        train de build_pipeline.py entraîne le modèle (dataset dédoublonné
+        hors holdout)
+
+    Returns:
+    --------
+    FeatureSketch
+    """
+    if train is None:
+        from build_pipeline import lignes_entrainement
+
+        train = lignes_entrainement(DATASET_PATH)
+    reference = FeatureSketch()
+    reference.ajouter(train)
+    return reference
+
+
+def sauvegarder_reference(reference, path=REFERENCE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': REFERENCE_VERSION, 'profile': reference.to_dict()}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+
+
+def charger_reference(path=REFERENCE_PATH):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != REFERENCE_VERSION:
+        raise ValueError(f"Version de profil non supportée: {data.get('version')}")
+    return FeatureSketch.from_dict(data['profile'])
+
+
+def charger_moniteur(reference_path=REFERENCE_PATH, **kwargs):
+    """
+    Moniteur sur le profil préconstruit, ou sur un profil calculé depuis le jeu d'entraînement.
+
+    Returns:
+    --------
+    DriftMonitor
+    """
+    if reference_path and os.path.exists(reference_path):
+        reference = charger_reference(reference_path)
+    else:
+        reference = construire_reference()
+    return DriftMonitor(reference, **kwargs)
+
+
+def _afficher_scores(scores):
+    for name, entry in scores['features'].items():
+        psi = '-' if entry['psi'] is None else f"{entry['psi']:.3f}"
+        ks = '' if entry['ks'] is None else f", KS {entry['ks']:.3f}"
+        new = f", nouvelles modalités: {list(entry['new_values'])}" if entry.get('new_values') else ''
+        print(f"   • {name:<18} PSI {psi}{ks} [{entry['status']}]{new}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profil de référence et dérive des features")
+    parser.add_argument('--dataset', default=DATASET_PATH, help="Dataset dédoublonné du pipeline")
+    parser.add_argument('--output', default=REFERENCE_PATH)
+    parser.add_argument('--compare-log', default=None, help="Journal des prédictions à comparer à la référence")
+    parser.add_argument('--since', default=None)
+    parser.add_argument('--until', default=None)
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("📈 DÉRIVE DES FEATURES")
+    print("=" * 70)
+    if args.compare_log:
+        from request_log import lire_journal
+
+        reference = charger_reference(args.output)
+        df = lire_journal(args.compare_log, args.since, args.until)
+        live = FeatureSketch()
+        live.ajouter(df.assign(Age=pd.to_datetime(df['ts'], unit='s').dt.year - df['annee'])
+                     .rename(columns=INPUT_KEYS))
+        print(f"   • Référence: {reference.n} annonces, journal: {live.n} prédictions")
+        _afficher_scores(comparer(reference, live))
+        return
+
+    from build_pipeline import lignes_entrainement
+
+    reference = construire_reference(lignes_entrainement(args.dataset))
+    print(f"   • {reference.n} annonces d'entraînement")
+    for name in NUMERIC_FEATURES:
+        print(f"   • {name}: {reference.quantiles(name)}")
+    for name in CATEGORICAL_FEATURES:
+        print(f"   • {name}: {len(reference.categorical[name])} modalités")
+    sauvegarder_reference(reference, args.output)
+    print(f"\n💾 Profil sauvegardé: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Feature Transformer - Feature engineering partagé entre entraînement et service
+=================================================================================
+
+Ce module contient la classe CarFeatureTransformer, l'unique implémentation du
+feature engineering (Km_par_Age, Log_Km, Is_Luxury, Puissance_Age_Ratio,
+catégories d'âge et de marque, encodages One-Hot et Label). Elle travaille sur
+des colonnes entières : le même code transforme les 5 000 lignes du dataset
+d'entraînement et la ligne unique d'une requête de l'API.
+
+Le transformer est appris pendant l'entraînement (build_pipeline.py), sérialisé
+à côté du modèle (models/feature_transformer.pkl) puis rechargé par
+CarPricePredictor. Il fixe explicitement l'ordre des features.
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+MARQUES_ACCEPTEES = [
+    'MERCEDES', 'VW', 'PEUGEOT', 'KIA', 'CITROEN', 'BMW', 'Fiat', 'OTHER_BRAND',
+    'Audi', 'CHINESE', 'HYUNDAI', 'Toyota', 'SUZUKI', 'RENAULT', 'Dacia',
+    'JAPANESE', 'Ford', 'MG', 'GWM', 'SEAT', 'AMERICAN', 'NISSAN', 'CHERY',
+    'SKODA', 'Porsche', 'LUXURY_BRAND', 'Opel', 'Mini', 'Land Rover', 'UTILITY'
+]
+
+LUXURY_BRANDS = ['BMW', 'MERCEDES', 'Audi', 'Porsche', 'Land Rover', 'LUXURY_BRAND', 'Mini']
+
+BRAND_CATEGORIES = {
+    'Economic_European': ['PEUGEOT', 'CITROEN', 'RENAULT', 'Fiat', 'SEAT', 'Dacia', 'Opel', 'SKODA', 'Ford'],
+    'Premium_European': ['BMW', 'MERCEDES', 'Audi', 'VW', 'Porsche', 'Land Rover', 'Mini', 'LUXURY_BRAND'],
+    'Asian': ['Toyota', 'HYUNDAI', 'KIA', 'SUZUKI', 'NISSAN', 'JAPANESE'],
+    'Chinese': ['CHINESE', 'MG', 'GWM', 'CHERY'],
+    'Other': ['OTHER_BRAND', 'AMERICAN', 'UTILITY']
+}
+
+ENERGIES_ACCEPTEES = ['Diesel', 'Essence', 'Hybride', 'Electrique', 'GPL']
+
+BOITES_ACCEPTEES = ['Manuelle', 'Automatique']
+
+# Features numériques, binaires et Label-encodées, dans l'ordre du modèle
+BASE_FEATURES = [
+    'Age', 'Kilometrage', 'Puissance_Fiscale',
+    'Km_par_Age', 'Log_Km', 'Is_Luxury', 'Puissance_Age_Ratio',
+    'Boite_Auto', 'Marque_encoded'
+]
+
+_BRAND_TO_CATEGORY = {b: cat for cat, brands in BRAND_CATEGORIES.items() for b in brands}
+
+
+def age_category(age):
+    """
+    Catégorise les véhicules selon leur âge (vectorisé).
+
+    Parameters:
+    -----------
+    age : array-like
+        Âges des véhicules
+
+    Returns:
+    --------
+    np.ndarray
+        'Neuf', 'Récent', 'Occasion_Standard' ou 'Ancien'
+    """
+    age = np.asarray(age, dtype=float)
+    return np.select(
+        [age == 0, age <= 3, age <= 7],
+        ['Neuf', 'Récent', 'Occasion_Standard'],
+        default='Ancien'
+    )
+
+
+def categorize_brand(marques):
+    """
+    Catégorise les marques selon leur origine (vectorisé).
+
+    Parameters:
+    -----------
+    marques : array-like
+        Marques des véhicules
+
+    Returns:
+    --------
+    np.ndarray
+        Catégorie de chaque marque ('Other' si inconnue)
+    """
+    return pd.Series(marques, dtype=object).map(_BRAND_TO_CATEGORY).fillna('Other').to_numpy()
+
+
+class CarFeatureTransformer:
+    """
+    Transforme des colonnes brutes (Marque, Age/Annee, Kilometrage, Energie,
+    Boite_Vitesses, Puissance_Fiscale) en matrice de features pour le modèle.
+
+    Attributes:
+    -----------
+    marque_classes_ : list
+        Marques connues, dans l'ordre de leur code (équivalent LabelEncoder)
+    energie_columns : list
+        Colonnes One-Hot de l'énergie
+    brand_category_columns : list
+        Colonnes One-Hot de la catégorie de marque
+    age_category_columns : list
+        Colonnes One-Hot de la catégorie d'âge
+    feature_names_ : list
+        Ordre exact des colonnes produites par transform
+
+    Example:
+    --------
+    >>> transformer = CarFeatureTransformer().fit(df_train)
+    >>> X = transformer.transform(df_train)
+    >>> transformer.save('models/feature_transformer.pkl')
+    """
+
+    def __init__(self):
+        self.marque_classes_ = None
+        self.energie_columns = None
+        self.brand_category_columns = None
+        self.age_category_columns = None
+        self.feature_names_ = None
+        self._marque_codes = None
+
+    # ------------------------------------------------------------------
+    # Apprentissage et sérialisation
+    # ------------------------------------------------------------------
+
+    def fit(self, df):
+        """
+        Apprend les encodages à partir du dataset d'entraînement.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Dataset avec les colonnes Marque, Age, Energie
+
+        Returns:
+        --------
+        CarFeatureTransformer
+            self
+        """
+        age = self._ages(df)
+        self.marque_classes_ = sorted(df['Marque'].unique())
+        self.energie_columns = [f'Energie_{v}' for v in sorted(df['Energie'].unique())]
+        self.brand_category_columns = [f'Brand_Cat_{v}' for v in sorted(set(categorize_brand(df['Marque'])))]
+        self.age_category_columns = [f'Age_Cat_{v}' for v in sorted(set(age_category(age)))]
+        self._finalize()
+        return self
+
+    @classmethod
+    def from_encoders(cls, encoders, feature_names=None):
+        """
+        Construit le transformer depuis l'ancien dictionnaire encoders.pkl.
+
+        Parameters:
+        -----------
+        encoders : dict
+            Dictionnaire produit par training/training.ipynb
+        feature_names : list, optional
+            Ordre des features (feature_names.pkl) à vérifier
+        """
+        transformer = cls()
+        transformer.marque_classes_ = list(encoders['marque_encoder'].classes_)
+        transformer.energie_columns = list(encoders['energie_columns'])
+        transformer.brand_category_columns = list(encoders['brand_category_columns'])
+        transformer.age_category_columns = list(encoders['age_category_columns'])
+        transformer._finalize()
+        if feature_names is not None and list(feature_names) != transformer.feature_names_:
+            raise ValueError(f"Ordre des features incompatible avec les encodeurs: {list(feature_names)}")
+        return transformer
+
+    def to_encoders(self):
+        """Exporte le dictionnaire encoders.pkl attendu par les notebooks"""
+        from sklearn.preprocessing import LabelEncoder
+
+        le_marque = LabelEncoder()
+        le_marque.classes_ = np.array(self.marque_classes_, dtype=object)
+        return {
+            'energie_columns': list(self.energie_columns),
+            'brand_category_columns': list(self.brand_category_columns),
+            'age_category_columns': list(self.age_category_columns),
+            'marque_encoder': le_marque
+        }
+
+    def _finalize(self):
+        self._marque_codes = {m: i for i, m in enumerate(self.marque_classes_)}
+        self.feature_names_ = (
+            BASE_FEATURES + self.energie_columns + self.brand_category_columns + self.age_category_columns
+        )
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            transformer = pickle.load(f)
+        if not isinstance(transformer, cls):
+            raise TypeError(f"{path} ne contient pas un {cls.__name__}")
+        return transformer
+
+    # ------------------------------------------------------------------
+    # Validation et transformation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _ages(df, reference_year=None):
+        if 'Age' in df.columns:
+            return df['Age'].to_numpy(dtype=float)
+        reference_year = reference_year or datetime.now().year
+        return reference_year - df['Annee'].to_numpy(dtype=float)
+
+    def validate(self, df, reference_year=None):
+        """
+        Vérifie les valeurs d'entrée ligne par ligne.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Colonnes Marque, Annee (ou Age), Energie, Boite_Vitesses
+        reference_year : int, optional
+            Année de référence pour le calcul de l'âge (année courante par défaut)
+
+        Returns:
+        --------
+        np.ndarray
+            Message d'erreur pour chaque ligne invalide, None sinon
+        """
+        errors = np.full(len(df), None, dtype=object)
+
+        age = self._ages(df, reference_year)
+        for i in np.flatnonzero(age < 0):
+            errors[i] = f"L'année {df['Annee'].iat[i]:.0f} est dans le futur!"
+        for i in np.flatnonzero(np.isnan(age)):
+            errors[i] = "Valeur numérique invalide pour Annee"
+        for col in ['Kilometrage', 'Puissance_Fiscale']:
+            for i in np.flatnonzero(np.isnan(df[col].to_numpy(dtype=float))):
+                errors[i] = f"Valeur numérique invalide pour {col}"
+        for i in np.flatnonzero(~df['Boite_Vitesses'].isin(BOITES_ACCEPTEES).to_numpy()):
+            errors[i] = f"Boîte '{df['Boite_Vitesses'].iat[i]}' non reconnue. Valeurs acceptées: {BOITES_ACCEPTEES}"
+        for i in np.flatnonzero(~df['Energie'].isin(ENERGIES_ACCEPTEES).to_numpy()):
+            errors[i] = f"Énergie '{df['Energie'].iat[i]}' non reconnue. Valeurs acceptées: {ENERGIES_ACCEPTEES}"
+        for i in np.flatnonzero(~df['Marque'].isin(MARQUES_ACCEPTEES).to_numpy()):
+            errors[i] = f"Marque '{df['Marque'].iat[i]}' non reconnue. Marques acceptées: {MARQUES_ACCEPTEES}"
+        return errors
+
+    # Colonnes d'entrée dont dépend chaque groupe de features
+    GROUP_INPUTS = {
+        'numeriques': {'Age', 'Annee', 'Kilometrage', 'Puissance_Fiscale'},
+        'marque': {'Marque'},
+        'boite': {'Boite_Vitesses'},
+        'energie': {'Energie'},
+        'age_cat': {'Age', 'Annee'}
+    }
+
+    def _groupe(self, name, df, reference_year=None):
+        """Calcule les colonnes d'un groupe de features"""
+        if name == 'numeriques':
+            age = self._ages(df, reference_year)
+            km = df['Kilometrage'].to_numpy(dtype=float)
+            puissance = df['Puissance_Fiscale'].to_numpy(dtype=float)
+            return {
+                'Age': age,
+                'Kilometrage': km,
+                'Puissance_Fiscale': puissance,
+                'Km_par_Age': km / (age + 1),
+                'Log_Km': np.log1p(km),
+                'Puissance_Age_Ratio': puissance / (age + 1)
+            }
+        if name == 'marque':
+            marque = df['Marque'].to_numpy(dtype=object)
+            other_code = self._marque_codes.get('OTHER_BRAND', 0)
+            marque_encoded = pd.Series(marque, dtype=object).map(self._marque_codes).fillna(other_code)
+            brand_cat = categorize_brand(marque)
+            columns = {
+                'Is_Luxury': np.isin(marque, LUXURY_BRANDS).astype(int),
+                'Marque_encoded': marque_encoded.to_numpy(dtype=int)
+            }
+            for col in self.brand_category_columns:
+                columns[col] = (brand_cat == col.replace('Brand_Cat_', '')).astype(int)
+            return columns
+        if name == 'boite':
+            return {'Boite_Auto': (df['Boite_Vitesses'].to_numpy(dtype=object) == 'Automatique').astype(int)}
+        if name == 'energie':
+            energie = df['Energie'].to_numpy(dtype=object)
+            return {col: (energie == col.replace('Energie_', '')).astype(int) for col in self.energie_columns}
+        if name == 'age_cat':
+            age_cat = age_category(self._ages(df, reference_year))
+            return {col: (age_cat == col.replace('Age_Cat_', '')).astype(int) for col in self.age_category_columns}
+        raise ValueError(f"Groupe de features inconnu: {name}")
+
+    def transform(self, df, reference_year=None):
+        """
+        Construit la matrice de features de manière vectorisée.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Colonnes Marque, Age ou Annee, Kilometrage, Energie,
+            Boite_Vitesses et Puissance_Fiscale
+        reference_year : int, optional
+            Année de référence quand l'âge est calculé depuis Annee
+
+        Returns:
+        --------
+        pd.DataFrame
+            Features dans l'ordre de feature_names_
+        """
+        if self.feature_names_ is None:
+            raise ValueError("CarFeatureTransformer non entraîné: appeler fit() d'abord")
+
+        columns = {}
+        for name in self.GROUP_INPUTS:
+            columns.update(self._groupe(name, df, reference_year))
+        return pd.DataFrame(columns, columns=self.feature_names_)
+
+    def transform_sweep(self, base, grid, reference_year=None):
+        """
+        Features d'une grille de variantes d'un même véhicule.
+
+        Les groupes de features qui ne dépendent d'aucune colonne de la grille
+        sont calculés une seule fois sur le véhicule de base puis répétés.
+
+        Parameters:
+        -----------
+        base : pd.DataFrame
+            Véhicule de base (une ligne, colonnes brutes)
+        grid : pd.DataFrame
+            Valeurs des colonnes qui varient, une ligne par point de la grille
+
+        Returns:
+        --------
+        pd.DataFrame
+            Features dans l'ordre de feature_names_, une ligne par point
+        """
+        if self.feature_names_ is None:
+            raise ValueError("CarFeatureTransformer non entraîné: appeler fit() d'abord")
+
+        n = len(grid)
+        varied = set(grid.columns)
+        full = None
+        columns = {}
+        for name, inputs in self.GROUP_INPUTS.items():
+            if inputs & varied:
+                if full is None:
+                    full = pd.DataFrame({col: np.repeat(base[col].to_numpy(), n) for col in base.columns})
+                    for col in grid.columns:
+                        full[col] = grid[col].to_numpy()
+                columns.update(self._groupe(name, full, reference_year))
+            else:
+                columns.update({k: np.repeat(v, n) for k, v in self._groupe(name, base, reference_year).items()})
+        return pd.DataFrame(columns, columns=self.feature_names_)
@@ -69,7 +69,8 @@ export default function PredictionForm(){
 
     try {
       setLoading(true)
-      const res = await axios.post('/api/predict', vehicle)
+      // GET so that repeated lookups are answered by the browser/CDN cache (ETag)
+      const res = await axios.get('/api/predict', { params: vehicle })
       if(res.data && res.data.success){
         setResult(res.data)
       } else {
@@ -0,0 +1,501 @@
+"""
+Hyperparameter Search - Recherche d'hyperparamètres parallèle et reprenable
+============================================================================
+
+Remplace le GridSearchCV exhaustif et les trois cross_val_score successifs
+(r2, MSE, MAE) de training/training.ipynb :
+
+1. Chaque essai entraîne le modèle une seule fois par fold et calcule R²,
+   RMSE et MAE sur les mêmes prédictions.
+2. Les candidats sont tirés au hasard dans l'espace du notebook puis départagés
+   par successive halving : tous les candidats sont évalués sur un échantillon
+   réduit du fold d'entraînement, seul le meilleur tiers passe au palier
+   suivant, avec trois fois plus de données.
+3. La matrice de features est écrite une fois en .npy et ouverte en
+   memory-map par chaque processus (pas de copie par worker).
+4. Chaque essai terminé est ajouté au fichier trials.jsonl. Un essai est
+   identifié par le hash de sa définition et des données : une recherche
+   interrompue reprend là où elle s'était arrêtée.
+
+models/cross_validation_results.csv et models/tuning_comparison.csv sont
+reconstruits à partir de ce fichier.
+
+Usage:
+------
+    python hyperparameter_search.py                      # dataset du notebook
+    python hyperparameter_search.py --features Data/build/features.npz
+    python hyperparameter_search.py --models "Extra Trees" --workers 4
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+
+DATASET_PATH = os.path.join('Data', 'cleaned', 'dataset_final_complet_petit.csv')
+STORE_DIR = os.path.join('Data', 'build', 'tuning')
+OUTPUT_DIR = 'models'
+
+# Espace de recherche de training/training.ipynb
+SEARCH_SPACE = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [10, 15, 20, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2']
+}
+
+# Paramètres des modèles "Base" du notebook
+BASE_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
+
+MODELES = {
+    'Random Forest': 'RandomForestRegressor',
+    'Extra Trees': 'ExtraTreesRegressor'
+}
+
+FICHIERS_MODELES = {
+    'Random Forest': 'random_forest_tuned.pkl',
+    'Extra Trees': 'extra_trees_tuned.pkl'
+}
+
+RANDOM_STATE = 42
+
+
+# ============================================================================
+# DONNÉES PARTAGÉES
+# ============================================================================
+
+def charger_matrice(dataset_path=DATASET_PATH, features_path=None):
+    """
+    Charge la matrice de features et la cible.
+
+    Parameters:
+    -----------
+    dataset_path : str
+        Dataset nettoyé, transformé avec CarFeatureTransformer
+    features_path : str, optional
+        Matrice features.npz produite par build_pipeline.py (prioritaire)
+
+    Returns:
+    --------
+    tuple
+        (X, y, feature_names)
+    """
+    if features_path:
+        data = np.load(features_path, allow_pickle=True)
+        return data['X'].astype(float), data['y'].astype(float), list(data['feature_names'])
+
+    from feature_transformer import CarFeatureTransformer
+
+    df = pd.read_csv(dataset_path, encoding='utf-8-sig')
+    df = df.dropna(subset=['Prix'])
+    for col in df.select_dtypes(include=[np.number]).columns:
+        df[col] = df[col].fillna(df[col].median())
+
+    transformer = CarFeatureTransformer().fit(df)
+    X = transformer.transform(df).to_numpy(dtype=float)
+    return X, df['Prix'].to_numpy(dtype=float), transformer.feature_names_
+
+
+def ecrire_matrice(X, y, store_dir):
+    """
+    Écrit X et y en .npy pour qu'ils soient ouverts en memory-map par les workers.
+
+    Returns:
+    --------
+    tuple
+        (chemin X, chemin y, hash des données)
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    data_hash = hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest()[:16]
+
+    paths = []
+    for name, array in (('X', X), ('y', y)):
+        path = os.path.join(store_dir, f'{name}.npy')
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths[0], paths[1], data_hash
+
+
+_X = None
+_y = None
+
+
+def _init_worker(x_path, y_path):
+    global _X, _y
+    _X = np.load(x_path, mmap_mode='r')
+    _y = np.load(y_path, mmap_mode='r')
+
+
+# ============================================================================
+# ÉVALUATION D'UN ESSAI
+# ============================================================================
+
+def _creer_modele(modele, params):
+    from sklearn import ensemble
+
+    estimator = getattr(ensemble, MODELES[modele])
+    # Un cœur par essai: le parallélisme est assuré par les processus
+    return estimator(**params, random_state=RANDOM_STATE, n_jobs=1)
+
+
+def _metriques(y_true, y_pred):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    return {
+        'r2': r2_score(y_true, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': mean_absolute_error(y_true, y_pred)
+    }
+
+
+def evaluer_essai(spec):
+    """
+    Évalue un essai sur la matrice partagée du worker.
+
+    Parameters:
+    -----------
+    spec : dict
+        kind ('cv' ou 'holdout'), modele, params, et pour 'cv': n_splits et
+        n_samples (taille du sous-échantillon d'entraînement, None = complet)
+
+    Returns:
+    --------
+    dict
+        Métriques de l'essai (listes par fold pour 'cv')
+    """
+    from sklearn.model_selection import KFold, train_test_split
+
+    start = time.time()
+    indices = np.arange(len(_y))
+
+    if spec['kind'] == 'holdout':
+        train_idx, test_idx = train_test_split(indices, test_size=0.2, random_state=RANDOM_STATE, shuffle=True)
+        model = _creer_modele(spec['modele'], spec['params'])
+        model.fit(_X[train_idx], _y[train_idx])
+        train = _metriques(_y[train_idx], model.predict(_X[train_idx]))
+        test = _metriques(_y[test_idx], model.predict(_X[test_idx]))
+        result = {f'train_{k}': v for k, v in train.items()}
+        result.update({f'test_{k}': v for k, v in test.items()})
+    else:
+        folds = {'r2': [], 'rmse': [], 'mae': []}
+        kfold = KFold(n_splits=spec['n_splits'], shuffle=True, random_state=RANDOM_STATE)
+        for fold, (train_idx, test_idx) in enumerate(kfold.split(indices)):
+            if spec.get('n_samples') and spec['n_samples'] < len(train_idx):
+                rng = np.random.RandomState(RANDOM_STATE + fold)
+                train_idx = np.sort(rng.choice(train_idx, spec['n_samples'], replace=False))
+            model = _creer_modele(spec['modele'], spec['params'])
+            model.fit(_X[train_idx], _y[train_idx])
+            # Une seule prédiction par fold pour les trois métriques
+            for name, value in _metriques(_y[test_idx], model.predict(_X[test_idx])).items():
+                folds[name].append(value)
+        result = {f'{name}_scores': values for name, values in folds.items()}
+        result.update({f'{name}_mean': float(np.mean(v)) for name, v in folds.items()})
+        result.update({f'{name}_std': float(np.std(v)) for name, v in folds.items()})
+
+    result['duration'] = time.time() - start
+    return result
+
+
+# ============================================================================
+# STOCKAGE DES ESSAIS
+# ============================================================================
+
+class TrialStore:
+    """
+    Journal append-only des essais terminés (une ligne JSON par essai).
+
+    Parameters:
+    -----------
+    path : str
+        Fichier trials.jsonl
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+        if lines and not lines[-1].endswith('\n'):
+            # Dernière ligne tronquée par une interruption: on la retire du journal
+            lines = lines[:-1]
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+        for line in lines:
+            record = json.loads(line)
+            self.records[record['key']] = record
+
+    @staticmethod
+    def cle(spec, data_hash):
+        payload = json.dumps({'spec': spec, 'data': data_hash}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def get(self, key):
+        return self.records[key]['result']
+
+    def ajouter(self, key, spec, result):
+        record = {'key': key, 'spec': spec, 'result': result}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[key] = record
+
+
+# ============================================================================
+# RECHERCHE
+# ============================================================================
+
+class HyperparameterSearch:
+    """
+    Recherche aléatoire + successive halving sur une matrice partagée.
+
+    Parameters:
+    -----------
+    X, y : np.ndarray
+        Matrice de features et cible
+    store_dir : str
+        Dossier contenant la matrice memory-mappée et trials.jsonl
+    max_workers : int, optional
+        Nombre de processus (nombre de cœurs par défaut)
+    cv : int
+        Nombre de folds pendant la recherche
+    """
+
+    def __init__(self, X, y, store_dir=STORE_DIR, max_workers=None, cv=5):
+        self.x_path, self.y_path, self.data_hash = ecrire_matrice(X, y, store_dir)
+        self.n_rows = len(y)
+        self.store = TrialStore(os.path.join(store_dir, 'trials.jsonl'))
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cv = cv
+
+    def executer(self, specs):
+        """
+        Évalue les essais absents du journal, en parallèle.
+
+        Returns:
+        --------
+        list of dict
+            Résultats dans l'ordre des specs
+        """
+        keys = [TrialStore.cle(spec, self.data_hash) for spec in specs]
+        todo = {key: spec for key, spec in zip(keys, specs) if key not in self.store}
+        if len(todo) < len(specs):
+            print(f"   ↪ {len(specs) - len(todo)} essai(s) repris du journal")
+
+        if todo:
+            workers = min(self.max_workers, len(todo))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.x_path, self.y_path)) as executor:
+                futures = {executor.submit(evaluer_essai, spec): key for key, spec in todo.items()}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    # Persisté dès la fin de l'essai: une interruption ne perd que les essais en cours
+                    self.store.ajouter(key, todo[key], future.result())
+
+        return [self.store.get(key) for key in keys]
+
+    def successive_halving(self, modele, n_candidates=27, factor=3, min_samples=200):
+        """
+        Sélectionne les meilleurs hyperparamètres d'un modèle.
+
+        Parameters:
+        -----------
+        modele : str
+            'Random Forest' ou 'Extra Trees'
+        n_candidates : int
+            Nombre de combinaisons tirées dans SEARCH_SPACE
+        factor : int
+            Part des candidats éliminés à chaque palier (1 - 1/factor)
+        min_samples : int
+            Taille minimale de l'échantillon d'entraînement du premier palier
+
+        Returns:
+        --------
+        dict
+            Meilleurs hyperparamètres
+        """
+        from sklearn.model_selection import ParameterSampler
+
+        candidates = list(ParameterSampler(SEARCH_SPACE, n_iter=n_candidates, random_state=RANDOM_STATE))
+        max_samples = self.n_rows - math.ceil(self.n_rows / self.cv)
+        n_rungs = max(1, math.ceil(math.log(len(candidates), factor)))
+        n_rungs = min(n_rungs, 1 + max(0, int(math.log(max_samples / min_samples, factor))))
+
+        print(f"\n🎯 {modele}: {len(candidates)} candidats, {n_rungs} palier(s), {self.cv} folds")
+        for rung in range(n_rungs):
+            n_samples = int(max_samples / factor ** (n_rungs - 1 - rung))
+            specs = [
+                {'kind': 'cv', 'modele': modele, 'params': params,
+                 'n_splits': self.cv, 'n_samples': None if rung == n_rungs - 1 else n_samples}
+                for params in candidates
+            ]
+            results = self.executer(specs)
+            order = np.argsort([-r['r2_mean'] for r in results], kind='stable')
+            print(f"   • Palier {rung + 1}: {len(candidates)} candidats sur {n_samples} lignes "
+                  f"→ meilleur R² {results[order[0]]['r2_mean']:.4f}")
+            if rung < n_rungs - 1:
+                keep = max(1, math.ceil(len(candidates) / factor))
+                candidates = [candidates[i] for i in order[:keep]]
+            else:
+                candidates = [candidates[order[0]]]
+
+        return candidates[0]
+
+
+# ============================================================================
+# RAPPORTS
+# ============================================================================
+
+def specs_finales(modele, params, cv_final=10):
+    """Essais de comparaison finale (validation croisée + split 80/20)"""
+    return {
+        'cv': {'kind': 'cv', 'modele': modele, 'params': params, 'n_splits': cv_final, 'n_samples': None},
+        'holdout': {'kind': 'holdout', 'modele': modele, 'params': params}
+    }
+
+
+def ecrire_rapports(store, essais, data_hash, output_dir=OUTPUT_DIR):
+    """
+    Construit les CSV de comparaison à partir du journal des essais.
+
+    Parameters:
+    -----------
+    store : TrialStore
+        Journal contenant les essais finaux
+    essais : dict
+        Nom affiché ('Extra Trees (Tuned)', ...) → specs_finales(...)
+    data_hash : str
+        Hash des données utilisées par la recherche
+
+    Returns:
+    --------
+    tuple of pd.DataFrame
+        (cross_validation_results, tuning_comparison)
+    """
+    cv_rows, tuning_rows = [], []
+    for name, specs in essais.items():
+        cv = store.get(TrialStore.cle(specs['cv'], data_hash))
+        holdout = store.get(TrialStore.cle(specs['holdout'], data_hash))
+        cv_rows.append({
+            'Modèle': name,
+            'R²_mean': cv['r2_mean'], 'R²_std': cv['r2_std'],
+            'RMSE_mean': cv['rmse_mean'], 'RMSE_std': cv['rmse_std'],
+            'MAE_mean': cv['mae_mean'], 'MAE_std': cv['mae_std'],
+            'CV_Coefficient': cv['r2_std'] / cv['r2_mean'] * 100
+        })
+        tuning_rows.append({
+            'Modèle': name,
+            'R² Train': holdout['train_r2'],
+            'R² Test': holdout['test_r2'],
+            'RMSE Test': holdout['test_rmse'],
+            'MAE Test': holdout['test_mae'],
+            'Overfitting': holdout['train_r2'] - holdout['test_r2']
+        })
+
+    os.makedirs(output_dir, exist_ok=True)
+    cv_df = pd.DataFrame(cv_rows)
+    tuning_df = pd.DataFrame(tuning_rows)
+    cv_df.to_csv(os.path.join(output_dir, 'cross_validation_results.csv'), index=False)
+    tuning_df.to_csv(os.path.join(output_dir, 'tuning_comparison.csv'), index=False)
+    return cv_df, tuning_df
+
+
+def sauvegarder_modele(modele, params, X, y, feature_names, output_dir=OUTPUT_DIR):
+    """Réentraîne le modèle optimisé sur le split d'entraînement 80% et le sauvegarde"""
+    from sklearn import ensemble
+    from sklearn.model_selection import train_test_split
+
+    X_train, _, y_train, _ = train_test_split(
+        pd.DataFrame(X, columns=feature_names), y, test_size=0.2, random_state=RANDOM_STATE, shuffle=True
+    )
+    model = getattr(ensemble, MODELES[modele])(**params, random_state=RANDOM_STATE, n_jobs=-1)
+    model.fit(X_train, y_train)
+    path = os.path.join(output_dir, FICHIERS_MODELES[modele])
+    with open(path, 'wb') as f:
+        pickle.dump(model, f)
+    print(f"💾 Modèle optimisé sauvegardé: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres parallèle et reprenable")
+    parser.add_argument('--dataset', default=DATASET_PATH, help="Dataset nettoyé (CSV)")
+    parser.add_argument('--features', default=None, help="Matrice features.npz du pipeline")
+    parser.add_argument('--models', nargs='*', default=list(MODELES), choices=list(MODELES))
+    parser.add_argument('--n-candidates', type=int, default=27)
+    parser.add_argument('--factor', type=int, default=3)
+    parser.add_argument('--cv', type=int, default=5, help="Folds pendant la recherche")
+    parser.add_argument('--cv-final', type=int, default=10, help="Folds de la validation finale")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--store', default=STORE_DIR, help="Dossier du journal des essais")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--save-models', action='store_true', help="Sauvegarder les modèles optimisés")
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("🎯 HYPERPARAMETER TUNING")
+    print("=" * 70)
+
+    X, y, feature_names = charger_matrice(args.dataset, args.features)
+    print(f"📊 Matrice: {X.shape[0]} lignes × {X.shape[1]} features")
+    search = HyperparameterSearch(X, y, store_dir=args.store, max_workers=args.workers, cv=args.cv)
+
+    start_time = time.time()
+    best_params = {}
+    for modele in args.models:
+        best_params[modele] = search.successive_halving(modele, args.n_candidates, args.factor)
+        print(f"🏆 {modele}: {best_params[modele]}")
+
+    essais = {}
+    for modele in args.models:
+        essais[f'{modele} (Base)'] = specs_finales(modele, BASE_PARAMS, args.cv_final)
+        essais[f'{modele} (Tuned)'] = specs_finales(modele, best_params[modele], args.cv_final)
+
+    print(f"\n🔄 Validation finale ({args.cv_final} folds + split 80/20)...")
+    search.executer([spec for specs in essais.values() for spec in specs.values()])
+    cv_df, tuning_df = ecrire_rapports(search.store, essais, search.data_hash, args.output_dir)
+
+    print(f"\n✅ Tuning terminé en {(time.time() - start_time) / 60:.2f} minutes")
+    print("\n📋 TABLEAU COMPARATIF:\n")
+    print(tuning_df.to_string(index=False))
+    print("\n🔄 STABILITÉ:\n")
+    print(cv_df.to_string(index=False))
+    print(f"\n💾 Résultats sauvegardés: {args.output_dir}/tuning_comparison.csv, "
+          f"{args.output_dir}/cross_validation_results.csv")
+
+    with open(os.path.join(args.store, 'best_params.json'), 'w', encoding='utf-8') as f:
+        json.dump(best_params, f, indent=2)
+
+    if args.save_models:
+        for modele, params in best_params.items():
+            sauvegarder_modele(modele, params, X, y, feature_names, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
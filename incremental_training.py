@@ -0,0 +1,326 @@
+"""
+Incremental Training - Réentraînement incrémental à l'arrivée de nouvelles annonces
+====================================================================================
+
+Au lieu de réentraîner chaque modèle depuis zéro sur tout l'historique, ce
+module met à jour les modèles existants avec le nouveau lot d'annonces :
+
+- Forêts (ExtraTreesRegressor, RandomForestRegressor): warm_start, de nouveaux
+  arbres sont ajoutés et entraînés sur les nouvelles annonces uniquement.
+- Boosting (LightGBM, XGBoost, CatBoost): l'entraînement reprend depuis le
+  booster picklé et ajoute des itérations sur les nouvelles annonces.
+
+Un holdout (holdout historique + 20% du nouveau lot) décide si le modèle mis à
+jour remplace celui de models/. Le coût du réentraînement dépend donc de la
+taille du lot, pas de celle de l'historique.
+
+Le holdout historique vient du split de l'étape train de build_pipeline.py :
+seuls les modèles entraînés sur ce split (même identifiant holdout_split_)
+passent la porte. Les modèles du notebook, entraînés sur un autre découpage,
+ont pu voir ces annonces et sont ignorés.
+
+Usage:
+------
+    python incremental_training.py --new Data/cleaned/nouveau_lot.csv
+    python incremental_training.py --new lot.csv --tolerance 0.002
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import copy
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from feature_transformer import CarFeatureTransformer
+
+
+DATASET_PATH = os.path.join('Data', 'cleaned', 'dataset_final_complet_petit.csv')
+HOLDOUT_PATH = os.path.join('Data', 'build', 'holdout.csv')
+HOLDOUT_SPLIT_PATH = os.path.join('Data', 'build', 'holdout_split.json')
+TRANSFORMER_PATH = os.path.join('models', 'feature_transformer.pkl')
+ENCODERS_PATH = os.path.join('models', 'encoders.pkl')
+
+# Le modèle entraîné par build_pipeline.py sur le split du holdout
+MODELES_PAR_DEFAUT = [
+    os.path.join('models', 'extra_trees_tuned.pkl')
+]
+
+FORETS = ('ExtraTreesRegressor', 'RandomForestRegressor')
+BOOSTINGS = ('LGBMRegressor', 'XGBRegressor', 'CatBoostRegressor')
+
+RANDOM_STATE = 42
+
+
+# ============================================================================
+# DONNÉES
+# ============================================================================
+
+def preparer_annonces(df):
+    """Même préparation que l'étape features de build_pipeline.py"""
+    from build_pipeline import preparer_dataset
+
+    return preparer_dataset(df)
+
+
+def charger_transformer(transformer_path=TRANSFORMER_PATH, encoders_path=ENCODERS_PATH):
+    """Charge le transformer servi avec les modèles (ou le reconstruit depuis encoders.pkl)"""
+    if os.path.exists(transformer_path):
+        return CarFeatureTransformer.load(transformer_path)
+    with open(encoders_path, 'rb') as f:
+        return CarFeatureTransformer.from_encoders(pickle.load(f))
+
+
+def charger_holdout(holdout_path=HOLDOUT_PATH):
+    """
+    Charge le holdout historique : les annonces écartées de l'entraînement du
+    modèle servi par l'étape train de build_pipeline.py (complétées par le
+    holdout des lots incrémentaux déjà appliqués).
+    """
+    if not os.path.exists(holdout_path):
+        raise FileNotFoundError(
+            f"Holdout absent: {holdout_path} (exécuter python build_pipeline.py pour le produire "
+            f"avec le modèle)"
+        )
+    return pd.read_csv(holdout_path, encoding='utf-8-sig')
+
+
+def charger_split(split_path=HOLDOUT_SPLIT_PATH):
+    """Identifiant du split entraînement / holdout qui a produit le holdout historique"""
+    if not os.path.exists(split_path):
+        raise FileNotFoundError(
+            f"Split du holdout absent: {split_path} (exécuter python build_pipeline.py pour le produire "
+            f"avec le modèle)"
+        )
+    with open(split_path, 'r', encoding='utf-8') as f:
+        return json.load(f)['split']
+
+
+def separer_lot(df_new, holdout_fraction=0.2):
+    """Sépare le nouveau lot en partie entraînement / partie holdout"""
+    if len(df_new) < 5 or holdout_fraction <= 0:
+        return df_new, df_new.iloc[:0]
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(df_new, test_size=holdout_fraction, random_state=RANDOM_STATE, shuffle=True)
+
+
+# ============================================================================
+# MISE À JOUR DES MODÈLES
+# ============================================================================
+
+def mettre_a_jour_foret(model, X, y, n_arbres=20):
+    """
+    Ajoute n_arbres arbres entraînés sur (X, y) à une forêt existante.
+
+    Les arbres existants ne sont pas réentraînés (warm_start).
+    """
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + n_arbres)
+    model.fit(X, y)
+    model.set_params(warm_start=False)
+    return model
+
+
+def continuer_boosting(model, X, y, n_iterations=50):
+    """
+    Poursuit l'entraînement d'un booster existant sur (X, y).
+
+    Le nouveau modèle part des prédictions de l'ancien booster et ajoute
+    n_iterations arbres.
+    """
+    name = type(model).__name__
+    params = model.get_params()
+    params['n_estimators'] = n_iterations
+    updated = type(model)(**params)
+
+    if name == 'LGBMRegressor':
+        updated.fit(X, y, init_model=model.booster_)
+    elif name == 'XGBRegressor':
+        updated.fit(X, y, xgb_model=model.get_booster())
+    elif name == 'CatBoostRegressor':
+        updated.fit(X, y, init_model=model, verbose=False)
+    else:
+        raise TypeError(f"Booster non supporté: {name}")
+    return updated
+
+
+def mettre_a_jour_modele(model, X, y, n_arbres=20, n_iterations=50):
+    """
+    Met à jour une copie du modèle avec le nouveau lot.
+
+    Returns:
+    --------
+    object
+        Modèle mis à jour (l'original n'est pas modifié)
+
+    Raises:
+    -------
+    TypeError
+        Si le type de modèle ne supporte pas la mise à jour incrémentale
+    """
+    name = type(model).__name__
+    if name in FORETS:
+        return mettre_a_jour_foret(copy.deepcopy(model), X, y, n_arbres)
+    if name in BOOSTINGS:
+        return continuer_boosting(model, X, y, n_iterations)
+    raise TypeError(f"Mise à jour incrémentale non supportée pour {name}")
+
+
+def evaluer(model, X, y):
+    """R², RMSE et MAE sur un jeu de données"""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    y_pred = model.predict(X)
+    return {
+        'r2': r2_score(y, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y, y_pred))),
+        'mae': mean_absolute_error(y, y_pred)
+    }
+
+
+def remplacer_modele(model, path):
+    """Écrit le modèle de façon atomique en gardant l'ancien en .bak"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    if os.path.exists(path):
+        shutil.copy2(path, path + '.bak')
+    os.replace(tmp_path, path)
+
+
+# ============================================================================
+# RÉENTRAÎNEMENT
+# ============================================================================
+
+def reentrainer_incremental(nouveaux_fichiers, model_paths=MODELES_PAR_DEFAUT, n_arbres=20,
+                            n_iterations=50, tolerance=0.0, holdout_path=HOLDOUT_PATH,
+                            split_path=HOLDOUT_SPLIT_PATH, transformer_path=TRANSFORMER_PATH, dry_run=False):
+    """
+    Met à jour chaque modèle avec le nouveau lot et applique la porte holdout.
+
+    Parameters:
+    -----------
+    nouveaux_fichiers : list of str
+        CSV nettoyés contenant uniquement les nouvelles annonces
+    model_paths : list of str
+        Modèles picklés à mettre à jour (les fichiers absents, et les modèles
+        entraînés sur un autre split que le holdout, sont ignorés)
+    n_arbres : int
+        Arbres ajoutés aux forêts
+    n_iterations : int
+        Itérations ajoutées aux boosters
+    tolerance : float
+        Baisse de R² holdout tolérée pour accepter le modèle mis à jour
+    split_path : str
+        Identifiant du split du holdout (écrit par build_pipeline.py)
+    dry_run : bool
+        Évaluer sans remplacer les fichiers de models/
+
+    Returns:
+    --------
+    pd.DataFrame
+        Rapport par modèle (R² avant/après, décision)
+    """
+    df_new = preparer_annonces(pd.concat(
+        [pd.read_csv(p, encoding='utf-8-sig') for p in nouveaux_fichiers], ignore_index=True
+    ))
+    if df_new.empty:
+        print("ℹ️  Aucune nouvelle annonce")
+        return pd.DataFrame()
+
+    transformer = charger_transformer(transformer_path)
+    train_new, holdout_new = separer_lot(df_new)
+    holdout = pd.concat([charger_holdout(holdout_path), holdout_new], ignore_index=True)
+    split = charger_split(split_path)
+
+    X_train = transformer.transform(train_new)
+    y_train = train_new['Prix'].to_numpy(dtype=float)
+    X_hold = transformer.transform(holdout)
+    y_hold = holdout['Prix'].to_numpy(dtype=float)
+
+    print("=" * 70)
+    print("🔁 RÉENTRAÎNEMENT INCRÉMENTAL")
+    print("=" * 70)
+    print(f"   • Nouvelles annonces: {len(df_new)} ({len(train_new)} entraînement, {len(holdout_new)} holdout)")
+    print(f"   • Holdout total: {len(holdout)} lignes")
+
+    rapport = []
+    for path in model_paths:
+        if not os.path.exists(path):
+            print(f"\n⚠️  {path}: fichier absent, ignoré")
+            continue
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+
+        print(f"\n📦 {path} ({type(model).__name__})")
+        # Un modèle entraîné sur un autre split a pu voir les annonces du holdout
+        if getattr(model, 'holdout_split_', None) != split:
+            print(f"   ⚠️  Non entraîné sur le split du holdout ({split}): porte holdout non applicable, ignoré")
+            continue
+        try:
+            updated = mettre_a_jour_modele(model, X_train, y_train, n_arbres, n_iterations)
+        except TypeError as e:
+            print(f"   ⚠️  {e}")
+            continue
+        # Les nouvelles annonces d'entraînement sont hors holdout: le split reste valable
+        updated.holdout_split_ = split
+
+        avant = evaluer(model, X_hold, y_hold)
+        apres = evaluer(updated, X_hold, y_hold)
+        accepte = apres['r2'] >= avant['r2'] - tolerance
+        print(f"   R² holdout: {avant['r2']:.4f} → {apres['r2']:.4f}  "
+              f"RMSE: {avant['rmse']:,.0f} → {apres['rmse']:,.0f} DT")
+
+        if accepte and not dry_run:
+            remplacer_modele(updated, path)
+            print(f"   ✅ Modèle remplacé (ancien conservé dans {path}.bak)")
+        elif accepte:
+            print("   ✅ Modèle accepté (dry-run, non remplacé)")
+        else:
+            print("   ❌ Modèle rejeté par la porte holdout")
+
+        rapport.append({
+            'model_path': path,
+            'model_type': type(model).__name__,
+            'r2_avant': avant['r2'], 'r2_apres': apres['r2'],
+            'rmse_avant': avant['rmse'], 'rmse_apres': apres['rmse'],
+            'accepte': accepte,
+            'remplace': accepte and not dry_run
+        })
+
+    # Les nouvelles annonces du holdout restent dans le holdout des prochains lots
+    if not holdout_new.empty and not dry_run:
+        holdout.to_csv(holdout_path, index=False, encoding='utf-8-sig')
+
+    return pd.DataFrame(rapport)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Réentraînement incrémental des modèles")
+    parser.add_argument('--new', nargs='+', required=True, help="CSV des nouvelles annonces nettoyées")
+    parser.add_argument('--models', nargs='*', default=MODELES_PAR_DEFAUT)
+    parser.add_argument('--trees', type=int, default=20, help="Arbres ajoutés aux forêts")
+    parser.add_argument('--iterations', type=int, default=50, help="Itérations ajoutées aux boosters")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="Baisse de R² tolérée")
+    parser.add_argument('--holdout', default=HOLDOUT_PATH)
+    parser.add_argument('--split', default=HOLDOUT_SPLIT_PATH, help="Identifiant du split du holdout")
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    rapport = reentrainer_incremental(
+        args.new, args.models, n_arbres=args.trees, n_iterations=args.iterations,
+        tolerance=args.tolerance, holdout_path=args.holdout, split_path=args.split, dry_run=args.dry_run
+    )
+    if not rapport.empty:
+        print(f"\n✅ {int(rapport['remplace'].sum())}/{len(rapport)} modèle(s) remplacé(s)")
+
+
+if __name__ == "__main__":
+    main()
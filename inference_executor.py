@@ -0,0 +1,235 @@
+"""
+Inference Executor - Exécution contrôlée des prédictions du modèle
+===================================================================
+
+Les modèles sérialisés gardent leurs réglages de parallélisme
+d'entraînement (n_jobs=-1 dans le notebook). Servis par un serveur
+multi-threadé (waitress, gunicorn --threads), chaque requête lance alors
+autant de threads que de cœurs : les threads se disputent les CPU et
+passent leur temps en changements de contexte.
+
+Ce module reprend la main sur le parallélisme :
+
+- au chargement, le parallélisme interne du modèle (n_jobs, nthread,
+  thread_count) est forcé à une valeur configurée ; le nombre de threads
+  OpenMP est limité autour de chaque appel, pour le thread qui prédit
+  seulement (l'état OpenMP est propre à chaque thread, le reste du
+  processus garde ses réglages)
+- les prédictions sont exécutées sur un pool de threads dédié et
+  dimensionné, dont les threads peuvent être attachés à des CPU ; les
+  autres parcours des arbres (estimation anytime, contributions) passent
+  par le même pool via submit
+- le parallélisme d'un appel dépend de la taille du batch : un seul thread
+  pour les petits batchs (le coût de lancement des threads dépasse le
+  gain), `n_threads` pour les grands, un seul grand batch parallèle à la
+  fois
+
+Nombre de threads de calcul au pire : pool_size + n_threads - 1.
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+try:
+    from threadpoolctl import ThreadpoolController
+except ImportError:
+    ThreadpoolController = None
+
+
+# Attributs de parallélisme des API scikit-learn, XGBoost, LightGBM et CatBoost
+THREAD_PARAMS = ('n_jobs', 'nthread', 'thread_count')
+
+
+def limiter_threads(model, n_threads=1):
+    """
+    Force le parallélisme interne d'un modèle.
+
+    Parameters:
+    -----------
+    model : estimateur
+        Modèle chargé (modifié en place)
+    n_threads : int
+        Nombre de threads utilisés par un appel à predict
+
+    Returns:
+    --------
+    estimateur
+        Le même modèle
+    """
+    for param in THREAD_PARAMS:
+        if hasattr(model, param):
+            setattr(model, param, n_threads)
+    return model
+
+
+def _parse_cpus(value):
+    """Ensemble de CPU depuis '0-3,6' (None si vide)"""
+    if not value:
+        return None
+    cpus = set()
+    for part in str(value).split(','):
+        if '-' in part:
+            low, high = part.split('-')
+            cpus.update(range(int(low), int(high) + 1))
+        elif part.strip():
+            cpus.add(int(part))
+    return cpus
+
+
+class InferenceExecutor:
+    """
+    Exécution des prédictions avec un parallélisme contrôlé.
+
+    Parameters:
+    -----------
+    model : estimateur
+        Modèle avec predict(X)
+    pool_size : int
+        Threads du pool dédié (0 = prédiction dans le thread appelant)
+    n_threads : int
+        Threads utilisés par un grand batch
+    parallel_min_rows : int
+        Taille de batch à partir de laquelle la prédiction est parallèle
+    cpu_affinity : str ou set, optional
+        CPU auxquels attacher les threads du pool ('0-3,6'), sans contrainte par défaut
+
+    Example:
+    --------
+    >>> executor = InferenceExecutor(model, pool_size=4, n_threads=4, parallel_min_rows=2000)
+    >>> prix = executor.predict(X)
+    >>> executor.stats()['parallel_calls']
+    """
+
+    def __init__(self, model, pool_size=0, n_threads=1, parallel_min_rows=2000, cpu_affinity=None):
+        self.pool_size = int(pool_size)
+        self.n_threads = max(1, int(n_threads))
+        self.parallel_min_rows = int(parallel_min_rows)
+        self.cpu_affinity = _parse_cpus(cpu_affinity) if isinstance(cpu_affinity, str) else cpu_affinity
+
+        # Deux vues du même modèle (copie superficielle: les arbres sont partagés),
+        # pour ne jamais modifier n_jobs pendant qu'un autre thread prédit
+        self.model = limiter_threads(model, 1)
+        if self.n_threads > 1:
+            self._parallel_model = limiter_threads(copy.copy(model), self.n_threads)
+        else:
+            self._parallel_model = None
+        self._parallel_lock = threading.Lock()
+
+        # OpenMP des bibliothèques natives (chargées avec le modèle), limité appel par appel;
+        # BLAS n'est pas touché: sa limite est globale au processus
+        self._openmp = ThreadpoolController().select(user_api='openmp') if ThreadpoolController is not None else None
+
+        self._pool = None
+        if self.pool_size > 0:
+            self._pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='inference',
+                                            initializer=self._init_thread)
+        self._lock = threading.Lock()
+        self.counters = {'calls': 0, 'rows': 0, 'parallel_calls': 0, 'parallel_busy': 0, 'tasks': 0}
+
+    def _init_thread(self):
+        # Sous Linux l'affinité est propre au thread, et héritée par les threads qu'il crée
+        if self.cpu_affinity:
+            try:
+                os.sched_setaffinity(threading.get_native_id(), self.cpu_affinity)
+            except (AttributeError, OSError):
+                pass
+
+    def _limit_openmp(self, n_threads):
+        """Limite OpenMP du thread appelant le temps d'un appel"""
+        if self._openmp is None:
+            return nullcontext()
+        return self._openmp.limit(limits=n_threads)
+
+    def _run(self, X):
+        model = self.model
+        large = self._parallel_model is not None and len(X) >= self.parallel_min_rows
+        parallel = False
+        if large:
+            # Un seul grand batch parallèle à la fois; sinon calcul sur un thread
+            parallel = self._parallel_lock.acquire(blocking=False)
+            if parallel:
+                model = self._parallel_model
+        try:
+            with self._limit_openmp(self.n_threads if parallel else 1):
+                prix = model.predict(X)
+        finally:
+            if parallel:
+                self._parallel_lock.release()
+
+        with self._lock:
+            self.counters['calls'] += 1
+            self.counters['rows'] += len(X)
+            if parallel:
+                self.counters['parallel_calls'] += 1
+            elif large:
+                self.counters['parallel_busy'] += 1
+        return prix
+
+    def predict(self, X):
+        """
+        Prédit X sur le pool dédié (ou dans le thread appelant sans pool).
+
+        Parameters:
+        -----------
+        X : pd.DataFrame ou np.ndarray
+            Matrice de features
+
+        Returns:
+        --------
+        np.ndarray
+            Prédictions du modèle
+        """
+        if self._pool is None:
+            return self._run(X)
+        return self._pool.submit(self._run, X).result()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Exécute un autre calcul sur les arbres (estimation anytime,
+        contributions) sur le même pool que predict.
+
+        Parameters:
+        -----------
+        func : callable
+            Calcul à exécuter, sur un seul thread
+        *args, **kwargs
+            Arguments de func
+
+        Returns:
+        --------
+        object
+            Résultat de func
+        """
+        def task():
+            with self._limit_openmp(1):
+                result = func(*args, **kwargs)
+            with self._lock:
+                self.counters['tasks'] += 1
+            return result
+
+        if self._pool is None:
+            return task()
+        return self._pool.submit(task).result()
+
+    def stats(self):
+        """Configuration et compteurs d'appels (parallel_busy: grands batchs calculés sur un thread, tasks: appels à submit)"""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'n_threads': self.n_threads,
+                'parallel_min_rows': self.parallel_min_rows,
+                'cpu_affinity': sorted(self.cpu_affinity) if self.cpu_affinity else None,
+                **self.counters
+            }
+
+    def close(self):
+        """Arrête le pool après les prédictions en cours"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
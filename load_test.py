@@ -0,0 +1,537 @@
+"""
+Load Test - Rejeu de trafic et test de charge de l'API Flask
+=============================================================
+
+Démarre app.py sous un vrai serveur WSGI (gunicorn ou waitress) sur
+localhost, puis envoie du trafic sur /api/predict et /api/predict_batch :
+
+- trafic synthétique : véhicules tirés du corpus nettoyé
+  (dataset_final_complet_grand.csv), avec une part de requêtes batch
+- rejeu : requêtes reconstituées depuis le journal des prédictions
+  (request_log), dans l'ordre d'origine
+
+Chaque palier (concurrence × débit d'arrivée) envoie des requêtes selon un
+processus de Poisson au débit demandé (ou en boucle fermée avec `max`). La
+latence est mesurée depuis l'instant d'arrivée prévu : l'attente côté client
+quand le serveur sature est comptée, comme pour un vrai utilisateur.
+
+Pour chaque palier : débit servi, percentiles de latence, taux d'erreur
+(dont 429/503 du contrôle d'admission), CPU et RSS du serveur (processus
+maître + workers), échantillonnés pendant le test. Le point de saturation est
+le dernier palier qui respecte le SLO de latence et le taux d'erreur maximal.
+
+Usage:
+------
+    python load_test.py --server gunicorn --workers 2 --threads 4 --rates 10,20,50,100
+    python load_test.py --server waitress --threads 8 --concurrency 8,32 --rates max
+    python load_test.py --source replay --log-dir Data/build/request_log --rates 20,40
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Un processus peut disparaître entre l'énumération et la lecture de ses compteurs
+PROCESS_ERRORS = (OSError, IndexError, ValueError) + ((psutil.Error,) if psutil is not None else ())
+
+
+LISTINGS_PATH = os.path.join('Data', 'cleaned', 'dataset_final_complet_grand.csv')
+OUTPUT_DIR = os.path.join('Data', 'build', 'loadtest')
+SERVERS = ('gunicorn', 'waitress')
+DEFAULT_PORT = 8765
+
+# Le test mesure l'API, pas les traitements annexes: workers de jobs et journal
+# désactivés, limite par client levée (tout le trafic vient de 127.0.0.1)
+SERVER_ENV = {'JOB_WORKERS': '0', 'REQUEST_LOG_DIR': '', 'RATE_LIMIT_RPS': '0'}
+
+VEHICLE_FIELDS = ['marque', 'modele', 'annee', 'kilometrage', 'energie', 'boite_vitesses', 'puissance_fiscale']
+PERCENTILES = (50, 90, 99)
+
+
+# ----------------------------------------------------------------------
+# Serveur WSGI
+# ----------------------------------------------------------------------
+
+def commande_serveur(server, port, workers, threads):
+    """Ligne de commande qui sert app:app sur 127.0.0.1:port"""
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+                '--bind', f'127.0.0.1:{port}', '--timeout', '120', 'app:app']
+    if server == 'waitress':
+        return [sys.executable, '-m', 'waitress', f'--threads={threads}', f'--listen=127.0.0.1:{port}', 'app:app']
+    raise ValueError(f"Serveur non supporté: {server}. Serveurs acceptés: {SERVERS}")
+
+
+class ServeurTest:
+    """
+    Serveur WSGI lancé dans un sous-processus le temps du test.
+
+    Parameters:
+    -----------
+    server : str
+        'gunicorn' ou 'waitress'
+    port : int
+        Port d'écoute sur 127.0.0.1
+    workers, threads : int
+        Processus workers (gunicorn) et threads par worker
+    env : dict
+        Variables d'environnement ajoutées à SERVER_ENV
+    log_path : str
+        Fichier qui reçoit la sortie du serveur
+    """
+
+    def __init__(self, server, port, workers, threads, env, log_path, startup_timeout=180):
+        self.command = commande_serveur(server, port, workers, threads)
+        self.port = port
+        self.env = dict(os.environ, **SERVER_ENV, **env)
+        self.log_path = log_path
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    def __enter__(self):
+        self._log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen(self.command, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Le serveur s'est arrêté au démarrage (voir {self.log_path})")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                conn.request('GET', '/health')
+                if conn.getresponse().status == 200:
+                    return self
+            except OSError:
+                pass
+            time.sleep(0.5)
+        self.__exit__()
+        raise RuntimeError(f"Serveur non prêt après {self.startup_timeout} s (voir {self.log_path})")
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+        return False
+
+
+# ----------------------------------------------------------------------
+# CPU / RSS du serveur
+# ----------------------------------------------------------------------
+
+def _arbre_processus(pid):
+    """pid et descendants (psutil si installé, sinon /proc)"""
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except PROCESS_ERRORS:
+            return []
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parents.setdefault(int(f.read().rsplit(')', 1)[1].split()[1]), []).append(int(entry))
+            except (OSError, IndexError):
+                continue
+    pids, frontier = [], [pid]
+    while frontier:
+        current = frontier.pop()
+        pids.append(current)
+        frontier.extend(parents.get(current, []))
+    return pids
+
+
+def _cpu_rss(pids):
+    """(temps CPU cumulé en s, RSS en octets) d'un ensemble de processus"""
+    cpu, rss = 0.0, 0
+    for pid in pids:
+        try:
+            if psutil is not None:
+                process = psutil.Process(pid)
+                times = process.cpu_times()
+                cpu += times.user + times.system
+                rss += process.memory_info().rss
+            else:
+                with open(f'/proc/{pid}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+                rss += int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        except PROCESS_ERRORS:
+            continue
+    return cpu, rss
+
+
+class MoniteurServeur(threading.Thread):
+    """
+    Échantillonne CPU (%) et RSS (MB) du serveur et de ses workers.
+
+    Parameters:
+    -----------
+    pid : int
+        Processus principal du serveur
+    interval : float
+        Période d'échantillonnage (s)
+    """
+
+    def __init__(self, pid, interval=1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._halt = threading.Event()
+
+    def run(self):
+        last_cpu, last_t = _cpu_rss(_arbre_processus(self.pid))[0], time.monotonic()
+        while not self._halt.wait(self.interval):
+            pids = _arbre_processus(self.pid)
+            cpu, rss = _cpu_rss(pids)
+            now = time.monotonic()
+            self.samples.append({
+                't': time.time(),
+                'cpu_percent': 100 * (cpu - last_cpu) / (now - last_t),
+                'rss_mb': rss / 2 ** 20,
+                'n_processes': len(pids)
+            })
+            last_cpu, last_t = cpu, now
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def window(self, start, end):
+        """Échantillons pris entre deux instants (epoch s)"""
+        return [s for s in self.samples if start <= s['t'] <= end]
+
+
+# ----------------------------------------------------------------------
+# Trafic
+# ----------------------------------------------------------------------
+
+def _requete(vehicles):
+    """(chemin, corps JSON, nombre de véhicules) pour un ou plusieurs véhicules"""
+    if len(vehicles) == 1:
+        return '/api/predict', json.dumps(vehicles[0]).encode('utf-8'), 1
+    return '/api/predict_batch', json.dumps({'vehicles': vehicles}).encode('utf-8'), len(vehicles)
+
+
+def trafic_synthetique(listings_path=LISTINGS_PATH, n_requests=2000, batch_fraction=0.0, batch_size=100, seed=42):
+    """
+    Requêtes construites depuis des annonces réelles du corpus nettoyé.
+
+    Parameters:
+    -----------
+    listings_path : str
+        Corpus d'annonces (colonnes Marque, Modele, Age, Kilometrage...)
+    n_requests : int
+        Taille du jeu de requêtes (rejoué en boucle)
+    batch_fraction : float
+        Part des requêtes envoyées à /api/predict_batch
+    batch_size : int
+        Véhicules par requête batch
+
+    Returns:
+    --------
+    list of tuple
+        (chemin, corps, nombre de véhicules)
+    """
+    df = pd.read_csv(listings_path, encoding='utf-8-sig').dropna(
+        subset=['Marque', 'Age', 'Kilometrage', 'Energie', 'Boite_Vitesses', 'Puissance_Fiscale'])
+    year = datetime.now().year
+    vehicles = [{
+        'marque': row.Marque,
+        'modele': row.Modele if isinstance(row.Modele, str) else '',
+        'annee': int(year - row.Age),
+        'kilometrage': float(row.Kilometrage),
+        'energie': row.Energie,
+        'boite_vitesses': row.Boite_Vitesses,
+        'puissance_fiscale': int(row.Puissance_Fiscale)
+    } for row in df.itertuples(index=False)]
+
+    rng = np.random.default_rng(seed)
+    requests = []
+    for _ in range(n_requests):
+        size = batch_size if rng.random() < batch_fraction else 1
+        requests.append(_requete([vehicles[i] for i in rng.integers(len(vehicles), size=size)]))
+    return requests
+
+
+def trafic_rejoue(log_dir, since=None, until=None):
+    """
+    Requêtes reconstituées depuis le journal des prédictions, dans l'ordre.
+
+    Les lignes d'un même appel /api/predict_batch partagent leur horodatage
+    et sont regroupées dans une requête.
+    """
+    from request_log import lire_journal
+
+    df = lire_journal(log_dir, since, until, columns=['ts', 'endpoint'] + VEHICLE_FIELDS)
+    if df.empty:
+        raise ValueError(f"Aucune prédiction journalisée dans {log_dir} pour cette période")
+
+    def vehicule(record):
+        # Valeurs manquantes journalisées en NaN / '' ; années et CV entiers comme dans l'API
+        vehicle = {k: None if v != v or v == '' else v for k, v in record.items()}
+        for col in ('annee', 'puissance_fiscale'):
+            if vehicle[col] is not None:
+                vehicle[col] = int(vehicle[col])
+        return vehicle
+
+    requests = []
+    for (ts, endpoint), group in df.groupby(['ts', 'endpoint'], sort=True):
+        vehicles = [vehicule(record) for record in group[VEHICLE_FIELDS].to_dict('records')]
+        if endpoint == 'predict':
+            requests.extend(_requete([vehicle]) for vehicle in vehicles)
+        else:
+            path, body, n = '/api/predict_batch', json.dumps({'vehicles': vehicles}).encode('utf-8'), len(vehicles)
+            requests.append((path, body, n))
+    return requests
+
+
+# ----------------------------------------------------------------------
+# Exécution d'un palier
+# ----------------------------------------------------------------------
+
+def _client(port, timeout, jobs, records):
+    """Thread client: connexion keep-alive, envoie les requêtes de la file"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        scheduled, (path, body, n_vehicles) = job
+        started = time.perf_counter()
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except Exception:
+            status = 0
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        ended = time.perf_counter()
+        records.append((scheduled if scheduled is not None else started, started, ended, status, path, n_vehicles))
+    conn.close()
+
+
+def executer_palier(port, requests, rate, concurrency, duration, timeout=30, seed=0):
+    """
+    Envoie du trafic pendant `duration` secondes.
+
+    Parameters:
+    -----------
+    port : int
+        Port du serveur
+    requests : list
+        Requêtes (chemin, corps, véhicules), utilisées en boucle
+    rate : float ou None
+        Débit d'arrivée (requêtes/s, Poisson) ; None = boucle fermée
+    concurrency : int
+        Nombre de clients simultanés
+
+    Returns:
+    --------
+    pd.DataFrame
+        Une ligne par requête: scheduled, started, ended, status, path, n_vehicles
+    """
+    records = []
+    jobs = queue.Queue()
+    clients = [threading.Thread(target=_client, args=(port, timeout, jobs, records), daemon=True)
+               for _ in range(concurrency)]
+    for client in clients:
+        client.start()
+
+    source = itertools.cycle(requests)
+    start = time.perf_counter()
+    if rate is None:
+        # Boucle fermée: la file reste alimentée juste au-dessus de la concurrence
+        while time.perf_counter() - start < duration:
+            while jobs.qsize() < concurrency:
+                jobs.put((None, next(source)))
+            time.sleep(0.001)
+        while not jobs.empty():
+            try:
+                jobs.get_nowait()
+            except queue.Empty:
+                break
+    else:
+        rng = np.random.default_rng(seed)
+        arrival = start
+        while True:
+            arrival += rng.exponential(1 / rate)
+            if arrival - start >= duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            jobs.put((arrival, next(source)))
+
+    for _ in clients:
+        jobs.put(None)
+    for client in clients:
+        client.join(timeout + duration)
+    df = pd.DataFrame(records, columns=['scheduled', 'started', 'ended', 'status', 'path', 'n_vehicles'])
+    df[['scheduled', 'started', 'ended']] -= start
+    return df
+
+
+def resumer_palier(df, rate, concurrency, duration, samples):
+    """Débit, latences (ms depuis l'arrivée prévue), erreurs et ressources d'un palier"""
+    ok = df['status'].between(200, 299)
+    latency = (df['ended'] - df['scheduled']) * 1000
+    elapsed = max(duration, df['ended'].max() if len(df) else duration)
+    summary = {
+        'offered_rps': rate if rate is not None else np.nan,
+        'concurrency': concurrency,
+        'sent': len(df),
+        'ok': int(ok.sum()),
+        'throughput_rps': ok.sum() / elapsed,
+        'vehicles_per_s': df.loc[ok, 'n_vehicles'].sum() / elapsed,
+        'error_rate': 1 - ok.mean() if len(df) else 0.0,
+        'n_429': int((df['status'] == 429).sum()),
+        'n_503': int((df['status'] == 503).sum()),
+        'n_failed': int((df['status'] == 0).sum()),
+    }
+    for p in PERCENTILES:
+        summary[f'p{p}_ms'] = float(np.percentile(latency[ok], p)) if ok.any() else np.nan
+    summary['max_ms'] = float(latency[ok].max()) if ok.any() else np.nan
+    cpu = [s['cpu_percent'] for s in samples]
+    rss = [s['rss_mb'] for s in samples]
+    summary['cpu_mean'] = float(np.mean(cpu)) if cpu else np.nan
+    summary['cpu_max'] = float(np.max(cpu)) if cpu else np.nan
+    summary['rss_max_mb'] = float(np.max(rss)) if rss else np.nan
+    return summary
+
+
+def point_de_saturation(steps, slo_ms, max_error_rate):
+    """Dernier palier (par concurrence) qui respecte le SLO p99 et le taux d'erreur"""
+    saturation = {}
+    for concurrency, group in steps.groupby('concurrency', sort=False):
+        passing = group[(group['p99_ms'] <= slo_ms) & (group['error_rate'] <= max_error_rate)]
+        saturation[concurrency] = passing.iloc[-1] if len(passing) else None
+    return saturation
+
+
+def _parse_env(values):
+    env = {}
+    for value in values or []:
+        key, sep, val = value.partition('=')
+        if not sep:
+            raise ValueError(f"--env attend KEY=VALUE: {value}")
+        env[key] = val
+    return env
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de l'API de prédiction")
+    parser.add_argument('--server', choices=SERVERS, default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help="Processus workers (gunicorn)")
+    parser.add_argument('--threads', type=int, default=4, help="Threads par worker")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--env', action='append', help="Variable pour le serveur (KEY=VALUE), répétable")
+    parser.add_argument('--rates', default='10,20,50,100',
+                        help="Débits d'arrivée (req/s) séparés par des virgules, ou 'max' (boucle fermée)")
+    parser.add_argument('--concurrency', default='32', help="Niveaux de concurrence client, séparés par des virgules")
+    parser.add_argument('--duration', type=float, default=20, help="Durée de chaque palier (s)")
+    parser.add_argument('--warmup', type=float, default=3, help="Palier d'échauffement non mesuré (s)")
+    parser.add_argument('--source', choices=('synthetic', 'replay'), default='synthetic')
+    parser.add_argument('--listings', default=LISTINGS_PATH)
+    parser.add_argument('--batch-fraction', type=float, default=0.05)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--log-dir', default=os.path.join('Data', 'build', 'request_log'))
+    parser.add_argument('--since', default=None)
+    parser.add_argument('--until', default=None)
+    parser.add_argument('--slo-ms', type=float, default=500, help="SLO de latence p99")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args(argv)
+
+    rates = [None if r.strip() == 'max' else float(r) for r in args.rates.split(',')]
+    concurrencies = [int(c) for c in args.concurrency.split(',')]
+    os.makedirs(args.output_dir, exist_ok=True)
+    name = f"{args.server}-w{args.workers if args.server == 'gunicorn' else 1}-t{args.threads}"
+
+    print("=" * 70)
+    print(f"🚦 TEST DE CHARGE: {name}")
+    print("=" * 70)
+    if args.source == 'replay':
+        requests = trafic_rejoue(args.log_dir, args.since, args.until)
+    else:
+        requests = trafic_synthetique(args.listings, batch_fraction=args.batch_fraction,
+                                      batch_size=args.batch_size)
+    n_batch = sum(path == '/api/predict_batch' for path, _, _ in requests)
+    print(f"   • Trafic {args.source}: {len(requests)} requêtes ({n_batch} batch)")
+    print(f"   • Paliers: concurrence {concurrencies} × débit {args.rates} ({args.duration:.0f} s chacun)")
+
+    steps = []
+    with ServeurTest(args.server, args.port, args.workers, args.threads, _parse_env(args.env),
+                     os.path.join(args.output_dir, f'{name}-server.log')) as server:
+        monitor = MoniteurServeur(server.process.pid)
+        monitor.start()
+        try:
+            if args.warmup > 0:
+                executer_palier(args.port, requests, None, min(concurrencies), args.warmup)
+
+            for concurrency, rate in itertools.product(concurrencies, rates):
+                t0 = time.time()
+                df = executer_palier(args.port, requests, rate, concurrency, args.duration)
+                summary = resumer_palier(df, rate, concurrency, args.duration, monitor.window(t0, time.time()))
+                steps.append(summary)
+                print(f"\n📊 concurrence {concurrency}, débit {'max' if rate is None else f'{rate:g} req/s'}")
+                print(f"   • Débit servi: {summary['throughput_rps']:.1f} req/s "
+                      f"({summary['vehicles_per_s']:.0f} véhicules/s)")
+                print(f"   • Latence p50/p90/p99: {summary['p50_ms']:.1f} / {summary['p90_ms']:.1f} / "
+                      f"{summary['p99_ms']:.1f} ms")
+                print(f"   • Erreurs: {summary['error_rate']:.2%} (429: {summary['n_429']}, "
+                      f"503: {summary['n_503']}, échecs: {summary['n_failed']})")
+                print(f"   • Serveur: CPU {summary['cpu_mean']:.0f}% (max {summary['cpu_max']:.0f}%), "
+                      f"RSS max {summary['rss_max_mb']:.0f} MB")
+        finally:
+            monitor.stop()
+
+    steps = pd.DataFrame(steps)
+    steps_path = os.path.join(args.output_dir, f'{name}-steps.csv')
+    samples_path = os.path.join(args.output_dir, f'{name}-resources.csv')
+    steps.to_csv(steps_path, index=False)
+    pd.DataFrame(monitor.samples).to_csv(samples_path, index=False)
+
+    print("\n" + "=" * 70)
+    print(f"🎯 POINT DE SATURATION (p99 ≤ {args.slo_ms:g} ms, erreurs ≤ {args.max_error_rate:.0%})")
+    print("=" * 70)
+    for concurrency, step in point_de_saturation(steps, args.slo_ms, args.max_error_rate).items():
+        if step is None:
+            print(f"   • concurrence {concurrency}: aucun palier ne respecte le SLO")
+        else:
+            print(f"   • concurrence {concurrency}: {step['throughput_rps']:.1f} req/s servies "
+                  f"(p99 {step['p99_ms']:.1f} ms, CPU {step['cpu_mean']:.0f}%)")
+    print(f"\n💾 Résultats: {steps_path}")
+    print(f"💾 Ressources: {samples_path}")
+
+
+if __name__ == "__main__":
+    main()
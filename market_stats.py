@@ -0,0 +1,492 @@
+"""
+Market Stats - Cube de statistiques du marché avec mises à jour incrémentales
+==============================================================================
+
+Précalcule les statistiques de prix et de kilométrage par cellule
+Marque × Age × Energie × Boite_Vitesses × Source :
+
+- nombre d'annonces et somme des prix (prix moyen)
+- histogramme logarithmique (creux) des prix et des kilométrages
+
+Les histogrammes sont des sketches de quantiles fusionnables : la cellule i
+couvre ]gamma^(i-1), gamma^i] avec gamma = (1 + a) / (1 - a), donc tout
+quantile est restitué avec une erreur relative d'au plus a. Fusionner deux
+cellules revient à additionner leurs histogrammes :
+
+- une tranche (filtres + regroupement) est agrégée en quelques additions de
+  tableaux, sans repasser par pandas ;
+- un nouveau fichier nettoyé est ajouté au cube sans relire l'historique
+  (les fichiers déjà intégrés sont mémorisés et ignorés) ; la contribution de
+  chaque fichier est conservée sous forme d'agrégats, et remplacée si le
+  fichier change (scrape complété...), sans double comptage.
+
+Usage:
+------
+    python market_stats.py                                   # construction
+    python market_stats.py --add "Baniola=Data/cleaned/baniola_clean_20260105.csv"
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_concat import BRAND_GROUPING, BRAND_MAPPING
+
+
+LISTINGS_PATH = os.path.join('Data', 'cleaned', 'dataset_final_complet_grand.csv')
+CUBE_PATH = os.path.join('models', 'market_stats.pkl')
+
+DIMENSIONS = ['Marque', 'Age', 'Energie', 'Boite_Vitesses', 'Source']
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+class LogBuckets:
+    """
+    Découpage logarithmique de [min_value, max_value] pour les sketches.
+
+    Les valeurs inférieures à min_value (kilométrage nul...) tombent dans la
+    cellule 0, restituée comme 0 ; les valeurs supérieures à max_value sont
+    ramenées à max_value.
+
+    Parameters:
+    -----------
+    min_value, max_value : float
+        Bornes du domaine représenté précisément
+    relative_accuracy : float
+        Erreur relative maximale sur un quantile
+    """
+
+    def __init__(self, min_value, max_value, relative_accuracy=0.01):
+        self.min_value = float(min_value)
+        self.max_value = float(max_value)
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.offset = int(np.ceil(np.log(self.min_value) / self.log_gamma)) - 1
+        self.n_buckets = int(np.ceil(np.log(self.max_value) / self.log_gamma)) - self.offset + 1
+
+    def index(self, values):
+        """Cellule de chaque valeur"""
+        values = np.minimum(np.asarray(values, dtype=float), self.max_value)
+        small = ~(values >= self.min_value)
+        logs = np.log(np.where(small, self.min_value, values)) / self.log_gamma
+        return np.where(small, 0, np.ceil(logs).astype(np.int64) - self.offset)
+
+    def value(self, index):
+        """Valeur représentative d'une cellule (erreur relative <= relative_accuracy)"""
+        index = np.asarray(index)
+        return np.where(index == 0, 0.0, 2 * self.gamma ** (index + self.offset) / (self.gamma + 1))
+
+
+class SparseHistograms:
+    """
+    Histogrammes creux d'un ensemble de cellules du cube.
+
+    Une entrée (cellule du cube, cellule d'histogramme, effectif) par couple
+    non vide : la mémoire et le coût d'une agrégation suivent le nombre
+    d'entrées et non n_cellules × n_buckets.
+
+    Parameters:
+    -----------
+    buckets : LogBuckets
+        Découpage des valeurs
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.cells = np.empty(0, dtype=np.int64)
+        self.bucket_index = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def entrees(self, cells, values):
+        """Entrées (cellule, bucket, effectif) de nouvelles valeurs, sans les ajouter"""
+        n = self.buckets.n_buckets
+        keys, counts = np.unique(np.asarray(cells, dtype=np.int64) * n + self.buckets.index(values),
+                                 return_counts=True)
+        return keys // n, keys % n, counts.astype(np.int64)
+
+    def fusionner(self, cells, bucket_index, counts):
+        """Ajoute des entrées (effectifs négatifs pour retirer) ; les entrées vides sont supprimées"""
+        n = self.buckets.n_buckets
+        keys = np.concatenate([self.cells * n + self.bucket_index,
+                               np.asarray(cells, dtype=np.int64) * n + np.asarray(bucket_index, dtype=np.int64)])
+        weights = np.concatenate([self.counts, np.asarray(counts, dtype=np.int64)])
+        keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=weights).astype(np.int64)
+        kept = totals != 0
+        self.counts = totals[kept]
+        self.cells, self.bucket_index = keys[kept] // n, keys[kept] % n
+
+    def ajouter(self, cells, values):
+        """Ajoute des valeurs et fusionne les entrées de même (cellule, bucket)"""
+        self.fusionner(*self.entrees(cells, values))
+
+    def quantiles(self, cell_group, n_groups, quantiles):
+        """
+        Quantiles par groupe de cellules.
+
+        Parameters:
+        -----------
+        cell_group : np.ndarray
+            Groupe de chaque cellule du cube (-1 = cellule hors tranche)
+        n_groups : int
+            Nombre de groupes
+        quantiles : tuple of float
+            Quantiles à calculer
+        """
+        groups = cell_group[self.cells]
+        selected = groups >= 0
+        groups, buckets, counts = groups[selected], self.bucket_index[selected], self.counts[selected]
+        order = np.lexsort((buckets, groups))
+        groups, buckets, counts = groups[order], buckets[order], counts[order]
+
+        # Rang de chaque quantile dans l'effectif cumulé de tous les groupes
+        cumulative = np.cumsum(counts)
+        totals = np.bincount(groups, weights=counts, minlength=n_groups)
+        offsets = np.cumsum(totals) - totals
+        ranks = offsets[:, None] + np.asarray(quantiles)[None, :] * (totals[:, None] - 1)
+        positions = np.searchsorted(cumulative, ranks, side='right')
+
+        result = self.buckets.value(buckets[np.minimum(positions, len(buckets) - 1)]) if len(buckets) \
+            else np.full(ranks.shape, np.nan)
+        result[totals == 0] = np.nan
+        return result
+
+
+def normaliser_annonces(df, source=None):
+    """
+    Ramène un fichier nettoyé aux conventions du dataset final (marques
+    standardisées et regroupées, âge entier, colonne Source).
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Annonces nettoyées (colonnes Prix, Marque, Age, Kilometrage, Energie,
+        Boite_Vitesses et éventuellement Source)
+    source : str, optional
+        Source des annonces si df n'a pas de colonne Source
+    """
+    df = df.copy()
+    if source is not None:
+        df['Source'] = source
+    if 'Source' not in df.columns:
+        raise ValueError("Colonne Source absente: préciser la source du fichier")
+    df['Marque'] = df['Marque'].replace(BRAND_MAPPING).str.strip().replace(BRAND_GROUPING)
+    df = df.dropna(subset=['Prix', 'Age'] + [d for d in DIMENSIONS if d != 'Age'])
+    df['Age'] = df['Age'].round().astype(int)
+    return df
+
+
+class MarketStatsCube:
+    """
+    Cube d'agrégats fusionnables par Marque × Age × Energie × Boite_Vitesses × Source.
+
+    Parameters:
+    -----------
+    price_accuracy : float
+        Erreur relative maximale des quantiles de prix
+    km_accuracy : float
+        Erreur relative maximale des quantiles de kilométrage
+
+    Example:
+    --------
+    >>> cube = MarketStatsCube()
+    >>> cube.ajouter(pd.read_csv(LISTINGS_PATH, encoding='utf-8-sig'))
+    >>> cube.query({'Marque': ['PEUGEOT'], 'Energie': ['Diesel']}, group_by=['Age'])
+    """
+
+    def __init__(self, price_accuracy=0.01, km_accuracy=0.02):
+        self.prix_buckets = LogBuckets(1e3, 1e7, price_accuracy)
+        self.km_buckets = LogBuckets(1.0, 2e6, km_accuracy)
+
+        self.levels_ = {dim: [] for dim in DIMENSIONS}
+        self._level_codes = {dim: {} for dim in DIMENSIONS}
+        self.cells_ = {}
+        self.codes_ = np.empty((0, len(DIMENSIONS)), dtype=np.int32)
+        self.count_ = np.empty(0, dtype=np.int64)
+        self.prix_sum_ = np.empty(0)
+        self.prix_hist_ = SparseHistograms(self.prix_buckets)
+        self.km_hist_ = SparseHistograms(self.km_buckets)
+        self.fichiers_ = {}
+        self.contributions_ = {}
+
+    @property
+    def n_listings(self):
+        return int(self.count_.sum())
+
+    def _codes(self, dim, values):
+        """Codes entiers des valeurs d'une dimension (nouvelles valeurs ajoutées)"""
+        codes = self._level_codes[dim]
+        for value in pd.unique(values):
+            if value not in codes:
+                codes[value] = len(self.levels_[dim])
+                self.levels_[dim].append(value.item() if isinstance(value, np.generic) else value)
+        return np.array([codes[v] for v in values], dtype=np.int32)
+
+    def ajouter(self, df, source=None):
+        """
+        Ajoute des annonces au cube (sans relire les annonces déjà intégrées).
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Annonces nettoyées
+        source : str, optional
+            Source des annonces si df n'a pas de colonne Source
+
+        Returns:
+        --------
+        int
+            Nombre d'annonces ajoutées
+        """
+        return self._appliquer(self._contribution(df, source))
+
+    def _contribution(self, df, source=None):
+        """
+        Agrégats d'un lot d'annonces par cellule du cube (les nouvelles
+        cellules sont créées vides).
+
+        Returns:
+        --------
+        dict
+            n, rows, count, prix_sum, prix_hist et km_hist (entrées des histogrammes)
+        """
+        df = normaliser_annonces(df, source)
+        if df.empty:
+            return None
+
+        codes = np.column_stack([self._codes(dim, df[dim].to_numpy(dtype=object)) for dim in DIMENSIONS])
+        keys = list(map(tuple, codes))
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self.cells_]
+        if new_keys:
+            for key in new_keys:
+                self.cells_[key] = len(self.cells_)
+            n_new = len(new_keys)
+            self.codes_ = np.vstack([self.codes_, np.array(new_keys, dtype=np.int32)])
+            self.count_ = np.concatenate([self.count_, np.zeros(n_new, dtype=np.int64)])
+            self.prix_sum_ = np.concatenate([self.prix_sum_, np.zeros(n_new)])
+
+        rows = np.array([self.cells_[key] for key in keys])
+        prix = df['Prix'].to_numpy(dtype=float)
+        km = df['Kilometrage'].to_numpy(dtype=float)
+        known_km = ~np.isnan(km)
+        cells, inverse = np.unique(rows, return_inverse=True)
+        return {
+            'n': len(df),
+            'rows': cells,
+            'count': np.bincount(inverse, minlength=len(cells)).astype(np.int64),
+            'prix_sum': np.bincount(inverse, weights=prix, minlength=len(cells)),
+            'prix_hist': self.prix_hist_.entrees(rows, prix),
+            'km_hist': self.km_hist_.entrees(rows[known_km], km[known_km])
+        }
+
+    def _appliquer(self, contribution, signe=1):
+        """Ajoute (signe=1) ou retire (signe=-1) une contribution au cube"""
+        if contribution is None:
+            return 0
+        rows = contribution['rows']
+        self.count_[rows] += signe * contribution['count']
+        self.prix_sum_[rows] += signe * contribution['prix_sum']
+        cells, buckets, counts = contribution['prix_hist']
+        self.prix_hist_.fusionner(cells, buckets, signe * counts)
+        cells, buckets, counts = contribution['km_hist']
+        self.km_hist_.fusionner(cells, buckets, signe * counts)
+        return contribution['n']
+
+    def ajouter_fichiers(self, fichiers_par_source):
+        """
+        Intègre les fichiers nettoyés qui ne l'ont pas encore été.
+
+        Un fichier est identifié par son chemin, sa taille et sa date de
+        modification : un fichier déjà intégré et inchangé est ignoré. Si un
+        fichier intégré a changé (annonces ajoutées en fin de scrape...), sa
+        contribution précédente est retirée du cube avant d'intégrer son
+        nouveau contenu : aucune annonce n'est comptée deux fois.
+
+        Parameters:
+        -----------
+        fichiers_par_source : dict
+            {source: chemin du CSV} ; source None si le fichier a une colonne Source
+
+        Returns:
+        --------
+        dict
+            {chemin: nombre d'annonces (nouveau contenu) intégrées} pour les fichiers intégrés
+        """
+        ajoutes = {}
+        for source, filepath in fichiers_par_source.items():
+            path = os.path.abspath(filepath)
+            stat = os.stat(filepath)
+            signature = (stat.st_size, int(stat.st_mtime))
+            if self.fichiers_.get(path) == signature:
+                continue
+            if path in self.fichiers_ and path not in self.contributions_:
+                raise ValueError(f"{filepath} a changé mais sa contribution n'est pas connue "
+                                 f"(cube d'une version antérieure): reconstruire le cube")
+            contribution = self._contribution(pd.read_csv(filepath, encoding='utf-8-sig'), source)
+            self._appliquer(self.contributions_.pop(path, None), signe=-1)
+            ajoutes[filepath] = self._appliquer(contribution)
+            self.contributions_[path] = contribution
+            self.fichiers_[path] = signature
+        return ajoutes
+
+    def query(self, filters=None, group_by=None, quantiles=DEFAULT_QUANTILES):
+        """
+        Statistiques d'une tranche du cube.
+
+        Parameters:
+        -----------
+        filters : dict, optional
+            {dimension: liste de valeurs acceptées}
+        group_by : list, optional
+            Dimensions de regroupement (aucune = une seule ligne agrégée)
+        quantiles : tuple of float
+            Quantiles de prix et de kilométrage à calculer
+
+        Returns:
+        --------
+        list of dict
+            Une entrée par groupe: valeurs des dimensions, count, prix_moyen,
+            prix_quantiles et km_quantiles
+        """
+        filters = filters or {}
+        group_by = list(group_by or [])
+        unknown = [dim for dim in list(filters) + group_by if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensions inconnues: {unknown}. Dimensions: {DIMENSIONS}")
+
+        # Cellules vidées par le remplacement d'un fichier exclues
+        mask = self.count_ > 0
+        for dim, values in filters.items():
+            codes = [self._level_codes[dim][v] for v in values if v in self._level_codes[dim]]
+            mask &= np.isin(self.codes_[:, DIMENSIONS.index(dim)], codes)
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return []
+
+        # Clé entière unique par groupe, puis agrégation par tranches triées
+        key = np.zeros(len(rows), dtype=np.int64)
+        for dim in group_by:
+            key = key * len(self.levels_[dim]) + self.codes_[rows, DIMENSIONS.index(dim)]
+        order = np.argsort(key, kind='stable')
+        rows, key = rows[order], key[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        groups = self.codes_[np.ix_(rows[starts], [DIMENSIONS.index(dim) for dim in group_by])].tolist()
+        cell_group = np.full(len(self.count_), -1, dtype=np.int64)
+        cell_group[rows] = np.cumsum(np.r_[False, key[1:] != key[:-1]])
+
+        count = np.add.reduceat(self.count_[rows], starts)
+        prix_sum = np.add.reduceat(self.prix_sum_[rows], starts)
+        prix_q = self.prix_hist_.quantiles(cell_group, len(starts), quantiles).tolist()
+        km_q = self.km_hist_.quantiles(cell_group, len(starts), quantiles)
+        km_q = np.where(np.isnan(km_q), None, km_q).tolist()
+
+        labels = [f"p{round(q * 100):g}" for q in quantiles]
+        levels = [self.levels_[dim] for dim in group_by]
+        result = []
+        for g, (n, total) in enumerate(zip(count.tolist(), prix_sum.tolist())):
+            entry = {dim: level[code] for dim, level, code in zip(group_by, levels, groups[g])}
+            entry['count'] = n
+            entry['prix_moyen'] = total / n
+            entry['prix_quantiles'] = dict(zip(labels, prix_q[g]))
+            entry['km_quantiles'] = dict(zip(labels, km_q[g]))
+            result.append(entry)
+        return result
+
+    def valeurs(self, dim):
+        """Valeurs connues d'une dimension"""
+        return sorted(self.levels_[dim])
+
+    def parse_value(self, dim, value):
+        """Convertit une valeur de filtre reçue en texte vers le type de la dimension"""
+        return int(float(value)) if dim == 'Age' else value
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self, path=CUBE_PATH):
+        """Sauvegarde le cube"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        """Charge un cube sauvegardé avec save()"""
+        with open(path, 'rb') as f:
+            cube = pickle.load(f)
+        if not isinstance(cube, cls):
+            raise TypeError(f"{path} ne contient pas un MarketStatsCube")
+        cube.__dict__.setdefault('contributions_', {})
+        return cube
+
+
+def charger_cube(cube_path=CUBE_PATH, listings_path=LISTINGS_PATH):
+    """
+    Charge le cube sauvegardé, ou le construit depuis le dataset final.
+
+    Returns:
+    --------
+    MarketStatsCube
+    """
+    if cube_path and os.path.exists(cube_path):
+        return MarketStatsCube.load(cube_path)
+    cube = MarketStatsCube()
+    cube.ajouter_fichiers({None: listings_path})
+    return cube
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cube de statistiques du marché")
+    parser.add_argument('--cube', default=CUBE_PATH)
+    parser.add_argument('--listings', default=LISTINGS_PATH,
+                        help="Dataset final (avec colonne Source) pour la construction initiale")
+    parser.add_argument('--add', action='append', default=[], metavar='SOURCE=CHEMIN',
+                        help="Fichier nettoyé à ajouter au cube existant")
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("📊 CUBE DE STATISTIQUES DU MARCHÉ")
+    print("=" * 70)
+    if os.path.exists(args.cube):
+        cube = MarketStatsCube.load(args.cube)
+        print(f"📂 Cube existant: {cube.n_listings} annonces, {len(cube.count_)} cellules")
+    else:
+        cube = MarketStatsCube()
+        start = time.perf_counter()
+        n = cube.ajouter_fichiers({None: args.listings}).get(args.listings, 0)
+        print(f"   • Construction: {n} annonces ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    for spec in args.add:
+        source, _, filepath = spec.partition('=')
+        if not filepath:
+            parser.error(f"--add attend SOURCE=CHEMIN, reçu: {spec}")
+        ajoutes = cube.ajouter_fichiers({source: filepath})
+        if ajoutes:
+            print(f"   • {source}: {ajoutes[filepath]} annonces ajoutées ({filepath})")
+        else:
+            print(f"   • {source}: fichier déjà intégré, ignoré ({filepath})")
+
+    start = time.perf_counter()
+    cube.query({'Marque': ['PEUGEOT']}, group_by=['Energie', 'Boite_Vitesses'])
+    print(f"   • {cube.n_listings} annonces, {len(cube.count_)} cellules")
+    print(f"   • Requête type: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    cube.save(args.cube)
+    print(f"\n💾 Cube sauvegardé: {args.cube}")
+
+
+if __name__ == "__main__":
+    # Importer le module par son nom pour que MarketStatsCube soit picklé
+    # sous 'market_stats' (et non '__main__') et reste chargeable
+    import market_stats
+    market_stats.main()
@@ -0,0 +1,201 @@
+"""
+Model Catalog - Catalogue des modèles par marque pour l'autocomplétion
+=======================================================================
+
+Construit, à partir de la colonne Modele de toutes les sources nettoyées, un
+catalogue des modèles par marque :
+
+- marques standardisées et regroupées comme dans dataset_concat
+- modèles normalisés avec clean_modele, fusionnés sans tenir compte de la
+  casse (le libellé affiché est l'orthographe la plus fréquente)
+- nombre d'annonces par modèle
+
+Pour chaque marque, les clés (libellés en majuscules) sont stockées dans un
+tableau trié : les modèles qui commencent par un préfixe forment une plage
+contiguë, trouvée par deux recherches dichotomiques. Le catalogue est écrit
+une fois dans un fichier JSON compact ; les requêtes n'utilisent ni pandas
+ni le disque.
+
+Usage:
+------
+    python model_catalog.py
+    python model_catalog.py --output models/model_catalog.json
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import json
+import os
+from bisect import bisect_left
+
+
+CATALOG_PATH = os.path.join('models', 'model_catalog.json')
+CATALOG_VERSION = 1
+
+
+def normaliser_prefixe(texte):
+    """Clé de recherche: espaces retirés, majuscules"""
+    return str(texte).strip().upper()
+
+
+def construire_catalogue(fichiers_par_source=None):
+    """
+    Construit le catalogue depuis les fichiers nettoyés.
+
+    Parameters:
+    -----------
+    fichiers_par_source : dict, optional
+        {source: chemin du CSV nettoyé}. Par défaut: SOURCES_NETTOYEES
+
+    Returns:
+    --------
+    dict
+        {marque: {'keys': [...], 'names': [...], 'counts': [...]}}, clés triées
+    """
+    import pandas as pd
+    from dataset_concat import BRAND_GROUPING, BRAND_MAPPING, SOURCES_NETTOYEES, charger_sources, clean_modele
+
+    dataframes = charger_sources(fichiers_par_source or SOURCES_NETTOYEES)
+    if not dataframes:
+        raise ValueError("Aucun fichier nettoyé trouvé pour construire le catalogue")
+    df = pd.concat(dataframes, ignore_index=True)[['Marque', 'Modele']].dropna()
+
+    df['Marque'] = df['Marque'].replace(BRAND_MAPPING).str.strip().replace(BRAND_GROUPING)
+    df['Modele'] = df['Modele'].apply(clean_modele).astype(str).str.strip()
+    df = df[df['Modele'] != '']
+    df['Key'] = df['Modele'].map(normaliser_prefixe)
+
+    # Libellé le plus fréquent pour chaque (marque, clé)
+    spellings = df.groupby(['Marque', 'Key', 'Modele']).size().rename('n').reset_index()
+    spellings = spellings.sort_values(['Marque', 'Key', 'n', 'Modele'], ascending=[True, True, False, True])
+    names = spellings.drop_duplicates(['Marque', 'Key']).set_index(['Marque', 'Key'])['Modele']
+    counts = df.groupby(['Marque', 'Key']).size()
+
+    catalogue = {}
+    for marque in sorted(counts.index.get_level_values(0).unique()):
+        keys = sorted(counts.loc[marque].index)
+        catalogue[marque] = {
+            'keys': keys,
+            'names': [names[(marque, key)] for key in keys],
+            'counts': [int(counts[(marque, key)]) for key in keys]
+        }
+    return catalogue
+
+
+class ModelCatalog:
+    """
+    Index des modèles par marque pour l'autocomplétion.
+
+    Parameters:
+    -----------
+    catalogue : dict
+        Résultat de construire_catalogue (ou contenu du fichier JSON)
+
+    Example:
+    --------
+    >>> catalog = ModelCatalog.load('models/model_catalog.json')
+    >>> catalog.suggest('PEUGEOT', '30')
+    [{'modele': '308', 'count': 63}, {'modele': '3008', 'count': 43}, ...]
+    """
+
+    def __init__(self, catalogue):
+        self.brands = catalogue
+        # Ordre par nombre d'annonces pour les requêtes sans préfixe
+        self._by_count = {
+            marque: sorted(range(len(entry['keys'])), key=lambda i: -entry['counts'][i])
+            for marque, entry in catalogue.items()
+        }
+        self._brand_keys = {normaliser_prefixe(marque): marque for marque in catalogue}
+
+    def marques(self):
+        """Marques présentes dans le catalogue"""
+        return list(self.brands)
+
+    def suggest(self, marque, prefix='', limit=10):
+        """
+        Modèles d'une marque commençant par un préfixe.
+
+        Parameters:
+        -----------
+        marque : str
+            Marque (insensible à la casse)
+        prefix : str, optional
+            Début du nom du modèle (insensible à la casse)
+        limit : int, optional
+            Nombre maximal de suggestions
+
+        Returns:
+        --------
+        list of dict
+            {'modele', 'count'} par nombre d'annonces décroissant
+        """
+        brand = self._brand_keys.get(normaliser_prefixe(marque))
+        if brand is None:
+            raise KeyError(f"Marque inconnue du catalogue: {marque}")
+        entry = self.brands[brand]
+        prefix = normaliser_prefixe(prefix)
+
+        if prefix:
+            start = bisect_left(entry['keys'], prefix)
+            stop = bisect_left(entry['keys'], prefix + '\uffff', lo=start)
+            matches = sorted(range(start, stop), key=lambda i: -entry['counts'][i])
+        else:
+            matches = self._by_count[brand]
+
+        return [{'modele': entry['names'][i], 'count': entry['counts'][i]} for i in matches[:limit]]
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self, path=CATALOG_PATH):
+        """Écrit le catalogue en JSON compact"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CATALOG_VERSION, 'brands': self.brands}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        """Charge un catalogue écrit par save()"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CATALOG_VERSION:
+            raise ValueError(f"Version de catalogue non supportée: {data.get('version')}")
+        return cls(data['brands'])
+
+
+def charger_catalogue(catalog_path=CATALOG_PATH):
+    """
+    Charge le catalogue préconstruit, ou le construit depuis les sources nettoyées.
+
+    Returns:
+    --------
+    ModelCatalog
+    """
+    if catalog_path and os.path.exists(catalog_path):
+        return ModelCatalog.load(catalog_path)
+    return ModelCatalog(construire_catalogue())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construction du catalogue des modèles")
+    parser.add_argument('--output', default=CATALOG_PATH)
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("📚 CATALOGUE DES MODÈLES")
+    print("=" * 70)
+    catalog = ModelCatalog(construire_catalogue())
+    n_models = sum(len(entry['keys']) for entry in catalog.brands.values())
+    print(f"   • {len(catalog.brands)} marques, {n_models} modèles")
+
+    catalog.save(args.output)
+    print(f"\n💾 Catalogue sauvegardé: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
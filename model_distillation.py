@@ -0,0 +1,349 @@
+"""
+Model Distillation - Distillation du modèle servi en un modèle compact
+=======================================================================
+
+Le modèle "professeur" (Extra Trees, XGBoost...) est coûteux à évaluer. Ce
+module entraîne un "élève" beaucoup plus petit qui imite ses prédictions :
+
+1. Un grand échantillon synthétique est tiré sur le domaine valide de l'API
+   (marques acceptées, énergies, boîtes, plages d'années, kilométrage et
+   puissance observées dans le dataset).
+2. Le professeur étiquette cet échantillon en une seule passe vectorisée.
+3. Un élève compact est entraîné sur ces étiquettes :
+     - 'gbm'    : petit gradient boosting (HistGradientBoostingRegressor)
+     - 'tree'   : un seul arbre profond
+     - 'lookup' : table de correction par (marque, énergie, boîte, âge)
+                  ajoutée à une régression linéaire sur log(prix)
+
+L'élève est sauvegardé comme un modèle picklé ordinaire, chargeable par
+CarPricePredictor, avec un rapport de perte de précision et d'accélération.
+
+Usage:
+------
+    python model_distillation.py --teacher models/extra_trees_tuned.pkl --student gbm
+    python model_distillation.py --student lookup --n-samples 500000
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from feature_transformer import BOITES_ACCEPTEES, ENERGIES_ACCEPTEES, MARQUES_ACCEPTEES
+from incremental_training import (
+    DATASET_PATH, HOLDOUT_PATH, charger_holdout, charger_transformer, preparer_annonces
+)
+
+
+RANDOM_STATE = 42
+
+STUDENTS = ['gbm', 'tree', 'lookup']
+
+
+# ============================================================================
+# ÉCHANTILLONNAGE DU DOMAINE
+# ============================================================================
+
+def plages_domaine(df=None, reference_year=None):
+    """
+    Plages de valeurs numériques du domaine d'échantillonnage.
+
+    Les bornes sont prises aux quantiles 1%-99% du dataset quand il est
+    fourni, sinon des valeurs par défaut raisonnables sont utilisées.
+    """
+    reference_year = reference_year or datetime.now().year
+    plages = {
+        'annee': (reference_year - 25, reference_year),
+        'km_par_an': (0, 30000),
+        'puissance': (4, 20)
+    }
+    if df is not None and len(df):
+        age = df['Age'].quantile([0.01, 0.99])
+        plages['annee'] = (int(reference_year - age.iloc[1]), int(reference_year - age.iloc[0]))
+        km_par_an = (df['Kilometrage'] / (df['Age'] + 1)).quantile(0.99)
+        plages['km_par_an'] = (0, float(km_par_an))
+        puissance = df['Puissance_Fiscale'].quantile([0.01, 0.99])
+        plages['puissance'] = (int(puissance.iloc[0]), int(puissance.iloc[1]))
+    return plages
+
+
+def echantillonner_domaine(n_samples, plages, reference_year=None, random_state=RANDOM_STATE):
+    """
+    Tire n_samples véhicules synthétiques sur le domaine valide.
+
+    Le kilométrage est tiré proportionnellement à l'âge pour rester réaliste.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Colonnes Marque, Annee, Kilometrage, Energie, Boite_Vitesses,
+        Puissance_Fiscale
+    """
+    reference_year = reference_year or datetime.now().year
+    rng = np.random.RandomState(random_state)
+    annee = rng.randint(plages['annee'][0], plages['annee'][1] + 1, size=n_samples)
+    age = reference_year - annee
+    km_par_an = rng.uniform(*plages['km_par_an'], size=n_samples)
+    return pd.DataFrame({
+        'Marque': rng.choice(MARQUES_ACCEPTEES, size=n_samples),
+        'Annee': annee,
+        'Kilometrage': np.round(km_par_an * (age + rng.uniform(0, 1, size=n_samples)), -2),
+        'Energie': rng.choice(ENERGIES_ACCEPTEES, size=n_samples),
+        'Boite_Vitesses': rng.choice(BOITES_ACCEPTEES, size=n_samples),
+        'Puissance_Fiscale': rng.randint(plages['puissance'][0], plages['puissance'][1] + 1, size=n_samples)
+    })
+
+
+def etiqueter(teacher, X, chunk_size=50000):
+    """Prédictions du professeur, par blocs pour limiter la mémoire"""
+    return np.concatenate([
+        teacher.predict(X.iloc[start:start + chunk_size]) for start in range(0, len(X), chunk_size)
+    ])
+
+
+# ============================================================================
+# ÉLÈVES
+# ============================================================================
+
+class LookupLinearModel:
+    """
+    Régression linéaire sur log(prix) corrigée par une table de résidus.
+
+    La table est indexée par (Marque_encoded, Energie, Boite_Auto, Age_Cat) :
+    chaque cellule contient le résidu moyen (en log) de la régression. La
+    prédiction est un produit scalaire plus une lecture de table.
+
+    Parameters:
+    -----------
+    feature_names : list
+        Ordre des features (CarFeatureTransformer.feature_names_)
+    n_marques : int
+        Nombre de codes Marque_encoded possibles
+    min_count : int
+        Effectif minimal d'une cellule pour utiliser son résidu
+    """
+
+    LINEAR_FEATURES = ['Age', 'Kilometrage', 'Puissance_Fiscale', 'Km_par_Age',
+                       'Log_Km', 'Is_Luxury', 'Puissance_Age_Ratio', 'Boite_Auto']
+
+    def __init__(self, feature_names, n_marques, min_count=5):
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+        self.n_marques = n_marques
+        self.min_count = min_count
+        names = list(feature_names)
+        self._linear_idx = [names.index(c) for c in self.LINEAR_FEATURES]
+        self._marque_idx = names.index('Marque_encoded')
+        self._boite_idx = names.index('Boite_Auto')
+        self._energie_idx = [i for i, c in enumerate(names) if c.startswith('Energie_')]
+        self._age_cat_idx = [i for i, c in enumerate(names) if c.startswith('Age_Cat_')]
+        self.shape_ = (n_marques, len(self._energie_idx), 2, len(self._age_cat_idx))
+
+    def _cells(self, X):
+        marque = np.clip(X[:, self._marque_idx].astype(int), 0, self.n_marques - 1)
+        energie = X[:, self._energie_idx].argmax(axis=1)
+        boite = X[:, self._boite_idx].astype(int)
+        age_cat = X[:, self._age_cat_idx].argmax(axis=1)
+        return np.ravel_multi_index((marque, energie, boite, age_cat), self.shape_)
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y_log = np.log1p(np.maximum(np.asarray(y, dtype=float), 0))
+        A = np.column_stack([X[:, self._linear_idx], np.ones(len(X))])
+        self.coef_, *_ = np.linalg.lstsq(A, y_log, rcond=None)
+
+        residuals = y_log - A @ self.coef_
+        cells = self._cells(X)
+        size = int(np.prod(self.shape_))
+        counts = np.bincount(cells, minlength=size)
+        sums = np.bincount(cells, weights=residuals, minlength=size)
+        self.table_ = np.where(counts >= self.min_count, sums / np.maximum(counts, 1), 0.0)
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        y_log = X[:, self._linear_idx] @ self.coef_[:-1] + self.coef_[-1] + self.table_[self._cells(X)]
+        return np.expm1(y_log)
+
+
+def creer_eleve(kind, feature_names, n_marques):
+    """Instancie un modèle élève non entraîné"""
+    if kind == 'gbm':
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(max_iter=200, max_leaf_nodes=31, learning_rate=0.1,
+                                             random_state=RANDOM_STATE)
+    if kind == 'tree':
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(max_depth=14, min_samples_leaf=5, random_state=RANDOM_STATE)
+    if kind == 'lookup':
+        return LookupLinearModel(feature_names, n_marques)
+    raise ValueError(f"Élève inconnu: {kind}. Valeurs acceptées: {STUDENTS}")
+
+
+# ============================================================================
+# RAPPORT
+# ============================================================================
+
+def _latence_ms(model, X, repeats):
+    model.predict(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def _metriques(y_true, y_pred):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    return {
+        'r2': r2_score(y_true, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': mean_absolute_error(y_true, y_pred)
+    }
+
+
+def comparer(teacher, student, X_real, y_real, X_synth, y_teacher, repeats=30, batch_size=1000):
+    """
+    Perte de précision et accélération de l'élève par rapport au professeur.
+
+    Returns:
+    --------
+    dict
+        Métriques sur les annonces réelles (professeur et élève), fidélité de
+        l'élève aux étiquettes du professeur, latences et tailles
+    """
+    X_batch = X_synth.iloc[:batch_size]
+    rapport = {
+        'teacher': _metriques(y_real, teacher.predict(X_real)),
+        'student': _metriques(y_real, student.predict(X_real)),
+        'fidelity': _metriques(y_teacher, student.predict(X_synth)),
+        'latency_1_ms': {
+            'teacher': _latence_ms(teacher, X_real.iloc[:1], repeats),
+            'student': _latence_ms(student, X_real.iloc[:1], repeats)
+        },
+        f'latency_{batch_size}_ms': {
+            'teacher': _latence_ms(teacher, X_batch, max(3, repeats // 10)),
+            'student': _latence_ms(student, X_batch, max(3, repeats // 10))
+        },
+        'size_mb': {
+            'teacher': len(pickle.dumps(teacher, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6,
+            'student': len(pickle.dumps(student, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6
+        }
+    }
+    rapport['r2_loss'] = rapport['teacher']['r2'] - rapport['student']['r2']
+    rapport['speedup_1'] = rapport['latency_1_ms']['teacher'] / rapport['latency_1_ms']['student']
+    rapport['speedup_batch'] = (rapport[f'latency_{batch_size}_ms']['teacher']
+                                / rapport[f'latency_{batch_size}_ms']['student'])
+    return rapport
+
+
+# ============================================================================
+# DISTILLATION
+# ============================================================================
+
+def distiller(teacher_path, student='gbm', n_samples=200000, dataset_path=DATASET_PATH,
+              output_path=None, report_path=None, holdout_path=HOLDOUT_PATH):
+    """
+    Entraîne un élève compact sur les prédictions du professeur.
+
+    Parameters:
+    -----------
+    teacher_path : str
+        Modèle picklé du professeur
+    student : str
+        'gbm', 'tree' ou 'lookup'
+    n_samples : int
+        Taille de l'échantillon synthétique
+    dataset_path : str
+        Dataset nettoyé (plages du domaine)
+    output_path : str, optional
+        Fichier de l'élève (models/<professeur>_<élève>_student.pkl par défaut)
+    report_path : str, optional
+        Rapport JSON (à côté de l'élève par défaut)
+    holdout_path : str
+        Annonces non vues par le modèle servi (holdout réel du rapport)
+
+    Returns:
+    --------
+    tuple
+        (élève, rapport)
+    """
+    with open(teacher_path, 'rb') as f:
+        teacher = pickle.load(f)
+    transformer = charger_transformer()
+
+    df = preparer_annonces(pd.read_csv(dataset_path, encoding='utf-8-sig'))
+    holdout = charger_holdout(holdout_path)
+    X_real = transformer.transform(holdout)
+    y_real = holdout['Prix'].to_numpy(dtype=float)
+
+    print("=" * 70)
+    print(f"🎓 DISTILLATION: {os.path.basename(teacher_path)} → {student}")
+    print("=" * 70)
+
+    start = time.time()
+    synth = echantillonner_domaine(n_samples, plages_domaine(df))
+    X_synth = transformer.transform(synth)
+    y_teacher = etiqueter(teacher, X_synth)
+    print(f"   • {n_samples:,} véhicules synthétiques étiquetés en {time.time() - start:.1f}s")
+
+    # 10% de l'échantillon synthétique mesure la fidélité de l'élève
+    n_fit = int(n_samples * 0.9)
+    eleve = creer_eleve(student, transformer.feature_names_, len(transformer.marque_classes_))
+    start = time.time()
+    eleve.fit(X_synth.iloc[:n_fit], y_teacher[:n_fit])
+    print(f"   • Élève entraîné en {time.time() - start:.1f}s")
+
+    rapport = comparer(teacher, eleve, X_real, y_real, X_synth.iloc[n_fit:], y_teacher[n_fit:])
+    rapport.update({'teacher_path': teacher_path, 'student_kind': student, 'n_samples': n_samples})
+
+    output_path = output_path or os.path.join(
+        os.path.dirname(teacher_path),
+        os.path.basename(teacher_path).replace('.pkl', f'_{student}_student.pkl')
+    )
+    with open(output_path, 'wb') as f:
+        pickle.dump(eleve, f, protocol=pickle.HIGHEST_PROTOCOL)
+    report_path = report_path or output_path.replace('.pkl', '_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(rapport, f, indent=2)
+
+    print(f"\n📊 Holdout réel ({len(holdout)} annonces):")
+    print(f"   Professeur: R² {rapport['teacher']['r2']:.4f}  RMSE {rapport['teacher']['rmse']:,.0f} DT")
+    print(f"   Élève:      R² {rapport['student']['r2']:.4f}  RMSE {rapport['student']['rmse']:,.0f} DT")
+    print(f"   Fidélité au professeur: R² {rapport['fidelity']['r2']:.4f}")
+    print(f"\n⚡ Accélération: ×{rapport['speedup_1']:.1f} (une ligne), ×{rapport['speedup_batch']:.1f} (batch)")
+    print(f"   Taille: {rapport['size_mb']['teacher']:.1f} MB → {rapport['size_mb']['student']:.2f} MB")
+    print(f"\n💾 Élève sauvegardé: {output_path}")
+    print(f"💾 Rapport sauvegardé: {report_path}")
+    return eleve, rapport
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distillation du modèle servi en un modèle compact")
+    parser.add_argument('--teacher', default=os.path.join('models', 'extra_trees_tuned.pkl'))
+    parser.add_argument('--student', default='gbm', choices=STUDENTS)
+    parser.add_argument('--n-samples', type=int, default=200000)
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--holdout', default=HOLDOUT_PATH)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--report', default=None)
+    args = parser.parse_args(argv)
+
+    distiller(args.teacher, args.student, args.n_samples, args.dataset, args.output, args.report, args.holdout)
+
+
+if __name__ == "__main__":
+    # Importer le module par son nom pour que LookupLinearModel soit picklé
+    # sous 'model_distillation' (et non '__main__') et reste chargeable
+    import model_distillation
+    model_distillation.main()
@@ -0,0 +1,347 @@
+"""
+Model Pruning - Compromis latence / précision du modèle servi
+==============================================================
+
+Évalue des variantes réduites d'un modèle entraîné (forêt scikit-learn ou
+booster LightGBM/XGBoost/CatBoost) sur le holdout du pipeline (annonces
+non vues par le modèle servi) :
+
+- first_k : les k premiers arbres
+- depth   : profondeur des arbres plafonnée (forêts uniquement)
+- greedy  : k arbres choisis un à un pour minimiser la RMSE de la moyenne
+            sur la moitié "sélection" du holdout (forêts uniquement)
+
+Chaque variante est mesurée sur l'autre moitié du holdout (R², RMSE), en
+latence (une ligne, un batch) et en taille sérialisée. Les variantes
+non dominées (RMSE, latence une ligne) forment le front de Pareto. La
+variante choisie est exportée comme un modèle chargeable par CarPricePredictor.
+
+Usage:
+------
+    python model_pruning.py --model models/extra_trees_tuned.pkl
+    python model_pruning.py --model models/extra_trees_tuned.pkl \\
+        --export greedy_k=25_depth=12 --output models/extra_trees_pruned.pkl
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import copy
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from incremental_training import HOLDOUT_PATH, charger_holdout, charger_transformer
+
+
+FORETS = ('ExtraTreesRegressor', 'RandomForestRegressor')
+REPORT_PATH = os.path.join('Data', 'build', 'pruning_report.csv')
+RANDOM_STATE = 42
+
+
+# ============================================================================
+# VARIANTES
+# ============================================================================
+
+class BoosterTronque:
+    """
+    Booster limité à ses n_trees premières itérations.
+
+    Parameters:
+    -----------
+    model : LGBMRegressor, XGBRegressor ou CatBoostRegressor
+        Booster entraîné
+    n_trees : int
+        Nombre d'itérations utilisées à la prédiction
+    """
+
+    def __init__(self, model, n_trees):
+        self.model = model
+        self.n_trees = n_trees
+        if hasattr(model, 'feature_names_in_'):
+            self.feature_names_in_ = model.feature_names_in_
+
+    def predict(self, X):
+        name = type(self.model).__name__
+        if name == 'LGBMRegressor':
+            return self.model.predict(X, num_iteration=self.n_trees)
+        if name == 'XGBRegressor':
+            return self.model.predict(X, iteration_range=(0, self.n_trees))
+        if name == 'CatBoostRegressor':
+            return self.model.predict(X, ntree_end=self.n_trees)
+        raise TypeError(f"Booster non supporté: {name}")
+
+
+def nombre_arbres(model):
+    """Nombre d'arbres (ou d'itérations de boosting) du modèle"""
+    name = type(model).__name__
+    if name in FORETS:
+        return len(model.estimators_)
+    if name == 'LGBMRegressor':
+        return model.booster_.current_iteration()
+    if name == 'XGBRegressor':
+        return model.get_booster().num_boosted_rounds()
+    if name == 'CatBoostRegressor':
+        return model.tree_count_
+    raise TypeError(f"Modèle non supporté: {name}")
+
+
+def tronquer_arbre(estimator, max_depth):
+    """
+    Copie d'un arbre de décision dont les nœuds à max_depth deviennent des feuilles.
+
+    La valeur d'un nœud interne étant la moyenne de ses échantillons, le nœud
+    coupé prédit directement cette moyenne. Les nœuds inaccessibles sont retirés.
+    """
+    from sklearn.tree._tree import Tree
+
+    tree = estimator.tree_
+    if tree.max_depth <= max_depth:
+        return estimator
+
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values']
+
+    # Parcours en largeur des nœuds conservés
+    kept, depths = [0], [0]
+    i = 0
+    while i < len(kept):
+        node = kept[i]
+        if nodes['left_child'][node] != -1 and depths[i] < max_depth:
+            kept += [nodes['left_child'][node], nodes['right_child'][node]]
+            depths += [depths[i] + 1, depths[i] + 1]
+        i += 1
+    kept = np.array(kept)
+    depths = np.array(depths)
+
+    mapping = np.full(len(nodes), -1, dtype=np.int64)
+    mapping[kept] = np.arange(len(kept))
+    new_nodes = nodes[kept].copy()
+    internal = (new_nodes['left_child'] != -1) & (depths < max_depth)
+    new_nodes['left_child'] = np.where(internal, mapping[new_nodes['left_child']], -1)
+    new_nodes['right_child'] = np.where(internal, mapping[new_nodes['right_child']], -1)
+    new_nodes['feature'] = np.where(internal, new_nodes['feature'], -2)
+    new_nodes['threshold'] = np.where(internal, new_nodes['threshold'], -2.0)
+
+    new_tree = Tree(*tree.__reduce__()[1])
+    new_tree.__setstate__({
+        'max_depth': max_depth,
+        'node_count': len(kept),
+        'nodes': new_nodes,
+        'values': np.ascontiguousarray(values[kept])
+    })
+    truncated = copy.copy(estimator)
+    truncated.tree_ = new_tree
+    return truncated
+
+
+def sous_foret(model, indices, max_depth=None):
+    """Forêt restreinte aux arbres d'indices donnés, éventuellement tronqués"""
+    pruned = copy.copy(model)
+    estimators = [model.estimators_[i] for i in indices]
+    if max_depth is not None:
+        estimators = [tronquer_arbre(est, max_depth) for est in estimators]
+    pruned.estimators_ = estimators
+    pruned.n_estimators = len(estimators)
+    return pruned
+
+
+def ordre_glouton(model, X_sel, y_sel, k_max):
+    """
+    Sélection gloutonne (sans remise) des arbres de la forêt.
+
+    À chaque étape, l'arbre ajouté est celui qui minimise la RMSE de la
+    moyenne des arbres déjà choisis sur le jeu de sélection.
+
+    Returns:
+    --------
+    list of int
+        Indices des arbres dans l'ordre de sélection
+    """
+    X_sel = np.asarray(X_sel, dtype=np.float32)
+    preds = np.vstack([est.predict(X_sel) for est in model.estimators_])
+    y_sel = np.asarray(y_sel, dtype=float)
+
+    chosen = []
+    available = np.ones(len(preds), dtype=bool)
+    total = np.zeros(preds.shape[1])
+    for k in range(min(k_max, len(preds))):
+        # RMSE de la moyenne pour chaque arbre candidat, calculée en une fois
+        candidates = (total[None, :] + preds) / (k + 1)
+        rmse = np.sqrt(((candidates - y_sel[None, :]) ** 2).mean(axis=1))
+        rmse[~available] = np.inf
+        best = int(np.argmin(rmse))
+        chosen.append(best)
+        available[best] = False
+        total += preds[best]
+    return chosen
+
+
+def definir_variantes(model, ks, depths):
+    """Liste des variantes à évaluer pour un modèle"""
+    n_trees = nombre_arbres(model)
+    ks = sorted({k for k in ks if k < n_trees})
+    variantes = [{'name': 'full', 'kind': 'full'}]
+    variantes += [{'name': f'first_k={k}', 'kind': 'first_k', 'k': k} for k in ks]
+    if type(model).__name__ in FORETS:
+        variantes += [{'name': f'depth={d}', 'kind': 'depth', 'max_depth': d} for d in depths]
+        variantes += [{'name': f'greedy_k={k}', 'kind': 'greedy', 'k': k} for k in ks]
+        variantes += [
+            {'name': f'greedy_k={k}_depth={d}', 'kind': 'greedy', 'k': k, 'max_depth': d}
+            for k in ks for d in depths
+        ]
+    return variantes
+
+
+def construire_variante(model, variante, greedy_order=None):
+    """Construit le modèle réduit décrit par une variante"""
+    kind = variante['kind']
+    if kind == 'full':
+        return model
+    if type(model).__name__ not in FORETS:
+        if kind != 'first_k':
+            raise ValueError(f"Variante '{variante['name']}' réservée aux forêts")
+        return BoosterTronque(model, variante['k'])
+    if kind == 'first_k':
+        return sous_foret(model, range(variante['k']))
+    if kind == 'depth':
+        return sous_foret(model, range(len(model.estimators_)), variante['max_depth'])
+    if kind == 'greedy':
+        return sous_foret(model, greedy_order[:variante['k']], variante.get('max_depth'))
+    raise ValueError(f"Variante inconnue: {variante['name']}")
+
+
+# ============================================================================
+# MESURES
+# ============================================================================
+
+def mesurer_latence(model, X, repeats):
+    """Latence médiane de model.predict(X) en millisecondes"""
+    model.predict(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def evaluer_variante(model, X_test, y_test, batch_size=1000, repeats=30):
+    """R², RMSE, latences et taille sérialisée d'une variante"""
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    y_pred = model.predict(X_test)
+    rng = np.random.RandomState(RANDOM_STATE)
+    X_batch = X_test.iloc[rng.randint(0, len(X_test), size=batch_size)]
+    return {
+        'r2': r2_score(y_test, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'latency_1_ms': mesurer_latence(model, X_test.iloc[:1], repeats),
+        f'latency_{batch_size}_ms': mesurer_latence(model, X_batch, max(3, repeats // 10)),
+        'size_mb': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6
+    }
+
+
+def front_pareto(rapport, cout='latency_1_ms', erreur='rmse'):
+    """Marque les variantes non dominées (erreur et coût minimaux)"""
+    values = rapport[[erreur, cout]].to_numpy()
+    pareto = np.ones(len(values), dtype=bool)
+    for i, (e, c) in enumerate(values):
+        dominated = (values[:, 0] <= e) & (values[:, 1] <= c) & ((values[:, 0] < e) | (values[:, 1] < c))
+        pareto[i] = not dominated.any()
+    return pareto
+
+
+def analyser_modele(model_path, holdout_path=HOLDOUT_PATH, ks=(10, 25, 50, 75), depths=(8, 10, 12),
+                    batch_size=1000, repeats=30):
+    """
+    Évalue toutes les variantes d'un modèle sur le holdout.
+
+    Le holdout du pipeline (annonces non vues par le modèle servi) est coupé
+    en deux : une moitié sert à la sélection gloutonne, l'autre à la mesure de
+    toutes les variantes.
+
+    Returns:
+    --------
+    tuple
+        (rapport pd.DataFrame, modèle, variantes, ordre glouton)
+    """
+    from sklearn.model_selection import train_test_split
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+
+    transformer = charger_transformer()
+    holdout = charger_holdout(holdout_path)
+    selection, test = train_test_split(holdout, test_size=0.5, random_state=RANDOM_STATE, shuffle=True)
+    X_sel, y_sel = transformer.transform(selection), selection['Prix'].to_numpy(dtype=float)
+    X_test, y_test = transformer.transform(test), test['Prix'].to_numpy(dtype=float)
+
+    variantes = definir_variantes(model, ks, depths)
+    greedy_order = None
+    if type(model).__name__ in FORETS and ks:
+        greedy_order = ordre_glouton(model, X_sel, y_sel, max(ks))
+
+    print("=" * 70)
+    print(f"✂️  PRUNING: {model_path} ({type(model).__name__}, {nombre_arbres(model)} arbres)")
+    print("=" * 70)
+    rows = []
+    for variante in variantes:
+        pruned = construire_variante(model, variante, greedy_order)
+        mesures = evaluer_variante(pruned, X_test, y_test, batch_size, repeats)
+        rows.append({'variant': variante['name'], **mesures})
+        print(f"   • {variante['name']:<22} R² {mesures['r2']:.4f}  RMSE {mesures['rmse']:>8,.0f} DT  "
+              f"{mesures['latency_1_ms']:6.2f} ms  {mesures['size_mb']:6.1f} MB")
+
+    rapport = pd.DataFrame(rows)
+    rapport['pareto'] = front_pareto(rapport)
+    return rapport, model, variantes, greedy_order
+
+
+def exporter_variante(model, variantes, nom, output_path, greedy_order=None):
+    """Sauvegarde la variante choisie comme nouveau modèle déployable"""
+    variante = next((v for v in variantes if v['name'] == nom), None)
+    if variante is None:
+        raise ValueError(f"Variante '{nom}' inconnue. Disponibles: {[v['name'] for v in variantes]}")
+    pruned = construire_variante(model, variante, greedy_order)
+    with open(output_path, 'wb') as f:
+        pickle.dump(pruned, f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"💾 Variante '{nom}' exportée: {output_path}")
+    return pruned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compromis latence / précision des variantes réduites")
+    parser.add_argument('--model', default=os.path.join('models', 'extra_trees_tuned.pkl'))
+    parser.add_argument('--holdout', default=HOLDOUT_PATH)
+    parser.add_argument('--ks', nargs='*', type=int, default=[10, 25, 50, 75])
+    parser.add_argument('--depths', nargs='*', type=int, default=[8, 10, 12])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=30)
+    parser.add_argument('--report', default=REPORT_PATH)
+    parser.add_argument('--export', default=None, help="Nom de la variante à exporter")
+    parser.add_argument('--output', default=None, help="Fichier du modèle exporté")
+    args = parser.parse_args(argv)
+
+    rapport, model, variantes, greedy_order = analyser_modele(
+        args.model, args.holdout, args.ks, args.depths, args.batch_size, args.repeats
+    )
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    rapport.to_csv(args.report, index=False)
+
+    print("\n🏆 FRONT DE PARETO (RMSE / latence une ligne):\n")
+    print(rapport[rapport['pareto']].sort_values('latency_1_ms').to_string(index=False))
+    print(f"\n💾 Rapport sauvegardé: {args.report}")
+
+    if args.export:
+        output = args.output or args.model.replace('.pkl', f"_{args.export.replace('=', '')}.pkl")
+        exporter_variante(model, variantes, args.export, output, greedy_order)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Request Log - Journal des prédictions en segments colonnaires compressés
+=========================================================================
+
+Chaque prédiction servie par l'API (entrées, sortie, version du modèle,
+latence) est journalisée pour le réentraînement et l'audit, sans ralentir
+les requêtes :
+
+- les handlers déposent une référence à leurs entrées/sorties dans une file
+  en mémoire bornée (en nombre de lignes) ; si la file est pleine, les
+  lignes sont abandonnées et comptées, la requête n'attend jamais
+- un thread d'écriture vide la file par lots, met les enregistrements en
+  colonnes et les accumule dans le segment courant
+- le segment est écrit (fichier .npz compressé, un tableau par colonne,
+  écriture atomique) quand il atteint `segment_rows` lignes ou
+  `rotate_seconds` secondes, puis un nouveau segment commence
+
+Le nom d'un segment contient l'intervalle de temps qu'il couvre : la lecture
+d'une période (lire_journal) n'ouvre que les segments concernés.
+
+Usage:
+------
+    python request_log.py --since 2025-06-01 --until 2025-06-30 --output extrait.csv
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+LOG_DIR = os.path.join('Data', 'build', 'request_log')
+
+INPUT_FIELDS = ['marque', 'modele', 'annee', 'kilometrage', 'energie', 'boite_vitesses', 'puissance_fiscale']
+OUTPUT_FIELDS = ['success', 'prix_predit', 'error']
+COLUMNS = ['ts', 'endpoint', 'model_version', 'latency_ms', 'batch_size'] + INPUT_FIELDS + OUTPUT_FIELDS
+STRING_COLUMNS = {'endpoint', 'model_version', 'marque', 'modele', 'energie', 'boite_vitesses', 'error'}
+
+SEGMENT_PATTERN = 'segment-*.npz'
+
+
+def _n_rows(inputs):
+    """Nombre de véhicules d'une entrée (liste de dicts ou colonnes)"""
+    if isinstance(inputs, dict):
+        return len(next(iter(inputs.values()))) if inputs else 0
+    return len(inputs)
+
+
+def _segment_bounds(path):
+    """Intervalle [début, fin] (epoch s) d'un segment, lu dans son nom"""
+    parts = os.path.basename(path).split('-')
+    return int(parts[1]) / 1000, int(parts[2]) / 1000
+
+
+def _as_epoch(value):
+    """Horodatage epoch (s) depuis un nombre, un datetime ou une date ISO"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class RequestLog:
+    """
+    Journal non bloquant des prédictions.
+
+    Parameters:
+    -----------
+    log_dir : str
+        Répertoire des segments
+    max_queue_rows : int
+        Lignes en attente au-delà desquelles les nouveaux enregistrements sont abandonnés
+    segment_rows : int
+        Taille (lignes) qui déclenche l'écriture du segment courant
+    rotate_seconds : float
+        Âge maximal du segment courant avant écriture
+    flush_interval : float
+        Période (s) de vidage de la file par le thread d'écriture
+    retention_days : float, optional
+        Les segments plus anciens sont supprimés (conservés par défaut)
+
+    Example:
+    --------
+    >>> log = RequestLog('Data/build/request_log')
+    >>> log.log('predict', predictor.model_version, 4.2, [vehicle], [result])
+    >>> log.close()
+    """
+
+    def __init__(self, log_dir=LOG_DIR, max_queue_rows=100000, segment_rows=50000, rotate_seconds=300,
+                 flush_interval=1.0, retention_days=None):
+        self.log_dir = log_dir
+        self.max_queue_rows = max_queue_rows
+        self.segment_rows = segment_rows
+        self.rotate_seconds = rotate_seconds
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        os.makedirs(log_dir, exist_ok=True)
+
+        self._queue = deque()
+        self._queued_rows = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pending = []
+        self._pending_rows = 0
+        self._segment_started = None
+        self._sequence = 0
+        self.counters = {'logged': 0, 'dropped': 0, 'written': 0, 'segments': 0, 'write_errors': 0}
+
+        self._thread = threading.Thread(target=self._run, name='request-log-writer', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Côté requêtes
+    # ------------------------------------------------------------------
+
+    def log(self, endpoint, model_version, latency_ms, inputs, outputs, ts=None):
+        """
+        Dépose les prédictions d'une requête dans la file (sans bloquer).
+
+        Parameters:
+        -----------
+        endpoint : str
+            Route qui a servi la requête
+        model_version : str
+            Version du modèle qui a prédit
+        latency_ms : float
+            Latence de la requête
+        inputs : list of dict ou dict of list
+            Véhicules (ligne par ligne ou en colonnes) ; ne doivent plus être modifiés
+        outputs : list of dict ou dict of list
+            Résultats correspondants (success, prix_predit, error)
+        ts : float, optional
+            Horodatage epoch (s), maintenant par défaut
+
+        Returns:
+        --------
+        bool
+            False si les lignes ont été abandonnées (file pleine)
+        """
+        n = _n_rows(inputs)
+        record = (time.time() if ts is None else ts, endpoint, model_version, latency_ms, inputs, outputs)
+        with self._lock:
+            if self._queued_rows + n > self.max_queue_rows or self._stop.is_set():
+                self.counters['dropped'] += n
+                return False
+            self._queue.append(record)
+            self._queued_rows += n
+            self.counters['logged'] += n
+        return True
+
+    def stats(self):
+        """Compteurs du journal (lignes journalisées, abandonnées, écrites...)"""
+        with self._lock:
+            return dict(self.counters, queued=self._queued_rows, pending=self._pending_rows,
+                        max_queue_rows=self.max_queue_rows, log_dir=self.log_dir)
+
+    def close(self, timeout=10):
+        """Arrête le thread d'écriture après avoir écrit les enregistrements en attente"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Thread d'écriture
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            stopping = self._stop.wait(self.flush_interval)
+            with self._lock:
+                records, self._queue = self._queue, deque()
+                self._queued_rows = 0
+            for record in records:
+                try:
+                    self._pending.append(self._columns(*record))
+                except Exception:
+                    with self._lock:
+                        self.counters['write_errors'] += 1
+                        self.counters['dropped'] += _n_rows(record[4])
+                    continue
+                self._pending_rows += len(self._pending[-1])
+                if self._segment_started is None:
+                    self._segment_started = time.time()
+
+            if self._pending and (stopping or self._pending_rows >= self.segment_rows
+                                  or time.time() - self._segment_started >= self.rotate_seconds):
+                self._write_segment()
+            if stopping:
+                return
+
+    @staticmethod
+    def _columns(ts, endpoint, model_version, latency_ms, inputs, outputs):
+        """Met en colonnes les enregistrements d'une requête"""
+        frame = pd.concat([
+            pd.DataFrame(inputs, columns=INPUT_FIELDS).reset_index(drop=True),
+            pd.DataFrame(outputs, columns=OUTPUT_FIELDS).reset_index(drop=True)
+        ], axis=1)
+        frame.insert(0, 'ts', ts)
+        frame.insert(1, 'endpoint', endpoint)
+        frame.insert(2, 'model_version', model_version)
+        frame.insert(3, 'latency_ms', latency_ms)
+        frame.insert(4, 'batch_size', len(frame))
+        return frame
+
+    def _write_segment(self):
+        """Écrit le segment courant (fichier temporaire puis renommage) et en commence un nouveau"""
+        df = pd.concat(self._pending, ignore_index=True)
+        n = len(df)
+        self._pending, self._pending_rows, self._segment_started = [], 0, None
+        try:
+            arrays = {}
+            for col in COLUMNS:
+                if col in STRING_COLUMNS:
+                    arrays[col] = np.asarray(df[col].where(df[col].notna(), '').astype(str), dtype=str)
+                elif col == 'success':
+                    arrays[col] = df[col].fillna(False).to_numpy(dtype=bool)
+                elif col == 'batch_size':
+                    arrays[col] = df[col].to_numpy(dtype=np.int32)
+                else:
+                    arrays[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+            self._sequence += 1
+            name = (f"segment-{int(arrays['ts'].min() * 1000):013d}-{int(arrays['ts'].max() * 1000):013d}"
+                    f"-{os.getpid()}-{self._sequence:06d}.npz")
+            path = os.path.join(self.log_dir, name)
+            with open(path + '.tmp', 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(path + '.tmp', path)
+            self._purge()
+        except Exception:
+            with self._lock:
+                self.counters['write_errors'] += 1
+                self.counters['dropped'] += n
+            return
+        with self._lock:
+            self.counters['written'] += n
+            self.counters['segments'] += 1
+
+    def _purge(self):
+        """Supprime les segments sortis de la période de rétention"""
+        if self.retention_days is None:
+            return
+        limit = time.time() - self.retention_days * 86400
+        for path in glob.glob(os.path.join(self.log_dir, SEGMENT_PATTERN)):
+            if _segment_bounds(path)[1] < limit:
+                os.remove(path)
+
+
+def lire_journal(log_dir=LOG_DIR, start=None, end=None, columns=None):
+    """
+    Charge les prédictions journalisées sur une période.
+
+    Parameters:
+    -----------
+    log_dir : str
+        Répertoire des segments
+    start, end : float, datetime ou str, optional
+        Bornes de la période (epoch s, datetime ou date ISO) ; ouvertes par défaut
+    columns : list, optional
+        Colonnes à charger (toutes par défaut)
+
+    Returns:
+    --------
+    pd.DataFrame
+        Une ligne par véhicule prédit, triée par horodatage
+    """
+    start, end = _as_epoch(start), _as_epoch(end)
+    columns = list(columns or COLUMNS)
+    load = columns if 'ts' in columns else ['ts'] + columns
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(log_dir, SEGMENT_PATTERN))):
+        first, last = _segment_bounds(path)
+        if (start is not None and last < start) or (end is not None and first > end):
+            continue
+        with np.load(path, allow_pickle=False) as segment:
+            frames.append(pd.DataFrame({col: segment[col] for col in load}))
+
+    if not frames:
+        return pd.DataFrame({col: [] for col in columns})
+    df = pd.concat(frames, ignore_index=True)
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= df['ts'].to_numpy() >= start
+    if end is not None:
+        mask &= df['ts'].to_numpy() <= end
+    return df[mask].sort_values('ts', kind='stable').reset_index(drop=True)[columns]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lecture du journal des prédictions")
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--since', default=None, help="Date/heure ISO de début")
+    parser.add_argument('--until', default=None, help="Date/heure ISO de fin")
+    parser.add_argument('--output', default=None, help="Export CSV des lignes lues")
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("🧾 JOURNAL DES PRÉDICTIONS")
+    print("=" * 70)
+    df = lire_journal(args.log_dir, args.since, args.until)
+    print(f"   • {len(df)} prédictions")
+    if len(df):
+        print(f"   • Période: {datetime.fromtimestamp(df['ts'].min())} → {datetime.fromtimestamp(df['ts'].max())}")
+        print(f"   • Succès: {df['success'].mean():.1%}")
+        for endpoint, group in df.groupby('endpoint'):
+            p50, p95, p99 = np.percentile(group['latency_ms'], [50, 95, 99])
+            print(f"   • {endpoint}: {len(group)} lignes, latence p50 {p50:.1f} ms, "
+                  f"p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+        for version, n in df['model_version'].value_counts().items():
+            print(f"   • Modèle {version}: {n} prédictions")
+
+    if args.output:
+        df.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"\n💾 Export: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Shadow Models - Évaluation de modèles candidats sur le trafic réel
+===================================================================
+
+Avant de promouvoir un modèle réentraîné (par exemple remplacer Extra Trees
+par lightgbm.pkl), on observe son comportement sur les requêtes réelles :
+
+- le modèle principal répond à la requête comme d'habitude
+- la matrice de features qu'il vient de prédire (véhicules uniques) et ses
+  prédictions sont déposées dans une file bornée, sans attente : si la file
+  est pleine, le travail est abandonné et compté
+- un thread en arrière-plan (priorité réduite, un seul thread par modèle)
+  prédit la même matrice avec chaque candidat et accumule les écarts avec le
+  modèle principal et le rapport de latence
+
+Les statistiques sont cumulées en mémoire constante (sommes et fenêtre des
+derniers écarts relatifs pour les percentiles).
+
+Usage:
+------
+    SHADOW_MODELS=models/lightgbm.pkl,models/xgboost.pkl python app.py
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from inference_executor import limiter_threads
+
+
+RECENT_DIFFS = 10000
+SHADOW_NICE = 10
+
+
+def charger_candidats(paths, feature_names=None):
+    """
+    Charge les modèles candidats.
+
+    Parameters:
+    -----------
+    paths : list of str
+        Fichiers pickle des modèles
+    feature_names : list, optional
+        Features du transformer servi ; un candidat entraîné sur d'autres
+        features est refusé
+
+    Returns:
+    --------
+    tuple
+        ({nom: modèle}, {nom: erreur de chargement})
+    """
+    candidates, errors = {}, {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+            model_features = getattr(model, 'feature_names_in_', None)
+            if feature_names is not None and model_features is not None and list(model_features) != list(feature_names):
+                raise ValueError("Features du candidat différentes de celles du transformer servi")
+            # Un seul thread: le shadow ne doit pas concurrencer les requêtes
+            candidates[name] = limiter_threads(model, 1)
+        except Exception as e:
+            errors[name] = str(e)
+    return candidates, errors
+
+
+class _CandidateStats:
+    """Écarts cumulés d'un candidat avec le modèle principal"""
+
+    def __init__(self):
+        self.n_batches = 0
+        self.n_rows = 0
+        self.sum_diff = 0.0
+        self.sum_abs_diff = 0.0
+        self.sum_sq_diff = 0.0
+        self.sum_rel_diff = 0.0
+        self.max_abs_diff = 0.0
+        self.latency_ms = 0.0
+        self.primary_latency_ms = 0.0
+        self.errors = 0
+        self.last_error = None
+        self.recent_rel = deque(maxlen=RECENT_DIFFS)
+
+    def ajouter(self, primary, candidate, primary_ms, candidate_ms):
+        diff = candidate - primary
+        rel = np.abs(diff) / np.maximum(np.abs(primary), 1e-9)
+        self.n_batches += 1
+        self.n_rows += len(diff)
+        self.sum_diff += float(diff.sum())
+        self.sum_abs_diff += float(np.abs(diff).sum())
+        self.sum_sq_diff += float((diff ** 2).sum())
+        self.sum_rel_diff += float(rel.sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(np.abs(diff).max()))
+        self.latency_ms += candidate_ms
+        self.primary_latency_ms += primary_ms
+        self.recent_rel.extend(rel.tolist())
+
+    def to_dict(self):
+        n = self.n_rows
+        rel = np.asarray(self.recent_rel)
+        summary = {
+            'n_batches': self.n_batches,
+            'n_rows': n,
+            'bias': self.sum_diff / n if n else None,
+            'mean_abs_diff': self.sum_abs_diff / n if n else None,
+            'rmse_diff': (self.sum_sq_diff / n) ** 0.5 if n else None,
+            'mean_rel_diff': self.sum_rel_diff / n if n else None,
+            'max_abs_diff': self.max_abs_diff if n else None,
+            'mean_latency_ms': self.latency_ms / self.n_batches if self.n_batches else None,
+            'primary_mean_latency_ms': self.primary_latency_ms / self.n_batches if self.n_batches else None,
+            'latency_ratio': self.latency_ms / self.primary_latency_ms if self.primary_latency_ms else None,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
+        for p in (50, 90, 99):
+            summary[f'rel_diff_p{p}'] = float(np.percentile(rel, p)) if len(rel) else None
+        return summary
+
+
+class ShadowEvaluator:
+    """
+    Évaluation en shadow de modèles candidats.
+
+    S'abonne à CarPricePredictor.feature_listeners : submit() est appelé avec
+    chaque matrice de features prédite par le modèle principal.
+
+    Parameters:
+    -----------
+    candidates : dict
+        {nom: modèle avec predict(X)}
+    max_queue : int
+        Nombre de matrices en attente au-delà duquel le travail est abandonné
+
+    Example:
+    --------
+    >>> candidates, _ = charger_candidats(['models/lightgbm.pkl'], predictor.transformer.feature_names_)
+    >>> shadow = ShadowEvaluator(candidates)
+    >>> predictor.feature_listeners.append(shadow.submit)
+    >>> shadow.stats()['candidates']['lightgbm']['mean_rel_diff']
+    """
+
+    def __init__(self, candidates, max_queue=1000):
+        if not candidates:
+            raise ValueError("Aucun modèle candidat à évaluer")
+        self.candidates = candidates
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats = {name: _CandidateStats() for name in candidates}
+        self.counters = {'submitted': 0, 'dropped': 0, 'dropped_rows': 0, 'processed': 0}
+        self._thread = threading.Thread(target=self._run, name='shadow-evaluator', daemon=True)
+        self._thread.start()
+
+    def submit(self, X, primary, primary_ms):
+        """
+        Dépose une matrice de features et les prédictions du modèle principal.
+
+        Ne bloque jamais et ne lève jamais : si la file est pleine, le travail
+        est abandonné et compté.
+
+        Returns:
+        --------
+        bool
+            False si le travail a été abandonné
+        """
+        try:
+            self._queue.put_nowait((X, np.asarray(primary, dtype=float), primary_ms))
+            accepted = True
+        except queue.Full:
+            accepted = False
+        with self._lock:
+            if accepted:
+                self.counters['submitted'] += 1
+            else:
+                self.counters['dropped'] += 1
+                self.counters['dropped_rows'] += len(primary)
+        return accepted
+
+    def _run(self):
+        # Priorité réduite pour ce thread seulement (sous Linux, nice est par thread)
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SHADOW_NICE)
+        except (AttributeError, OSError):
+            pass
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            X, primary, primary_ms = item
+            for name, model in self.candidates.items():
+                try:
+                    start = time.perf_counter()
+                    prediction = np.asarray(model.predict(X), dtype=float)
+                    candidate_ms = (time.perf_counter() - start) * 1000
+                except Exception as e:
+                    with self._lock:
+                        self._stats[name].errors += 1
+                        self._stats[name].last_error = str(e)
+                    continue
+                with self._lock:
+                    self._stats[name].ajouter(primary, prediction, primary_ms, candidate_ms)
+            with self._lock:
+                self.counters['processed'] += 1
+
+    def stats(self):
+        """Écarts et latences par candidat, et compteurs de la file"""
+        with self._lock:
+            return {
+                **self.counters,
+                'queued': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'candidates': {name: stats.to_dict() for name, stats in self._stats.items()}
+            }
+
+    def close(self, timeout=10):
+        """Arrête le worker après les travaux déjà en file"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
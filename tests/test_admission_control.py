@@ -0,0 +1,212 @@
+"""
+Tests du contrôle d'admission : token bucket, file FIFO et délestage.
+"""
+
+import threading
+import time
+import types
+
+import pytest
+
+import admission_control
+from admission_control import AdmissionController, AdmissionRejected, ConcurrencyPool, TokenBucketLimiter
+
+
+class Horloge:
+    """Horloge monotone pilotée par le test"""
+
+    def __init__(self):
+        self.t = 1000.0
+
+    def monotonic(self):
+        return self.t
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(admission_control, 'time', types.SimpleNamespace(monotonic=horloge.monotonic))
+    return horloge
+
+
+def attendre(condition, timeout=2.0):
+    fin = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < fin, "condition non atteinte"
+        time.sleep(0.001)
+
+
+# ----------------------------------------------------------------------
+# Token bucket
+# ----------------------------------------------------------------------
+
+def test_rafale_puis_refus(horloge):
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    assert [limiter.acquire('a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire('a') == pytest.approx(0.5)
+
+
+def test_recharge_au_debit(horloge):
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    for _ in range(3):
+        limiter.acquire('a')
+
+    horloge.t += 0.25
+    assert limiter.acquire('a') == pytest.approx(0.25)
+    horloge.t += 0.25
+    assert limiter.acquire('a') == 0
+    assert limiter.acquire('a') > 0
+
+
+def test_recharge_plafonnee_a_la_rafale(horloge):
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    limiter.acquire('a')
+    horloge.t += 3600
+    assert [limiter.acquire('a') for _ in range(4)][-1] > 0
+
+
+def test_un_seau_par_client(horloge):
+    limiter = TokenBucketLimiter(rate=1, burst=1)
+    assert limiter.acquire('a') == 0
+    assert limiter.acquire('a') > 0
+    assert limiter.acquire('b') == 0
+
+
+def test_clients_les_moins_recents_oublies(horloge):
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_clients=2)
+    for client in ('a', 'b', 'c'):
+        limiter.acquire(client)
+    assert limiter.stats()['clients'] == 2
+    # 'a' a été oublié: il repart avec une rafale pleine
+    assert limiter.acquire('a') == 0
+
+
+def test_refus_429_avec_retry_after(horloge):
+    admission = AdmissionController(0.5, 1, {'predict': ConcurrencyPool('predict', 4, 100, 4)})
+    with admission.admit('predict', 'a'):
+        pass
+    with pytest.raises(AdmissionRejected) as e:
+        admission.admit('predict', 'a')
+    assert (e.value.status, e.value.reason, e.value.retry_after) == (429, 'rate_limited', 2)
+    assert admission.stats()['rate_limit']['rejected'] == 1
+    assert admission.pools['predict'].stats()['in_use'] == 0
+
+
+def test_limite_de_debit_seule_sans_pool(horloge):
+    admission = AdmissionController(1, 1, {})
+    with admission.admit(None, 'a'):
+        pass
+    with pytest.raises(AdmissionRejected):
+        admission.admit(None, 'a')
+
+
+# ----------------------------------------------------------------------
+# Pool de concurrence
+# ----------------------------------------------------------------------
+
+def test_poids_borne_et_rendu():
+    pool = ConcurrencyPool('batch', 10, 100, 4)
+    assert pool.acquire(25) == 10
+    assert pool.stats()['in_use'] == 10
+    pool.release(10)
+    assert pool.stats()['in_use'] == 0
+
+
+def test_admission_fifo():
+    pool = ConcurrencyPool('predict', 1, 2000, 8)
+    pool.acquire()
+    ordre = []
+
+    def client(nom):
+        pool.acquire()
+        ordre.append(nom)
+        pool.release(1)
+
+    threads = []
+    for i, nom in enumerate(('premier', 'second', 'troisieme')):
+        thread = threading.Thread(target=client, args=(nom,))
+        thread.start()
+        threads.append(thread)
+        attendre(lambda: pool.stats()['waiting'] == i + 1)
+
+    pool.release(1)
+    for thread in threads:
+        thread.join(2)
+    assert ordre == ['premier', 'second', 'troisieme']
+
+
+def test_pas_de_depassement_de_la_tete_de_file():
+    # Une petite requête n'est pas admise devant une grosse qui attend déjà
+    pool = ConcurrencyPool('batch', 10, 2000, 8)
+    pool.acquire(5)
+    ordre = []
+
+    def client(nom, poids):
+        ordre.append(nom + ':' + str(pool.acquire(poids)))
+
+    grosse = threading.Thread(target=client, args=('grosse', 8))
+    grosse.start()
+    attendre(lambda: pool.stats()['waiting'] == 1)
+    petite = threading.Thread(target=client, args=('petite', 1))
+    petite.start()
+    attendre(lambda: pool.stats()['waiting'] == 2)
+    assert ordre == []
+
+    pool.release(5)
+    grosse.join(2)
+    petite.join(2)
+    assert ordre == ['grosse:8', 'petite:1']
+
+
+def test_delestage_file_pleine():
+    pool = ConcurrencyPool('predict', 1, 2000, max_waiting=1)
+    pool.acquire()
+    attente = threading.Thread(target=lambda: pool.release(pool.acquire()))
+    attente.start()
+    attendre(lambda: pool.stats()['waiting'] == 1)
+
+    with pytest.raises(AdmissionRejected) as e:
+        pool.acquire()
+    assert (e.value.status, e.value.reason) == (503, 'queue_full')
+    assert e.value.retry_after >= 1
+
+    pool.release(1)
+    attente.join(2)
+    assert pool.stats()['queue_full'] == 1
+
+
+def test_delestage_apres_delai_cible():
+    pool = ConcurrencyPool('predict', 1, 50, 4)
+    pool.acquire()
+    debut = time.monotonic()
+    with pytest.raises(AdmissionRejected) as e:
+        pool.acquire()
+    assert time.monotonic() - debut >= 0.05
+    assert (e.value.status, e.value.reason, e.value.retry_after) == (503, 'queue_timeout', 1)
+    assert pool.stats()['waiting'] == 0
+
+
+def test_delestage_immediat_si_file_deja_lente():
+    pool = ConcurrencyPool('predict', 1, 1000, 4)
+    pool.acquire()
+    attente = threading.Thread(target=lambda: pytest.raises(AdmissionRejected, pool.acquire))
+    attente.start()
+    attendre(lambda: pool.stats()['waiting'] == 1)
+
+    # Délai d'attente récent (2.5 s) au-dessus de la cible: refus sans attendre
+    pool.queue_delay = 2.5
+    debut = time.monotonic()
+    with pytest.raises(AdmissionRejected) as e:
+        pool.acquire()
+    assert time.monotonic() - debut < 0.5
+    assert (e.value.status, e.value.reason, e.value.retry_after) == (503, 'overloaded', 3)
+    attente.join(2)
+
+
+def test_slot_rend_la_capacite_meme_en_cas_d_erreur():
+    admission = AdmissionController(0, 0, {'batch': ConcurrencyPool('batch', 10, 100, 4)})
+    with pytest.raises(RuntimeError):
+        with admission.admit('batch', 'a', weight=7):
+            assert admission.pools['batch'].stats()['in_use'] == 7
+            raise RuntimeError()
+    assert admission.pools['batch'].stats()['in_use'] == 0
@@ -0,0 +1,186 @@
+"""
+Tests de la file de travaux : baux, plafond de tentatives et reprise.
+"""
+
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_jobs import JobStore, LeaseLost, traiter_job
+
+
+def creer_store(tmp_path, **kwargs):
+    return JobStore(jobs_dir=str(tmp_path / 'jobs'), **kwargs)
+
+
+def creer_job(store, n_vehicules=10, chunk_size=4):
+    vehicules = [{'marque': 'PEUGEOT', 'annee': 2010 + i} for i in range(n_vehicules)]
+    return store.create(json.dumps({'vehicles': vehicules}).encode(), 'json', chunk_size=chunk_size)
+
+
+def vieillir(store, job_id):
+    """Heartbeat trop ancien: le worker est considéré comme arrêté"""
+    store._execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - 10 * store.stale_after, job_id))
+
+
+class FauxPredictor:
+    """Prix = année ; garde les années évaluées, appelle on_chunk avant chaque bloc"""
+
+    def __init__(self, on_chunk=None):
+        self.annees = []
+        self.on_chunk = on_chunk
+
+    def predict_columns(self, columns):
+        if self.on_chunk is not None:
+            self.on_chunk()
+        annees = np.asarray(columns['annee'], dtype=float)
+        self.annees.extend(annees.tolist())
+        n = len(annees)
+        return {'success': np.ones(n, dtype=bool), 'prix_predit': annees, 'prix_min': annees,
+                'prix_max': annees, 'error': np.full(n, None), 'dedup': {}}
+
+
+def lire_resultats(store, job_id):
+    lignes = b''.join(store.iter_results(job_id)).decode()
+    return pd.read_csv(io.StringIO(lignes))
+
+
+def test_claim_donne_un_bail_et_respecte_max_running(tmp_path):
+    store = creer_store(tmp_path, max_running=1)
+    premier, second = creer_job(store), creer_job(store)
+
+    job = store.claim('w1')
+    assert job['id'] == premier and job['worker'] == 'w1' and job['attempts'] == 1
+    assert store.claim('w2') is None
+
+    store.finish(job)
+    assert store.claim('w2')['id'] == second
+
+
+def test_bail_perdu_apres_remise_en_file(tmp_path):
+    store = creer_store(tmp_path)
+    creer_job(store)
+    ancien = store.claim('w1')
+
+    vieillir(store, ancien['id'])
+    nouveau = store.claim('w2')
+    assert nouveau['id'] == ancien['id'] and nouveau['attempts'] == 2
+
+    # L'ancien titulaire ne peut plus rien écrire
+    for ecriture in (lambda: store.heartbeat(ancien), lambda: store.progress(ancien, 4, 10),
+                     lambda: store.finish(ancien), lambda: store.fail(ancien, 'erreur')):
+        with pytest.raises(LeaseLost):
+            ecriture()
+    assert store.get(ancien['id'])['status'] == 'running'
+
+    store.finish(nouveau)
+    assert store.get(ancien['id'])['status'] == 'done'
+
+
+def test_heartbeat_garde_le_bail(tmp_path):
+    store = creer_store(tmp_path, max_running=2, stale_after=60)
+    job_id = creer_job(store)
+    job = store.claim('w1')
+
+    # 50 s + 50 s sans heartbeat dépasseraient stale_after ; le heartbeat remet le compteur à zéro
+    store._execute("UPDATE jobs SET heartbeat = heartbeat - 50 WHERE id = ?", (job_id,))
+    store.heartbeat(job)
+    store._execute("UPDATE jobs SET heartbeat = heartbeat - 50 WHERE id = ?", (job_id,))
+
+    assert store.claim('w2') is None
+    etat = store.get(job_id)
+    assert etat['worker'] == 'w1' and etat['attempts'] == 1
+
+
+def test_travail_en_echec_apres_max_attempts(tmp_path):
+    store = creer_store(tmp_path, max_attempts=2)
+    job_id = creer_job(store)
+
+    for tentative in (1, 2):
+        job = store.claim(f'w{tentative}')
+        assert job['attempts'] == tentative
+        vieillir(store, job_id)
+
+    assert store.claim('w3') is None
+    etat = store.get(job_id)
+    assert etat['status'] == 'failed' and etat['worker'] is None
+    assert '2 tentatives' in etat['error']
+
+
+def test_travail_en_echec_ne_bloque_pas_la_file(tmp_path):
+    store = creer_store(tmp_path, max_attempts=1)
+    bloque, suivant = creer_job(store), creer_job(store)
+    store.claim('w1')
+    vieillir(store, bloque)
+
+    assert store.claim('w2')['id'] == suivant
+    assert store.get(bloque)['status'] == 'failed'
+
+
+def test_traiter_job_complet(tmp_path):
+    store = creer_store(tmp_path)
+    job_id = creer_job(store, n_vehicules=10, chunk_size=4)
+    predictor = FauxPredictor()
+
+    traiter_job(store, predictor, store.claim('w1'))
+
+    etat = store.get(job_id)
+    assert etat['status'] == 'done' and etat['n_done'] == etat['n_total'] == 10
+    resultats = lire_resultats(store, job_id)
+    assert resultats['row'].tolist() == list(range(10))
+    assert resultats['prix_predit'].tolist() == [2010.0 + i for i in range(10)]
+
+
+def test_reprise_apres_heartbeat_perime(tmp_path):
+    store = creer_store(tmp_path)
+    job_id = creer_job(store, n_vehicules=10, chunk_size=4)
+
+    # Premier worker: un bloc terminé puis arrêt brutal (plus de heartbeat)
+    class Arret(Exception):
+        pass
+
+    appels = []
+
+    def arret_au_second_bloc():
+        appels.append(1)
+        if len(appels) == 2:
+            raise Arret()
+
+    with pytest.raises(Arret):
+        traiter_job(store, FauxPredictor(on_chunk=arret_au_second_bloc), store.claim('w1'))
+    assert store.get(job_id)['n_done'] == 4
+
+    vieillir(store, job_id)
+    repreneur = FauxPredictor()
+    job = store.claim('w2')
+    assert job['attempts'] == 2
+    traiter_job(store, repreneur, job)
+
+    # Seuls les blocs non terminés sont réévalués
+    assert repreneur.annees == [2010.0 + i for i in range(4, 10)]
+    assert store.get(job_id)['status'] == 'done'
+    assert lire_resultats(store, job_id)['row'].tolist() == list(range(10))
+
+
+def test_worker_sans_bail_n_ecrit_pas_de_bloc(tmp_path):
+    store = creer_store(tmp_path)
+    job_id = creer_job(store, n_vehicules=8, chunk_size=4)
+    ancien = store.claim('w1')
+
+    # Pendant le premier bloc, le travail est remis en file et réclamé par un autre worker
+    def voler_le_bail():
+        vieillir(store, job_id)
+        store.claim('w2')
+
+    with pytest.raises(LeaseLost):
+        traiter_job(store, FauxPredictor(on_chunk=voler_le_bail), ancien)
+
+    fichiers = os.listdir(store.job_dir(job_id))
+    assert not any(f.startswith('part-') for f in fichiers)
+    etat = store.get(job_id)
+    assert etat['status'] == 'running' and etat['worker'] == 'w2' and etat['n_done'] == 0
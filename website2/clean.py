@@ -26,8 +26,14 @@ print("="*80)
 
 # Si vous chargez depuis un fichier:
 import glob
+import os
 fichiers = glob.glob("baniola_*.csv")
-if fichiers:
+# Liste de fichiers imposée par build_pipeline.py
+if os.environ.get("PIPELINE_RAW_FILES"):
+    fichiers_pipeline = os.environ["PIPELINE_RAW_FILES"].split(os.pathsep)
+    print(f"Chargement de {len(fichiers_pipeline)} fichier(s) imposés par le pipeline")
+    df = pd.concat([pd.read_csv(f, encoding='utf-8-sig') for f in fichiers_pipeline], ignore_index=True)
+elif fichiers:
     dernier_fichier = max(fichiers)
     print(f"Chargement de: {dernier_fichier}")
     df = pd.read_csv(dernier_fichier, encoding='utf-8-sig')
@@ -457,13 +463,13 @@ print("="*80)
 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
 # CSV
-csv_filename = f"baniola_clean_{timestamp}.csv"
+csv_filename = os.environ.get("PIPELINE_OUTPUT_CSV", f"baniola_clean_{timestamp}.csv")
 df_final.to_csv(csv_filename, index=False, encoding='utf-8-sig')
 print(f"[OK] CSV sauvegardé: {csv_filename}")
 
 # Excel
 try:
-    excel_filename = f"baniola_clean_{timestamp}.xlsx"
+    excel_filename = os.path.splitext(csv_filename)[0] + ".xlsx"
     df_final.to_excel(excel_filename, index=False, engine='openpyxl')
     print(f"[OK] Excel sauvegardé: {excel_filename}")
 except:
@@ -6,12 +6,116 @@ Notebook de scraping Baniola.tn - Export XLSX
 import pandas as pd
 import os
 import glob
+import json
+import hashlib
+import argparse
 from prettytable import PrettyTable
 from datetime import datetime
 
-def afficher_tableau_lisible(csv_pattern="**/baniola_multi_modeles_*.csv"):
+# Colonnes inutiles (tous formats possibles)
+COLONNES_A_SUPPRIMER = [
+    "Date de publication",
+    "Date_publication",
+    "date_publication",
+    "datePublication",
+    "Localisation"
+]
+
+# Renommage des colonnes sans accents
+NOUVEAUX_NOMS = {
+    "Marque": "Marque",
+    "Prix": "Prix",
+    "Année": "Annee",
+    "Kilométrage": "Kilometrage",
+    "Carburant": "Carburant",
+    "Boîte vitesse": "Boite vitesse",
+    "Modèle": "Modele",
+    "Puissance fiscale": "Puissance fiscale",
+    "Nombre de portes": "Nombre de portes"
+}
+
+# Colonnes à afficher
+COLS_AFFICHER = [
+    "Marque", "Prix", "Annee", "Kilometrage",
+    "Carburant", "Boite vitesse", "Modele",
+    "Puissance fiscale", "Nombre de portes"
+]
+
+# Colonnes définissant l'identité d'une annonce (pour le dédoublonnage)
+COLS_IDENTITE = [
+    "Marque", "Modele", "Annee", "Kilometrage", "Prix",
+    "Carburant", "Boite vitesse", "Description"
+]
+# Colonnes numériques de l'identité : "39000", "39000.0" et 39000 donnent la même clé
+COLS_IDENTITE_NUMERIQUES = ["Annee", "Kilometrage", "Prix"]
+
+STORE_PATH = "baniola_consolide.csv"
+MANIFEST_PATH = "baniola_consolide_manifest.json"
+INDEX_PATH = "baniola_consolide_ids.txt"
+
+
+def normaliser_colonnes(df):
+    """Supprime les colonnes inutiles et renomme les colonnes sans accents."""
+    colonnes = [col for col in COLONNES_A_SUPPRIMER if col in df.columns]
+    return df.drop(columns=colonnes).rename(columns=NOUVEAUX_NOMS)
+
+
+def normaliser_nombre(col):
+    """Écriture canonique des valeurs numériques (39000.0 -> "39000"), texte brut sinon."""
+    texte = col.astype("string").str.strip()
+    nombres = pd.to_numeric(texte.str.replace(r"\s", "", regex=True), errors="coerce")
+    canonique = nombres.map(lambda v: f"{v:.15g}" if pd.notna(v) else pd.NA).astype("string")
+    return canonique.fillna(texte)
+
+
+def identite_annonces(df):
+    """Hash stable de l'identité de chaque annonce."""
+    cols = [col for col in COLS_IDENTITE if col in df.columns]
+    valeurs = df[cols].astype("string")
+    for col in COLS_IDENTITE_NUMERIQUES:
+        if col in valeurs.columns:
+            valeurs[col] = normaliser_nombre(valeurs[col])
+    cles = valeurs.fillna("").apply(
+        lambda col: col.str.strip().str.lower()
+    ).agg("|".join, axis=1)
+    return cles.map(lambda cle: hashlib.sha1(cle.encode("utf-8")).hexdigest())
+
+
+def hash_fichier(path):
+    """Hash SHA-256 du contenu d'un fichier."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def afficher_apercu(df, cols_existantes, max_rows=20):
+    """Affiche au plus max_rows lignes dans une PrettyTable."""
+    table = PrettyTable()
+    table.field_names = cols_existantes
+
+    apercu = df[cols_existantes].head(max_rows) if max_rows else df[cols_existantes]
+    for row in apercu.itertuples(index=False):
+        row_data = []
+        for value in row:
+            value = str(value) if pd.notna(value) else "N/A"
+            if len(value) > 30:
+                value = value[:27] + "..."
+            row_data.append(value)
+        table.add_row(row_data)
+
+    table.align = "l"
+    print(table)
+    if max_rows and len(df) > max_rows:
+        print(f"... {len(df) - max_rows} lignes supplémentaires non affichées")
+
+def afficher_tableau_lisible(csv_pattern="**/baniola_multi_modeles_*.csv", export_xlsx=True, max_rows=None):
     """
     Affiche un tableau lisible et génère un fichier XLSX depuis les CSV trouvés.
+
+    Relit et fusionne tous les CSV à chaque appel ; voir consolider_incremental
+    pour ne traiter que les nouveaux fichiers.
     """
 
     # Trouver les fichiers CSV
@@ -46,73 +150,26 @@ def afficher_tableau_lisible(csv_pattern="**/baniola_multi_modeles_*.csv"):
     print(f"\n[OK] Total : {len(df_voitures)} voitures chargées.")
 
     # ──────────────────────────────────────────────
-    # SUPPRIMER colonnes inutiles (tous formats possibles)
-    colonnes_a_supprimer = [
-        "Date de publication",
-        "Date_publication",
-        "date_publication",
-        "datePublication",
-        "Localisation"
-    ]
-
-    for col in colonnes_a_supprimer:
-        if col in df_voitures.columns:
-            print(f"[INFO] Suppression colonne : {col}")
-            df_voitures.drop(columns=[col], inplace=True)
-
-    # Garder explicitement la colonne Boîte de vitesses
-    print("[INFO] Conservation explicite de la colonne Boîte de vitesses")
-
-    # RENOMMER colonnes sans accents
-    nouveaux_noms = {
-        "Marque": "Marque",
-        "Prix": "Prix",
-        "Année": "Annee",
-        "Kilométrage": "Kilometrage",
-        "Carburant": "Carburant",
-        "Boîte vitesse": "Boite vitesse",
-        "Modèle": "Modele",
-        "Puissance fiscale": "Puissance fiscale",
-        "Nombre de portes": "Nombre de portes"
-    }
-    df_voitures.rename(columns=nouveaux_noms, inplace=True)
+    # SUPPRIMER colonnes inutiles et RENOMMER colonnes sans accents
+    # (la colonne Boîte de vitesses est conservée)
+    df_voitures = normaliser_colonnes(df_voitures)
     # ──────────────────────────────────────────────
 
-    # Colonnes à afficher
-    cols_afficher = [
-        "Marque", "Prix", "Annee", "Kilometrage",
-        "Carburant", "Boite vitesse", "Modele",
-        "Puissance fiscale", "Nombre de portes"
-    ]
-
-    cols_existantes = [col for col in cols_afficher if col in df_voitures.columns]
+    cols_existantes = [col for col in COLS_AFFICHER if col in df_voitures.columns]
 
     # --- EXPORT EXCEL ---
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nom_excel = f"voitures_scrape_{timestamp}.xlsx"
+    if export_xlsx:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        nom_excel = f"voitures_scrape_{timestamp}.xlsx"
 
-    df_voitures.to_excel(nom_excel, index=False)
-    print(f"[OK] Fichier Excel généré : {nom_excel}")
+        df_voitures.to_excel(nom_excel, index=False)
+        print(f"[OK] Fichier Excel généré : {nom_excel}")
 
     # --- Affichage du tableau dans le terminal ---
-    table = PrettyTable()
-    table.field_names = cols_existantes
-
-    for _, row in df_voitures.iterrows():
-        row_data = []
-        for col in cols_existantes:
-            value = str(row[col]) if pd.notna(row[col]) else "N/A"
-            if len(value) > 30:
-                value = value[:27] + "..."
-            row_data.append(value)
-        table.add_row(row_data)
-
-    table.align = "l"
-
     print("\n" + "="*100)
     print("RÉSULTATS DU SCRAPING (APERÇU)")
     print("="*100)
-    print(table)
+    afficher_apercu(df_voitures, cols_existantes, max_rows)
 
     print("\n" + "="*100)
     print("INFORMATIONS SUR LE DATASET")
@@ -123,5 +180,192 @@ def afficher_tableau_lisible(csv_pattern="**/baniola_multi_modeles_*.csv"):
     for col in cols_existantes:
         print(f"  • {col}")
 
+def charger_manifest(manifest_path):
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"fichiers": {}, "xlsx": None}
+
+
+def sauvegarder_manifest(manifest, manifest_path):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def etat_fichier(path):
+    """Taille et date de modification d'un fichier (None s'il n'existe pas)."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def charger_index(store_path, index_path, manifest):
+    """
+    Identifiants des annonces déjà consolidées.
+
+    L'index (un listing_id par ligne) est relu tel quel s'il correspond à
+    l'état du consolidé enregistré dans le manifest. Sinon il est reconstruit
+    depuis le consolidé : identifiants stockés et identifiants recalculés
+    (ceux d'une version antérieure du hash restent ainsi reconnus).
+    """
+    etat = manifest.get("index")
+    if etat and os.path.exists(index_path) and etat["store"] == etat_fichier(store_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            return {ligne.rstrip("\n") for ligne in f if ligne.strip()}
+
+    if os.path.exists(store_path):
+        print(f"[INFO] Reconstruction de l'index des annonces depuis {store_path}")
+        colonnes_store = pd.read_csv(store_path, nrows=0, encoding="utf-8-sig").columns
+        store = pd.read_csv(store_path, usecols=[c for c in colonnes_store if c == "listing_id" or c in COLS_IDENTITE],
+                            encoding="utf-8-sig")
+        ids = set(store["listing_id"]) | set(identite_annonces(store))
+        n_annonces = len(store)
+    else:
+        ids, n_annonces = set(), 0
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{listing_id}\n" for listing_id in sorted(ids))
+    os.replace(tmp_path, index_path)
+    manifest["index"] = {"store": etat_fichier(store_path), "annonces": n_annonces}
+    return ids
+
+
+def consolider_incremental(csv_pattern="**/baniola_multi_modeles_*.csv", store_path=STORE_PATH,
+                           manifest_path=MANIFEST_PATH, index_path=INDEX_PATH, export_xlsx=False, max_rows=20):
+    """
+    Fusionne uniquement les nouveaux CSV dans un fichier consolidé.
+
+    Le manifest garde pour chaque fichier déjà fusionné son chemin, sa taille,
+    sa date de modification et son hash : un fichier inchangé n'est jamais
+    relu, et un fichier copié/renommé avec le même contenu est ignoré.
+    Les nouvelles lignes sont dédoublonnées sur l'identité de l'annonce
+    (colonne listing_id du fichier consolidé) puis ajoutées en fin de
+    fichier. Les listing_id consolidés sont tenus dans un fichier d'index
+    complété à chaque ajout : le consolidé n'est relu que si l'index manque
+    ou ne correspond plus, et rien n'est relu sans nouveau fichier.
+
+    Parameters:
+    -----------
+    csv_pattern : str
+        Motif glob des CSV scrapés
+    store_path : str
+        Fichier CSV consolidé
+    manifest_path : str
+        Manifest JSON des fichiers déjà fusionnés
+    index_path : str
+        Index des listing_id du consolidé
+    export_xlsx : bool
+        Générer le fichier Excel (seulement si le consolidé a changé depuis le dernier export)
+    max_rows : int
+        Nombre maximal de lignes affichées dans l'aperçu
+
+    Returns:
+    --------
+    pd.DataFrame
+        Les nouvelles annonces ajoutées au consolidé
+    """
+    manifest = charger_manifest(manifest_path)
+    connus = manifest["fichiers"]
+    hashes_connus = {info["sha256"] for info in connus.values()}
+
+    # Repérer les fichiers nouveaux ou modifiés (taille/mtime puis hash)
+    nouveaux = []
+    store_abs = os.path.abspath(store_path)
+    for csv_file in sorted(glob.glob(csv_pattern, recursive=True)):
+        if os.path.abspath(csv_file) == store_abs:
+            continue
+        stat = os.stat(csv_file)
+        info = connus.get(csv_file)
+        if info and info["size"] == stat.st_size and info["mtime"] == stat.st_mtime:
+            continue
+        digest = hash_fichier(csv_file)
+        connus[csv_file] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest}
+        if digest in hashes_connus:
+            print(f"    [=] Contenu déjà fusionné : {csv_file}")
+            continue
+        hashes_connus.add(digest)
+        nouveaux.append(csv_file)
+
+    print(f"[+] {len(nouveaux)} nouveau(x) fichier(s) CSV à fusionner")
+
+    ids_existants = charger_index(store_path, index_path, manifest) if nouveaux else set()
+
+    nouvelles_lignes = []
+    for csv_file in nouveaux:
+        try:
+            df = normaliser_colonnes(pd.read_csv(csv_file, encoding="utf-8-sig"))
+        except Exception as e:
+            print(f"    [!] Erreur lors du chargement de {csv_file}: {e}")
+            del connus[csv_file]
+            continue
+        df.insert(0, "listing_id", identite_annonces(df))
+        df = df.drop_duplicates(subset="listing_id")
+        df = df[~df["listing_id"].isin(ids_existants)]
+        ids_existants.update(df["listing_id"])
+        print(f"    [+] {len(df)} nouvelles annonces depuis {csv_file}")
+        nouvelles_lignes.append(df)
+
+    df_nouveaux = pd.concat(nouvelles_lignes, ignore_index=True) if nouvelles_lignes else pd.DataFrame()
+
+    if not df_nouveaux.empty:
+        if os.path.exists(store_path):
+            # Aligner sur les colonnes du consolidé pour pouvoir ajouter en fin de fichier
+            colonnes_store = pd.read_csv(store_path, nrows=0, encoding="utf-8-sig").columns
+            colonnes_en_plus = [c for c in df_nouveaux.columns if c not in colonnes_store]
+            if colonnes_en_plus:
+                print(f"[INFO] Colonnes ignorées (absentes du consolidé) : {colonnes_en_plus}")
+            df_nouveaux.reindex(columns=colonnes_store).to_csv(
+                store_path, mode="a", header=False, index=False, encoding="utf-8"
+            )
+        else:
+            df_nouveaux.to_csv(store_path, index=False, encoding="utf-8-sig")
+        # Index complété après le consolidé : en cas d'interruption entre les deux,
+        # l'état enregistré ne correspond plus et l'index sera reconstruit
+        with open(index_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{listing_id}\n" for listing_id in df_nouveaux["listing_id"])
+        manifest["index"] = {"store": etat_fichier(store_path),
+                             "annonces": manifest["index"]["annonces"] + len(df_nouveaux)}
+
+    sauvegarder_manifest(manifest, manifest_path)
+    n_annonces = manifest.get("index", {}).get("annonces")
+    if n_annonces is not None:
+        print(f"[OK] Consolidé : {n_annonces} annonces au total dans {store_path}")
+
+    # --- EXPORT EXCEL (paresseux) ---
+    if export_xlsx and os.path.exists(store_path):
+        nom_excel = os.path.splitext(store_path)[0] + ".xlsx"
+        store_mtime = os.path.getmtime(store_path)
+        if not os.path.exists(nom_excel) or manifest.get("xlsx") != store_mtime:
+            pd.read_csv(store_path, encoding="utf-8-sig").to_excel(nom_excel, index=False)
+            manifest["xlsx"] = store_mtime
+            sauvegarder_manifest(manifest, manifest_path)
+            print(f"[OK] Fichier Excel généré : {nom_excel}")
+        else:
+            print(f"[INFO] Fichier Excel déjà à jour : {nom_excel}")
+
+    # --- Aperçu borné des nouvelles annonces ---
+    if not df_nouveaux.empty:
+        cols_existantes = [col for col in COLS_AFFICHER if col in df_nouveaux.columns]
+        print("\n" + "="*100)
+        print("NOUVELLES ANNONCES (APERÇU)")
+        print("="*100)
+        afficher_apercu(df_nouveaux, cols_existantes, max_rows)
+
+    return df_nouveaux
+
+
 if __name__ == "__main__":
-    afficher_tableau_lisible()
+    parser = argparse.ArgumentParser(description="Consolidation des exports Baniola")
+    parser.add_argument("--full", action="store_true", help="Relire et afficher tous les CSV (ancien mode)")
+    parser.add_argument("--xlsx", action="store_true", help="Générer le fichier Excel")
+    parser.add_argument("--max-rows", type=int, default=20, help="Nombre de lignes de l'aperçu")
+    args = parser.parse_args()
+
+    if args.full:
+        afficher_tableau_lisible(export_xlsx=args.xlsx, max_rows=args.max_rows)
+    else:
+        consolider_incremental(export_xlsx=args.xlsx, max_rows=args.max_rows)
@@ -0,0 +1,150 @@
+"""
+Wire Formats - Formats d'échange colonnaires pour la prédiction en batch
+=========================================================================
+
+Pour un gros batch, le format ligne par ligne (une liste de dictionnaires qui
+répètent toutes les clés) coûte plus cher à décoder et à encoder que
+l'inférence. Ce module fournit :
+
+- le format colonnaire JSON (struct-of-arrays) :
+      {"columns": {"marque": [...], "annee": [...], ...}}
+- le même format en MessagePack, où les colonnes numériques peuvent être
+  des tableaux empaquetés {"dtype": "<f8", "data": <octets>}
+- un encodeur JSON rapide qui sérialise directement les tableaux numpy
+  (orjson si installé, sinon json de la bibliothèque standard)
+
+msgpack et orjson sont optionnels : sans msgpack, le format binaire est
+refusé ; sans orjson, l'encodage JSON reste correct mais plus lent.
+
+Auteur: ML Project Team
+Date: 2025
+Version: 1.0
+"""
+
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+PACKED_DTYPES = ('<f8', '<f4', '<i8', '<i4')
+
+
+def msgpack_disponible():
+    """Vrai si le format MessagePack est utilisable"""
+    return msgpack is not None
+
+
+def _defaut_json(obj):
+    """Conversion des types numpy pour le module json standard"""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f':
+            return [None if v != v else v for v in obj.tolist()]
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        return None if value != value else value
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj).__name__}")
+
+
+def dumps_json(obj):
+    """
+    Encode en JSON (octets UTF-8) des structures contenant des tableaux numpy.
+
+    Les NaN sont écrits null dans les deux implémentations.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY, default=_defaut_json)
+    return json.dumps(_sans_nan(obj), default=_defaut_json, ensure_ascii=False).encode('utf-8')
+
+
+def _sans_nan(obj):
+    """Remplace les float NaN (hors tableaux numpy) par None pour le module json"""
+    if isinstance(obj, float) and obj != obj:
+        return None
+    if isinstance(obj, dict):
+        return {k: _sans_nan(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_sans_nan(v) for v in obj]
+    return obj
+
+
+def decoder_colonnes(columns):
+    """
+    Normalise les colonnes reçues : tableaux empaquetés décodés en numpy,
+    listes conservées.
+
+    Parameters:
+    -----------
+    columns : dict
+        {nom: liste de valeurs ou {"dtype": ..., "data": octets}}
+
+    Returns:
+    --------
+    dict
+        {nom: liste ou np.ndarray}, toutes de même longueur
+
+    Raises:
+    -------
+    ValueError
+        Si une colonne est mal formée ou si les longueurs diffèrent
+    """
+    if not isinstance(columns, dict) or not columns:
+        raise ValueError('Field "columns" must be a non-empty object of arrays')
+
+    decoded = {}
+    for name, values in columns.items():
+        if isinstance(values, dict):
+            dtype = values.get('dtype')
+            if dtype not in PACKED_DTYPES or not isinstance(values.get('data'), (bytes, bytearray)):
+                raise ValueError(f"Colonne empaquetée invalide: {name} (dtypes acceptés: {PACKED_DTYPES})")
+            decoded[name] = np.frombuffer(values['data'], dtype=dtype)
+        elif isinstance(values, list):
+            decoded[name] = values
+        else:
+            raise ValueError(f"La colonne {name} doit être une liste")
+
+    lengths = {len(values) for values in decoded.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"Colonnes de longueurs différentes: {sorted(lengths)}")
+    return decoded
+
+
+def unpack_msgpack(data):
+    """Décode un corps de requête MessagePack"""
+    if msgpack is None:
+        raise RuntimeError("Format MessagePack indisponible: installer msgpack")
+    return msgpack.unpackb(data, raw=False)
+
+
+def pack_msgpack(obj):
+    """
+    Encode en MessagePack ; les tableaux numpy numériques sont empaquetés
+    ({"dtype", "data"}) et les autres convertis en listes.
+    """
+    if msgpack is None:
+        raise RuntimeError("Format MessagePack indisponible: installer msgpack")
+
+    def defaut(value):
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind in 'fi':
+                value = value.astype(value.dtype.newbyteorder('<'), copy=False)
+                return {'dtype': value.dtype.str, 'data': value.tobytes()}
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Type non sérialisable en MessagePack: {type(value).__name__}")
+
+    return msgpack.packb(obj, default=defaut, use_bin_type=True)